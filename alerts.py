@@ -0,0 +1,133 @@
+import json
+import queue
+import threading
+import time
+
+import requests
+
+from metrics import ALERT_DURATION, ALERTS_TOTAL
+
+MAX_EMBEDS_PER_MESSAGE = 10    # Discord limit per webhook message
+MAX_MESSAGE_CHARS = 6000       # Discord limit on combined embed text (json length is a safe overestimate)
+
+class AlertDispatcher:
+    """
+    Non-blocking Discord webhook sender.
+
+    `enqueue()` only puts the embed on a bounded queue (dropping it if the queue
+    is full) and returns immediately. A background worker drains the queue over
+    one reused HTTP session, coalescing bursts into multi-embed messages and
+    honoring Discord's 429 `retry_after`.
+    """
+
+    def __init__(self, webhook_url, maxsize=500, session=None, timeout=5, max_attempts=5):
+        self.webhook_url = webhook_url
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self._carry = None
+        self._worker = None
+        self._lock = threading.Lock()
+
+    @property
+    def queue_length(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        return {
+            "queue_length": self.queue_length,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def enqueue(self, embed):
+        """Returns False if the alert was dropped because the queue is full."""
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait(embed)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            ALERTS_TOTAL.inc(outcome='dropped')
+            return False
+
+    def flush(self, timeout=10):
+        """Blocks until everything enqueued so far has been posted (or given up on)."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self.queue.unfinished_tasks
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="discord-alerts", daemon=True)
+                    self._worker.start()
+
+    def _next_batch(self):
+        batch = [self._carry] if self._carry is not None else [self.queue.get()]
+        self._carry = None
+        size = len(json.dumps(batch[0]))
+
+        # Coalesce whatever is already waiting into the same message
+        while len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            try:
+                embed = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            embed_size = len(json.dumps(embed))
+            if size + embed_size > MAX_MESSAGE_CHARS:
+                self._carry = embed
+                break
+            batch.append(embed)
+            size += embed_size
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._post(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _post(self, embeds):
+        for attempt in range(self.max_attempts):
+            # No wait after the last attempt: it would only hold up the alerts queued behind
+            last = attempt == self.max_attempts - 1
+            try:
+                with ALERT_DURATION.time():
+                    response = self.session.post(self.webhook_url, json={"embeds": embeds}, timeout=self.timeout)
+                if response.status_code == 429:
+                    retry_after = self._retry_after(response)
+                    if not last:
+                        print(f"Discord rate limited. Retrying in {retry_after:.2f}s")
+                        time.sleep(retry_after)
+                    continue
+                response.raise_for_status()
+                self.sent += len(embeds)
+                ALERTS_TOTAL.inc(len(embeds), outcome='sent')
+                print(f"Discord embed alert sent successfully ({len(embeds)} embed(s)).")
+                return True
+            except Exception as e:
+                print(f"Failed to send Discord alert: {e}")
+                if not last:
+                    time.sleep(min(2 ** attempt, 30))
+
+        self.failed += len(embeds)
+        ALERTS_TOTAL.inc(len(embeds), outcome='failed')
+        return False
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.json().get('retry_after', 1))
+        except Exception:
+            return float(response.headers.get('Retry-After', 1))
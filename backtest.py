@@ -1,29 +1,37 @@
-import ccxt
 import pandas as pd
-import time
+from candle_store import load_history
+import backtest_engine
+import indicators
 
 def calculate_indicators(df):
-    # SMA 20
-    df['sma_20'] = df['close'].rolling(window=20).mean()
-    
+    df['sma_20'] = indicators.sma(df['close'], 20)
     # RSI 14 (EMA based, matching main.py)
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).ewm(com=13, adjust=False).mean()
-    loss = (-delta.where(delta < 0, 0)).ewm(com=13, adjust=False).mean()
-    
-    rs = gain / loss
-    df['rsi_14'] = 100 - (100 / (1 + rs))
-    
+    df['rsi_14'] = indicators.rsi(df['close'], 14)
     return df
 
+def strategy_signals(df):
+    """
+    Trend strategy signals (logic matches main.py):
+    BUY when price > SMA20 and RSI < 70, SELL when price < SMA20 or RSI > 80.
+    """
+    close = df['close'].to_numpy()
+    sma = df['sma_20'].to_numpy()
+    rsi = df['rsi_14'].to_numpy()
+    return (close > sma) & (rsi < 70), (close < sma) | (rsi > 80)
+
+def simulate(df, stop_loss, take_profit, initial_balance=10000):
+    """Runs the strategy over an indicator frame. Returns a backtest_engine.BacktestResult."""
+    entries, exits = strategy_signals(df)
+    return backtest_engine.run(df['close'].to_numpy(), entries, exits, stop_loss=stop_loss,
+                               take_profit=take_profit, initial_balance=initial_balance, start=20)
+
 def run_backtest():
     print("--- Starting Backtest ---")
     
     # 1. Load Data from CSV
     try:
-        print("Loading data from btc_1h_data.csv...")
-        df = pd.read_csv('btc_1h_data.csv')
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        print("Loading 1h data from the candle store...")
+        df = load_history('BTC/USDT', '1h', csv='btc_1h_data.csv')
     except Exception as e:
         print(f"Error loading data: {e}. Make sure btc_1h_data.csv exists.")
         return
@@ -31,76 +39,25 @@ def run_backtest():
     # 2. Add Indicators
     df = calculate_indicators(df)
     
-    # 3. Simulation Loop
+    # 3. Simulation (backtest_engine: same entry, SL/TP and exit rules as the old per-row loop)
     initial_balance = 10000
-    usdt_balance = initial_balance
-    btc_balance = 0
-    in_position = False
     
     print(f"Testing Period: {df['timestamp'].iloc[0]} to {df['timestamp'].iloc[-1]}")
     print(f"Initial Balance: ${initial_balance:,.2f}")
     
-    trade_count = 0
-    
     STOP_LOSS_PCT = 0.02
     TAKE_PROFIT_PCT = 0.04
     
-    for i in range(20, len(df)):
-        row = df.iloc[i]
-        price = row['close']
-        sma = row['sma_20']
-        rsi = row['rsi_14']
-        
-        # Logic matches main.py
-        
-        if in_position:
-            # 1. RISK MANAGEMENT CHECK (Priority)
-            pct_change = (price - entry_price) / entry_price
-            
-            # Stop Loss
-            if pct_change <= -STOP_LOSS_PCT:
-                usdt_balance = btc_balance * price
-                btc_balance = 0
-                in_position = False
-                trade_count += 1
-                # print(f"🛑 STOP LOSS at ${price:,.2f} | Time: {row['timestamp']}")
-                continue # Skip remaining logic for this candle
-                
-            # Take Profit
-            elif pct_change >= TAKE_PROFIT_PCT:
-                usdt_balance = btc_balance * price
-                btc_balance = 0
-                in_position = False
-                trade_count += 1
-                # print(f"🥂 TAKE PROFIT at ${price:,.2f} | Time: {row['timestamp']}")
-                continue # Skip remaining logic
-
-            # 2. STRATEGY SELL Logic
-            # Price < SMA OR RSI > 80
-            if price < sma or rsi > 80:
-                usdt_balance = btc_balance * price
-                btc_balance = 0
-                in_position = False
-                trade_count += 1
-                # print(f"SELL at ${price:,.2f} | Time: {row['timestamp']}")
-
-        # BUY Logic: Price > SMA and RSI < 70 (and not in position)
-        elif not in_position:
-            if price > sma and rsi < 70:
-                btc_balance = usdt_balance / price
-                usdt_balance = 0
-                in_position = True
-                entry_price = price # Track entry for risk calcs
-                trade_count += 1
-                # print(f"BUY at ${price:,.2f} | Time: {row['timestamp']}")
+    result = simulate(df, STOP_LOSS_PCT, TAKE_PROFIT_PCT, initial_balance)
+    trade_count = result.trade_count
 
     # Final Calculation - Bot
-    final_price = df.iloc[-1]['close']
-    bot_equity = usdt_balance + (btc_balance * final_price)
-    bot_roi = ((bot_equity - initial_balance) / initial_balance) * 100
+    final_price = df['close'].iloc[-1]
+    bot_equity = result.final_equity
+    bot_roi = result.roi
     
     # Final Calculation - Buy and Hold
-    initial_price = df.iloc[0]['close']
+    initial_price = df['close'].iloc[0]
     bh_btc_amount = initial_balance / initial_price
     bh_equity = bh_btc_amount * final_price
     bh_roi = ((bh_equity - initial_balance) / initial_balance) * 100
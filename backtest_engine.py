@@ -0,0 +1,151 @@
+import bisect
+
+import numpy as np
+
+SCAN_CHUNK = 32          # Bars checked one by one before scanning in doubling NumPy windows
+SCAN_CHUNK_MAX = 65536
+
+class BacktestTrade:
+    """One round trip. `exit_index`/`exit_price` are None while the position is still open."""
+    __slots__ = ('entry_index', 'entry_price', 'exit_index', 'exit_price', 'reason', 'balance', 'units')
+
+    def __init__(self, entry_index, entry_price, exit_index=None, exit_price=None, reason=None, balance=None, units=None):
+        self.entry_index = entry_index
+        self.entry_price = entry_price
+        self.exit_index = exit_index
+        self.exit_price = exit_price
+        self.reason = reason      # 'stop_loss', 'take_profit', 'signal' or None (open)
+        self.balance = balance    # Quote balance after the exit
+        self.units = units        # Base amount held
+
+    @property
+    def pnl_pct(self):
+        if self.exit_price is None:
+            return None
+        return (self.exit_price - self.entry_price) / self.entry_price * 100
+
+    def __repr__(self):
+        return f"BacktestTrade({self.entry_index}->{self.exit_index}, {self.reason})"
+
+class BacktestResult:
+    """Trades, per-bar equity curve and summary of one run."""
+
+    def __init__(self, trades, equity, initial_balance):
+        self.trades = trades
+        self.equity = equity
+        self.initial_balance = initial_balance
+
+    @property
+    def final_equity(self):
+        return float(self.equity[-1]) if len(self.equity) else self.initial_balance
+
+    @property
+    def roi(self):
+        return (self.final_equity - self.initial_balance) / self.initial_balance * 100
+
+    @property
+    def trade_count(self):
+        """Orders placed (a buy and a sell per closed round trip), as the old loop counted them."""
+        return sum(2 if t.exit_index is not None else 1 for t in self.trades)
+
+    @property
+    def win_rate(self):
+        closed = [t for t in self.trades if t.exit_index is not None]
+        return sum(t.exit_price > t.entry_price for t in closed) / len(closed) * 100 if closed else 0.0
+
+def _find_exit(close, exits, close_list, exits_list, start, entry_price, stop_loss, take_profit):
+    """First bar >= start where the stop, the target or the exit signal fires, or None."""
+    n = len(close_list)
+    stop = -stop_loss if stop_loss is not None else float('-inf')
+    take = take_profit if take_profit is not None else float('inf')
+
+    # Most trades end within a few bars: check those in plain Python, where a
+    # bar costs less than the overhead of one NumPy call
+    stop_at = start + SCAN_CHUNK if start + SCAN_CHUNK < n else n
+    for i in range(start, stop_at):
+        # Same expression as the live/legacy checks, so thresholds compare bit-for-bit equal
+        pct_change = (close_list[i] - entry_price) / entry_price
+        if pct_change <= stop or pct_change >= take or exits_list[i]:
+            return i
+
+    start += SCAN_CHUNK
+    chunk = SCAN_CHUNK * 2
+    while start < n:
+        end = min(n, start + chunk)
+        pct_change = (close[start:end] - entry_price) / entry_price
+        hit = exits[start:end] | (pct_change <= stop) | (pct_change >= take)
+        k = int(hit.argmax())
+        if hit[k]:
+            return start + k
+        start = end
+        chunk = min(chunk * 2, SCAN_CHUNK_MAX)
+    return None
+
+def run(close, entries, exits, stop_loss=None, take_profit=None, initial_balance=10000.0, start=0):
+    """
+    Long-only, all-in backtest over NumPy arrays.
+
+    `entries`/`exits` are boolean signal arrays aligned with `close`. Flat, a
+    bar with an entry signal buys at its close. In a position, each later bar
+    exits at its close on, in this order of priority: the stop loss
+    (`stop_loss`, fraction below entry), the take profit (`take_profit`,
+    fraction above entry), or an exit signal. A bar that exits never re-enters.
+
+    Instead of stepping bar by bar, the engine jumps from each entry to its
+    exit with vectorized scans, so cost scales with the number of trades.
+    Returns a BacktestResult.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    entries = np.asarray(entries, dtype=bool)
+    exits = np.asarray(exits, dtype=bool)
+    n = len(close)
+
+    entry_indices = np.flatnonzero(entries).tolist()
+    close_list = close.tolist()
+    exits_list = exits.tolist()
+    trades = []
+    balance = float(initial_balance)
+    i = start
+
+    while True:
+        # Next bar at or after i with an entry signal
+        pos = bisect.bisect_left(entry_indices, i)
+        if pos >= len(entry_indices):
+            break
+        entry = entry_indices[pos]
+        entry_price = close_list[entry]
+        units = balance / entry_price
+
+        exit_index = _find_exit(close, exits, close_list, exits_list, entry + 1, entry_price, stop_loss, take_profit)
+        if exit_index is None:
+            trades.append(BacktestTrade(entry, entry_price, units=units))
+            break
+
+        exit_price = close_list[exit_index]
+        pct_change = (exit_price - entry_price) / entry_price
+        if stop_loss is not None and pct_change <= -stop_loss:
+            reason = 'stop_loss'
+        elif take_profit is not None and pct_change >= take_profit:
+            reason = 'take_profit'
+        else:
+            reason = 'signal'
+        balance = units * exit_price
+        trades.append(BacktestTrade(entry, entry_price, exit_index, exit_price, reason, balance, units))
+        i = exit_index + 1
+
+    return BacktestResult(trades, _equity_curve(close, trades, float(initial_balance)), float(initial_balance))
+
+def _equity_curve(close, trades, initial_balance):
+    """Per-bar equity: units held x close inside trades, cash in between."""
+    n = len(close)
+    if not trades:
+        return np.full(n, initial_balance)
+    entry = np.array([t.entry_index for t in trades])
+    exit = np.array([t.exit_index if t.exit_index is not None else n for t in trades])
+    units = np.array([t.units for t in trades])
+    cash_after = np.array([initial_balance] + [t.balance if t.balance is not None else 0.0 for t in trades])
+
+    # Index of the latest trade entered at or before each bar (-1 before the first)
+    trade = np.searchsorted(entry, np.arange(n), side='right') - 1
+    held = (trade >= 0) & (np.arange(n) < exit[trade])
+    return np.where(held, units[trade] * close, cash_after[trade + 1])
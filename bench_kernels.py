@@ -0,0 +1,104 @@
+"""
+Benchmarks the recursive-filter kernels against the loops they replaced, on
+five years of 1h candles (synthetic random walk unless --symbol data is in the
+candle store), and checks that the results match.
+
+    python bench_kernels.py
+    python bench_kernels.py --bars 100000 --repeat 5
+
+Also reports backtest_engine throughput (bars/s) on --backtest-bars bars.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import indicators
+import kernels
+
+FIVE_YEARS_1H = 5 * 365 * 24
+
+def legacy_kama_v2(df, n=10):
+    # research_v2's original loop: two pandas .iloc lookups per bar
+    change = abs(df['close'] - df['close'].shift(n))
+    volatility = df['close'].diff().abs().rolling(window=n).sum()
+    sc = (change / volatility * (2/(2+1) - 2/(30+1)) + 2/(30+1)) ** 2
+    kama = [df['close'].iloc[0]] * len(df)
+    for i in range(n, len(df)):
+        kama[i] = kama[i-1] + sc.iloc[i] * (df['close'].iloc[i] - kama[i-1])
+    return np.array(kama)
+
+def legacy_kama_multi_year(df, n=10):
+    # research_multi_year's original loop over NumPy arrays
+    er = (df['close'].diff(n).abs() / df['close'].diff().abs().rolling(window=n).sum()).fillna(0)
+    sc = ((er * (2.0 / 3.0 - 2.0 / 31.0) + 2.0 / 31.0) ** 2).values
+    closes = df['close'].values
+    kama = np.full(len(df), np.nan)
+    kama[n-1] = closes[n-1]
+    for i in range(n, len(df)):
+        kama[i] = kama[i-1] + sc[i] * (closes[i] - kama[i-1])
+    return kama
+
+def legacy_rsi(df, period=14):
+    delta = df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).ewm(com=period - 1, adjust=False).mean()
+    loss = (-delta.where(delta < 0, 0)).ewm(com=period - 1, adjust=False).mean()
+    return (100 - (100 / (1 + gain / loss))).values
+
+def random_walk(bars, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"close": 30000 * np.exp(np.cumsum(rng.normal(0, 0.006, bars)))})
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        indicators.INDICATOR_CACHE.clear()  # Time the computation, not the memo
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), np.asarray(result)
+
+def benchmark(df, repeat=3):
+    """Returns [(name, legacy_s, kernel_s, identical)]."""
+    cases = [
+        ("KAMA (research_v2)", lambda: legacy_kama_v2(df),
+         lambda: indicators.kama(df['close'], 10, seed='first', flat_er=None)),
+        ("KAMA (research_multi_year)", lambda: legacy_kama_multi_year(df),
+         lambda: indicators.kama(df['close'], 10)),
+        ("Wilder RSI (pandas ewm)", lambda: legacy_rsi(df),
+         lambda: indicators.rsi(df['close'], 14)),
+    ]
+    rows = []
+    for name, legacy, kernel in cases:
+        legacy_s, expected = best_of(legacy, 1 if "research_v2" in name else repeat)
+        kernel_s, got = best_of(kernel, repeat)
+        rows.append((name, legacy_s, kernel_s, np.array_equal(expected, got, equal_nan=True)))
+    return rows
+
+def backtest_throughput(bars, repeat=3):
+    """Bars per second through backtest.simulate (signals precomputed), and its trade count."""
+    df = backtest.calculate_indicators(random_walk(bars, seed=7))
+    seconds, _ = best_of(lambda: [backtest.simulate(df, 0.02, 0.04).final_equity], repeat)
+    return bars / seconds, backtest.simulate(df, 0.02, 0.04).trade_count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recursive-filter kernels.")
+    parser.add_argument("--bars", type=int, default=FIVE_YEARS_1H)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backtest-bars", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = random_walk(args.bars)
+    # Warm up (numba compiles on first call)
+    indicators.kama(df['close'].iloc[:100], 10)
+    indicators.rsi(df['close'].iloc[:100], 14)
+
+    print(f"--- {args.bars:,} bars, kernel backend: {kernels.BACKEND} ---")
+    print(f"{'Indicator':<28} | {'Before':>9} | {'After':>9} | {'Speedup':>8} | Identical")
+    for name, legacy_s, kernel_s, identical in benchmark(df, args.repeat):
+        print(f"{name:<28} | {legacy_s * 1000:>7.1f}ms | {kernel_s * 1000:>7.1f}ms | {legacy_s / kernel_s:>7.1f}x | {'✅' if identical else '❌'}")
+
+    bars_per_second, trades = backtest_throughput(args.backtest_bars, args.repeat)
+    print(f"--- Backtest engine: {args.backtest_bars:,} bars, {trades:,} orders: {bars_per_second / 1e6:.1f}M bars/s ---")
@@ -0,0 +1,200 @@
+import numbers
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import exchange_call
+from scheduler import timeframe_seconds
+
+CANDLE_STORE_PATH = os.getenv('CANDLE_STORE_PATH', 'candles.db')
+FETCH_LIMIT = 1000  # Binance's max candles per fetch_ohlcv
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    open_time INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    PRIMARY KEY (symbol, timeframe, open_time)
+) WITHOUT ROWID
+"""
+
+def to_ms(value):
+    """Epoch ms from ms, a datetime or a date string (naive = UTC); None stays None."""
+    if value is None:
+        return None
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    import pandas as pd
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return (ts - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+
+class CandleStore:
+    """
+    Local OHLCV store shared by the live engine and the research scripts.
+
+    Closed candles keyed by (symbol, timeframe, open_time) in a SQLite file.
+    `upsert()` is idempotent (re-writing a candle replaces it), `gaps()` finds
+    the missing candles in a range and `fill()` downloads only those. Bars
+    are ccxt-style lists: [open_time_ms, open, high, low, close, volume].
+    """
+
+    def __init__(self, path=None):
+        self.path = path or CANDLE_STORE_PATH
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Opened on first use, so importing/constructing the store costs nothing
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def upsert(self, symbol, timeframe, bars):
+        """Inserts or replaces candles. Returns how many were written."""
+        rows = [(symbol, timeframe, int(b[0]), float(b[1]), float(b[2]), float(b[3]), float(b[4]), float(b[5])) for b in bars]
+        if not rows:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (symbol, timeframe, open_time) DO UPDATE SET "
+                    "open=excluded.open, high=excluded.high, low=excluded.low, close=excluded.close, volume=excluded.volume",
+                    rows
+                )
+        return len(rows)
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def candles(self, symbol, timeframe, start=None, end=None):
+        """Candles with start <= open_time < end (ms, datetimes or date strings), oldest first."""
+        sql = "SELECT open_time, open, high, low, close, volume FROM candles WHERE symbol = ? AND timeframe = ?"
+        params = [symbol, timeframe]
+        if start is not None:
+            sql += " AND open_time >= ?"
+            params.append(to_ms(start))
+        if end is not None:
+            sql += " AND open_time < ?"
+            params.append(to_ms(end))
+        return [list(row) for row in self._query(sql + " ORDER BY open_time", params)]
+
+    def latest(self, symbol, timeframe, limit):
+        """The `limit` most recent candles, oldest first."""
+        rows = self._query(
+            "SELECT open_time, open, high, low, close, volume FROM candles WHERE symbol = ? AND timeframe = ? "
+            "ORDER BY open_time DESC LIMIT ?", (symbol, timeframe, limit))
+        return [list(row) for row in reversed(rows)]
+
+    def bounds(self, symbol, timeframe):
+        """(first_open_time, last_open_time, count), or (None, None, 0) when empty."""
+        return tuple(self._query(
+            "SELECT MIN(open_time), MAX(open_time), COUNT(*) FROM candles WHERE symbol = ? AND timeframe = ?",
+            (symbol, timeframe))[0])
+
+    def gaps(self, symbol, timeframe, start, end):
+        """
+        Missing candles in [start, end) as a list of (first_missing, last_missing)
+        open times in ms, inclusive.
+        """
+        step = timeframe_seconds(timeframe) * 1000
+        start, end = to_ms(start), to_ms(end)
+        start = -(-start // step) * step  # First candle slot at or after start
+        last_slot = (end - 1) // step * step  # Last candle slot before end
+        if start > last_slot:
+            return []
+        # Neighbouring stored candles more than one step apart, via a window over the index
+        rows = self._query(
+            "SELECT prev, open_time FROM ("
+            "  SELECT open_time, LAG(open_time) OVER (ORDER BY open_time) AS prev FROM candles"
+            "  WHERE symbol = ? AND timeframe = ? AND open_time >= ? AND open_time < ?"
+            ") WHERE prev IS NULL OR open_time - prev > ?",
+            (symbol, timeframe, start, end, step))
+        last = self._query(
+            "SELECT MAX(open_time) FROM candles WHERE symbol = ? AND timeframe = ? AND open_time >= ? AND open_time < ?",
+            (symbol, timeframe, start, end))[0][0]
+
+        if last is None:
+            return [(start, last_slot)]
+        gaps = []
+        for prev, open_time in rows:
+            if prev is None:
+                if open_time > start:
+                    gaps.append((start, open_time - step))
+            else:
+                gaps.append((prev + step, open_time - step))
+        if last < last_slot:
+            gaps.append((last + step, last_slot))
+        return gaps
+
+    def fill(self, exchange, symbol, timeframe, start, end=None, now=None):
+        """
+        Downloads only the candles missing from [start, end) (end defaults to now).
+        The still-forming candle is never stored. Returns how many candles were added.
+        """
+        step = timeframe_seconds(timeframe) * 1000
+        now_ms = int((now if now is not None else time.time()) * 1000)
+        closed_before = now_ms - now_ms % step  # Open time of the forming candle
+        end = min(to_ms(end), closed_before) if end is not None else closed_before
+        added = 0
+        for first, last in self.gaps(symbol, timeframe, start, end):
+            since = first
+            while since <= last:
+                bars = exchange_call(exchange, 'fetch_ohlcv', symbol, timeframe=timeframe, since=since, limit=FETCH_LIMIT)
+                bars = [b for b in bars if since <= b[0] <= last]
+                if not bars:
+                    break  # Nothing listed there (e.g. before the pair existed)
+                added += self.upsert(symbol, timeframe, bars)
+                since = bars[-1][0] + step
+        if added:
+            print(f"🗄️ Candle store: +{added} {symbol} {timeframe} candle(s)")
+        return added
+
+    def import_csv(self, filename, symbol, timeframe):
+        """Loads a download_data.py CSV into the store. Returns how many candles were written."""
+        import pandas as pd
+        df = pd.read_csv(filename)
+        ts = pd.to_datetime(df['timestamp'])
+        df['timestamp'] = (ts - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+        return self.upsert(symbol, timeframe, df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].values.tolist())
+
+    def frame(self, symbol, timeframe, start=None, end=None):
+        """Candles as a DataFrame shaped like the download_data.py CSVs (timestamp as datetime)."""
+        import pandas as pd
+        df = pd.DataFrame(self.candles(symbol, timeframe, start, end),
+                          columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+def load_history(symbol, timeframe, start=None, end=None, csv=None, store=None):
+    """
+    Historical candles for research scripts, from the candle store.
+    A legacy CSV (`csv`) is imported into the store the first time it is needed.
+    Raises ValueError when there is no data for the range.
+    """
+    store = store or CandleStore()
+    if csv and os.path.exists(csv) and not store.candles(symbol, timeframe, start, end):
+        print(f"Importing {csv} into the candle store...")
+        store.import_csv(csv, symbol, timeframe)
+    df = store.frame(symbol, timeframe, start, end)
+    if df.empty:
+        raise ValueError(f"No {symbol} {timeframe} candles stored for {start or 'start'} - {end or 'now'}. Run download_data.py first.")
+    return df
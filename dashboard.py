@@ -2,7 +2,10 @@ import streamlit as st
 import requests
 import pandas as pd
 import plotly.express as px
+from dashboard_data import ApiClient, TradeHistory
 import time
+import json
+import threading
 
 # --- Config ---
 # Default to the deployed Railway URL
@@ -13,21 +16,106 @@ st.set_page_config(page_title="Trading Bot Dashboard", layout="wide")
 st.title("🤖 Algo-Trading Command Center")
 
 # --- Helper Functions ---
+@st.cache_resource
+def get_api_client(api_url):
+    # One keep-alive session and response cache per API URL, shared by all sessions
+    return ApiClient(api_url)
+
+api = get_api_client(API_URL)
+
 def fetch_stats():
-    try:
-        response = requests.get(f"{API_URL}/stats", timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except:
-        return None
+    return api.stats()
 
-def fetch_trades():
-    try:
-        response = requests.get(f"{API_URL}/trades", timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except:
-        return []
+def get_trade_history():
+    # Per browser session: grows only by the trades it has not seen yet
+    if st.session_state.get("trade_history_url") != API_URL:
+        st.session_state.trade_history = TradeHistory()
+        st.session_state.trade_history_url = API_URL
+    return st.session_state.trade_history
+
+def parse_sse(lines):
+    """Yields (event, data, id) from the text lines of a server-sent events stream."""
+    event, data, event_id = "message", [], None
+    for line in lines:
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data)), event_id
+            event, data = "message", []
+        elif line.startswith(":"):
+            continue  # Keep-alive comment
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+            elif field == "id":
+                event_id = value
+
+class LiveState:
+    """
+    Follows the bot's /events stream in a background thread and keeps the latest
+    stats and trades. One per API URL, shared by every browser session.
+    """
+
+    def __init__(self, api_url, max_trades=10):
+        self.api_url = api_url
+        self.max_trades = max_trades
+        self.stats = None
+        self.trades = []
+        self.version = 0
+        self.connected = False
+        self.changed = threading.Condition()
+        threading.Thread(target=self._run, name="dashboard-events", daemon=True).start()
+
+    def _run(self):
+        last_id = None
+        backoff = 1
+        while True:
+            try:
+                headers = {"Last-Event-ID": last_id} if last_id else {}
+                with requests.get(f"{self.api_url}/events", stream=True, headers=headers, timeout=(5, 60)) as response:
+                    response.raise_for_status()
+                    self.connected = True
+                    backoff = 1
+                    for event, data, event_id in parse_sse(response.iter_lines(decode_unicode=True)):
+                        self._apply(event, data)
+                        last_id = event_id or last_id
+            except Exception:
+                pass
+            self.connected = False
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _apply(self, event, data):
+        if event == "snapshot":
+            # (Re)sync the trade list along with the full state
+            try:
+                trades = requests.get(f"{self.api_url}/trades", timeout=5).json()
+            except Exception:
+                trades = self.trades
+        with self.changed:
+            if event == "snapshot":
+                self.stats = data
+                self.trades = trades
+            elif event == "state":
+                self.stats = {**(self.stats or {}), **data}
+            elif event == "trade":
+                others = [t for t in self.trades if t.get('id') != data.get('id')]
+                self.trades = ([data] + others)[:self.max_trades]
+            self.version += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, seen_version, timeout):
+        """Blocks until there is something new to render (or `timeout`). Returns the version."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != seen_version, timeout)
+            return self.version
+
+@st.cache_resource
+def get_live_state(api_url):
+    return LiveState(api_url)
 
 def send_command(action):
     try:
@@ -74,8 +162,12 @@ if col2.button("🟢 Force BUY"):
     send_command("buy")
 
 st.sidebar.header("⚙️ Strategy Tuner")
+# Live state pushed by the bot (falls back to a one-off fetch until the stream is up)
+live = get_live_state(API_URL)
+stats = live.stats or fetch_stats()
+rendered_version = live.version
+
 # Fetch current config from stats to set default values
-stats = fetch_stats()
 if stats and 'config' in stats:
     current_buy = stats['config']['buy_rsi']
     current_sell = stats['config']['sell_rsi']
@@ -137,27 +229,37 @@ m4.metric("Win Rate", stats.get('win_rate', '0%'))
 
 # 2. Charts
 st.subheader("Recent Activity")
-trades_data = fetch_trades()
+history = get_trade_history()
 
-if trades_data:
-    df = pd.DataFrame(trades_data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    # Create Price Chart
-    fig = px.line(df, x='timestamp', y='price', title='Trade Execution Prices', markers=True)
+# Only ask the API for new trades when the push channel says there are some (or it is down)
+newest_pushed = max((t.get('id') or 0 for t in live.trades), default=0)
+if history.last_id is None or not live.connected or newest_pushed > history.last_id:
+    history.refresh(api)
+
+if not history.frame.empty:
+    df = history.frame
     
-    # Color markers by Side
-    colors = {'BUY': 'green', 'SELL': 'red'}
-    fig.update_traces(marker=dict(size=12, color=[colors.get(x, 'blue') for x in df['side']]))
+    # Rebuild the figure only when rows were added
+    cached = st.session_state.get("trade_chart")
+    if not cached or cached[0] != history.version:
+        # Create Price Chart
+        fig = px.line(df, x='timestamp', y='price', title='Trade Execution Prices', markers=True)
+        
+        # Color markers by Side
+        colors = {'BUY': 'green', 'SELL': 'red'}
+        fig.update_traces(marker=dict(size=12, color=[colors.get(x, 'blue') for x in df['side']]))
+        st.session_state.trade_chart = cached = (history.version, fig)
     
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(cached[1], use_container_width=True)
     
-    # Data Table
-    st.dataframe(df)
+    # Data Table (newest first)
+    st.dataframe(df.iloc[::-1])
 else:
     st.info("No recent trades found.")
 
-# Auto-Refresh
-if st.checkbox("Auto-Refresh Data (5s)", value=True):
-    time.sleep(5)
+# Live Updates: rerun only when the bot pushes a change
+if st.checkbox("Live Updates", value=True):
+    # Idle = blocked here; while the stream is down, rerun every 30s to use the fallback fetch
+    while live.wait_for_change(rendered_version, timeout=30) == rendered_version and live.connected:
+        pass
     st.rerun()
@@ -0,0 +1,119 @@
+import time
+
+import pandas as pd
+import requests
+
+TRADE_COLUMNS = ["id", "symbol", "side", "price", "amount", "profit", "strategy", "timestamp"]
+
+class TTLCache:
+    """Tiny time-based cache for API responses."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._entries = {}  # key -> (expires_at, value)
+
+    def get(self, key, loader, ttl):
+        entry = self._entries.get(key)
+        if entry and entry[0] > self.clock():
+            return entry[1]
+        value = loader()
+        self._entries[key] = (self.clock() + ttl, value)
+        return value
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+class ApiClient:
+    """
+    Dashboard access to the bot API over one keep-alive session.
+    /stats is cached for `stats_ttl` seconds and revalidated with its ETag, so
+    an unchanged state costs a 304 without a body.
+    """
+
+    def __init__(self, api_url, session=None, stats_ttl=2.0, clock=time.monotonic):
+        self.api_url = api_url.rstrip('/')
+        self.session = session or requests.Session()
+        self.stats_ttl = stats_ttl
+        self.cache = TTLCache(clock)
+        self._stats_etag = None
+        self._stats = None
+
+    def _load_stats(self):
+        headers = {"If-None-Match": self._stats_etag} if self._stats_etag else {}
+        response = self.session.get(f"{self.api_url}/stats", headers=headers, timeout=5)
+        if response.status_code == 304:
+            return self._stats
+        response.raise_for_status()
+        self._stats_etag = response.headers.get("ETag")
+        self._stats = response.json()
+        return self._stats
+
+    def stats(self):
+        try:
+            return self.cache.get("stats", self._load_stats, self.stats_ttl)
+        except Exception:
+            return None
+
+    def recent_trades(self, limit=10):
+        response = self.session.get(f"{self.api_url}/trades", params={"limit": limit}, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def trades_after(self, after_id, limit=500):
+        response = self.session.get(f"{self.api_url}/trades", params={"after_id": after_id, "limit": limit}, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+class TradeHistory:
+    """
+    Session-held trades frame that only ever grows by the trades it has not seen.
+
+    The first load takes the most recent `initial` trades; after that only
+    trades with an id above `last_id` are requested. `version` changes only
+    when rows were added, so charts can be rebuilt only on change. The frame
+    keeps at most `max_rows` rows.
+    """
+
+    def __init__(self, initial=200, max_rows=5000, page_size=500):
+        self.initial = initial
+        self.max_rows = max_rows
+        self.page_size = page_size
+        self.frame = pd.DataFrame(columns=TRADE_COLUMNS)
+        self.last_id = None
+        self.version = 0
+
+    def refresh(self, client):
+        """Pulls new trades from the API. Returns True if the frame changed."""
+        try:
+            if self.last_id is None:
+                trades = list(reversed(client.recent_trades(self.initial)))
+            else:
+                # Bounded per refresh; a long gap is caught up over the next refreshes
+                trades = []
+                for _ in range(max(1, self.max_rows // self.page_size)):
+                    after_id = trades[-1]['id'] if trades else self.last_id
+                    page = client.trades_after(after_id, self.page_size)
+                    trades.extend(page)
+                    if len(page) < self.page_size:
+                        break
+        except Exception:
+            return False
+        if self.last_id is None and not trades:
+            self.last_id = 0
+        return self.extend(trades)
+
+    def extend(self, trades):
+        """Appends the trades not seen yet (id above `last_id`). Returns True if the frame changed."""
+        new = [t for t in trades if t.get('id') is not None and t['id'] > (self.last_id or 0)]
+        if not new:
+            return False
+        rows = pd.DataFrame(new, columns=TRADE_COLUMNS)
+        rows['timestamp'] = pd.to_datetime(rows['timestamp'])
+        frame = rows if self.frame.empty else pd.concat([self.frame, rows], ignore_index=True)
+        self.frame = frame.tail(self.max_rows).reset_index(drop=True)
+        self.last_id = int(rows['id'].max())
+        self.version += 1
+        return True
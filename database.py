@@ -1,22 +1,48 @@
 import os
+import threading
 import dotenv
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, func
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Index, func, case, and_, or_, select, text
 from sqlalchemy.orm import declarative_base, sessionmaker
+import base64
 from datetime import datetime
+from metrics import timed_db
 
 # Load environment variables
 dotenv.load_dotenv()
 
-# Get Database URL
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("CRITICAL: DATABASE_URL is not set. Bot cannot run without durable storage.")
-
-# Setup SQLAlchemy
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Setup SQLAlchemy. The engine is created on first use, so importing this
+# module neither connects nor needs DATABASE_URL (tests, research scripts)
+_engine = None
+_engine_lock = threading.Lock()
+_sessions = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
+def get_engine():
+    """The process-wide engine. Raises ValueError if DATABASE_URL is not set."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                url = os.getenv("DATABASE_URL")
+                if not url:
+                    raise ValueError("CRITICAL: DATABASE_URL is not set. Bot cannot run without durable storage.")
+                _engine = create_engine(url)
+                _sessions.configure(bind=_engine)
+    return _engine
+
+def SessionLocal():
+    """New ORM session on the (lazily created) engine."""
+    get_engine()
+    return _sessions()
+
+def __getattr__(name):
+    # `from database import engine` / `database.DATABASE_URL` keep working, resolved on first access
+    if name == "engine":
+        return get_engine()
+    if name == "DATABASE_URL":
+        return os.getenv("DATABASE_URL")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 class Trade(Base):
     """
     Trade Model for storing transaction history.
@@ -24,7 +50,7 @@ class Trade(Base):
     __tablename__ = "trades"
 
     id = Column(Integer, primary_key=True, index=True)
-    symbol = Column(String, index=True)
+    symbol = Column(String)        # Indexed by ix_trades_symbol_timestamp_id
     side = Column(String)          # BUY or SELL
     price = Column(Float)
     amount = Column(Float)
@@ -32,23 +58,235 @@ class Trade(Base):
     strategy = Column(String)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Newest-first reads and keyset pages (get_recent_trades, query_trades, exports)
+        Index('ix_trades_timestamp_id', 'timestamp', 'id'),
+        # The same per symbol (get_latest_trade(symbol), /trades?symbol=)
+        Index('ix_trades_symbol_timestamp_id', 'symbol', 'timestamp', 'id'),
+        # Per-strategy aggregates (rebuild_trade_stats, /trades?strategy=)
+        Index('ix_trades_strategy_symbol', 'strategy', 'symbol'),
+    )
+
+class Position(Base):
+    """
+    Open position per symbol, maintained by log_trade in the same transaction
+    as the trade. Restoring state is a primary-key read instead of inferring
+    the position from the latest trade.
+    """
+    __tablename__ = "positions"
+
+    symbol = Column(String, primary_key=True)
+    entry_price = Column(Float, nullable=False)  # Volume-weighted over all BUYs still held
+    amount = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class JournalCheckpoint(Base):
+    """
+    Last trade-journal entry written to the database (see journal.py).
+    Updated in the same transaction as the trades it covers, so replaying the
+    journal after a crash never inserts a trade twice.
+    """
+    __tablename__ = "journal_checkpoints"
+
+    name = Column(String, primary_key=True)
+    seq = Column(Integer, nullable=False, default=0)
+
+class Migration(Base):
+    """
+    One-time data migrations already applied, written in the same transaction
+    as the migration itself (see backfill_positions).
+    """
+    __tablename__ = "migrations"
+
+    name = Column(String, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+class TradeStats(Base):
+    """
+    Running PnL aggregates per (strategy, symbol).
+    Updated by log_trade in the same transaction as the trade, so stats lookups
+    read a handful of rows instead of scanning the whole trades table.
+    """
+    __tablename__ = "trade_stats"
+
+    strategy = Column(String, primary_key=True)  # '' when the trade had no strategy
+    symbol = Column(String, primary_key=True)
+    total_trades = Column(Integer, nullable=False, default=0)
+    closed_trades = Column(Integer, nullable=False, default=0)  # Trades with realized profit
+    winning_trades = Column(Integer, nullable=False, default=0)
+    total_pnl = Column(Float, nullable=False, default=0.0)
+
+@timed_db('init_db')
 def init_db():
-    """Create tables in the database."""
+    """Create tables in the database. Raises ValueError if DATABASE_URL is not set."""
+    engine = get_engine()
     try:
         Base.metadata.create_all(bind=engine)
-        print(f"Database initialized at {DATABASE_URL}")
+        migrate_db()
+        print(f"Database initialized at {engine.url}")
     except Exception as e:
         print(f"Error initializing database: {e}")
 
+# Indexes older versions created that the current ones make redundant
+OBSOLETE_INDEXES = (
+    'ix_trades_symbol',  # Prefix of ix_trades_symbol_timestamp_id
+)
+
+def migrate_db():
+    """
+    Brings a database created by an older version up to the current schema.
+    create_all() only creates missing tables, so indexes added to existing
+    tables are created here; derived tables are then backfilled. Idempotent.
+    """
+    engine = get_engine()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as connection:
+        for name in OBSOLETE_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    backfill_trade_stats()
+    backfill_positions()
+
+def rebuild_trade_stats(session):
+    """Recomputes trade_stats from the full trades table (migration / repair only)."""
+    session.query(TradeStats).delete()
+    rows = session.query(
+        Trade.strategy,
+        Trade.symbol,
+        func.count(Trade.id),
+        func.count(Trade.profit),
+        func.sum(case((Trade.profit > 0, 1), else_=0)),
+        func.sum(Trade.profit),
+    ).group_by(Trade.strategy, Trade.symbol).all()
+    for strategy, symbol, total, closed, wins, pnl in rows:
+        session.add(TradeStats(
+            strategy=strategy or '',
+            symbol=symbol or '',
+            total_trades=total,
+            closed_trades=closed,
+            winning_trades=wins or 0,
+            total_pnl=pnl or 0.0
+        ))
+
+def backfill_trade_stats():
+    """Builds trade_stats for databases that predate it (no-op once populated)."""
+    session = SessionLocal()
+    try:
+        if session.query(TradeStats).first() is None and session.query(Trade.id).first() is not None:
+            rebuild_trade_stats(session)
+            session.commit()
+            print("📊 Backfilled trade_stats from trade history.")
+    except Exception as e:
+        print(f"Error backfilling trade stats: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+def rebuild_positions(session):
+    """Replays the trades table into positions (migration / repair only)."""
+    session.query(Position).delete()
+    positions = {}
+    rows = session.execute(
+        select(Trade.symbol, Trade.side, Trade.price, Trade.amount)
+        .order_by(Trade.id)
+        .execution_options(yield_per=1000)
+    )
+    for symbol, side, price, amount in rows:
+        held = positions.get(symbol)
+        positions[symbol] = _next_position(held, side, price or 0.0, amount or 0.0)
+    for symbol, held in positions.items():
+        if held:
+            session.add(Position(symbol=symbol, entry_price=held[0], amount=held[1]))
+
+def backfill_positions():
+    """
+    Builds positions for databases that predate it, once. An empty positions
+    table also just means the bot is flat, so the run is recorded in
+    migrations instead of being inferred from it.
+    """
+    session = SessionLocal()
+    try:
+        if session.get(Migration, 'positions_backfill') is None:
+            backfilled = session.query(Trade.id).first() is not None
+            if backfilled:
+                rebuild_positions(session)
+            session.add(Migration(name='positions_backfill'))
+            session.commit()
+            if backfilled:
+                print("📦 Backfilled positions from trade history.")
+    except Exception as e:
+        print(f"Error backfilling positions: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+def _next_position(held, side, price, amount):
+    """(entry_price, amount) after a fill, or None when flat. Same rules as Ledger._apply."""
+    if side == 'BUY':
+        if held:
+            total = held[1] + amount
+            entry = (held[0] * held[1] + price * amount) / total if total else price
+            return entry, total
+        return price, amount
+    if side == 'SELL' and held:
+        remaining = held[1] - amount
+        return (held[0], remaining) if remaining > 1e-12 else None
+    return held
+
+def _apply_positions(session, trades):
+    """Moves each symbol's positions row through the fills: one read and one write per symbol."""
+    rows, held = {}, {}
+    for trade in trades:
+        if not trade.symbol:
+            continue
+        if trade.symbol not in rows:
+            position = session.get(Position, trade.symbol, with_for_update=True)
+            rows[trade.symbol] = position
+            held[trade.symbol] = (position.entry_price, position.amount) if position else None
+        held[trade.symbol] = _next_position(held[trade.symbol], trade.side, trade.price or 0.0, trade.amount or 0.0)
+
+    for symbol, position in rows.items():
+        updated = held[symbol]
+        if updated is None:
+            if position is not None:
+                session.delete(position)
+        elif position is None:
+            session.add(Position(symbol=symbol, entry_price=updated[0], amount=updated[1]))
+        else:
+            position.entry_price, position.amount = updated
+
+def _apply_trade_stats(session, trades):
+    """Adds the trades to their (strategy, symbol) rows, each read or created once."""
+    rows = {}
+    for trade in trades:
+        key = (trade.strategy or '', trade.symbol or '')
+        stats = rows.get(key)
+        if stats is None:
+            stats = session.get(TradeStats, key, with_for_update=True)
+            if stats is None:
+                stats = TradeStats(strategy=key[0], symbol=key[1], total_trades=0, closed_trades=0, winning_trades=0, total_pnl=0.0)
+                session.add(stats)
+            rows[key] = stats
+
+        stats.total_trades += 1
+        if trade.profit is not None:
+            stats.closed_trades += 1
+            stats.total_pnl += trade.profit
+            if trade.profit > 0:
+                stats.winning_trades += 1
+
 def reset_db():
     """Drop and recreate all tables (Fresh Start)."""
     try:
+        engine = get_engine()
         Base.metadata.drop_all(bind=engine)
         Base.metadata.create_all(bind=engine)
-        print(f"⚠️  Database Wiped & Recreated at {DATABASE_URL}")
+        print(f"⚠️  Database Wiped & Recreated at {engine.url}")
     except Exception as e:
         print(f"Error resetting database: {e}")
 
+@timed_db('log_trade')
 def log_trade(trade_data):
     """
     Saves a trade to the database.
@@ -64,15 +302,9 @@ def log_trade(trade_data):
     """
     session = SessionLocal()
     try:
-        trade = Trade(
-            symbol=trade_data.get('symbol'),
-            side=trade_data.get('side'),
-            price=trade_data.get('price'),
-            amount=trade_data.get('amount'),
-            strategy=trade_data.get('strategy'),
-            profit=trade_data.get('profit')
-        )
+        trade = _new_trade(trade_data)
         session.add(trade)
+        _apply_trades(session, [trade])
         session.commit()
         session.refresh(trade)
         # print(f"✅ Trade logged to DB: ID {trade.id}")
@@ -83,31 +315,130 @@ def log_trade(trade_data):
     finally:
         session.close()
 
-def get_pnl_stats():
+def _new_trade(trade_data):
+    timestamp = trade_data.get('timestamp')
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return Trade(
+        symbol=trade_data.get('symbol'),
+        side=trade_data.get('side'),
+        price=trade_data.get('price'),
+        amount=trade_data.get('amount'),
+        strategy=trade_data.get('strategy'),
+        profit=trade_data.get('profit'),
+        timestamp=timestamp or datetime.utcnow()
+    )
+
+def _apply_trades(session, trades):
+    """
+    Derived tables updated in the same transaction as the trades. Rows are
+    tracked per batch, so the whole batch is written by the commit's single flush.
+    """
+    _apply_trade_stats(session, trades)
+    _apply_positions(session, trades)
+
+@timed_db('log_trades')
+def log_trades(trades_data, journal=None, journal_seq=None):
     """
-    Calculates statistics using direct SQL queries (efficient).
+    Saves a batch of trades in one transaction (multi-row INSERT, one commit).
+    With `journal`/`journal_seq`, that journal's checkpoint is moved to
+    `journal_seq` in the same transaction.
+    Returns the saved trades as dicts. Raises on failure (the caller retries).
+    """
+    session = SessionLocal()
+    try:
+        trades = [_new_trade(trade_data) for trade_data in trades_data]
+        session.add_all(trades)
+        _apply_trades(session, trades)
+        if journal is not None:
+            checkpoint = session.get(JournalCheckpoint, journal, with_for_update=True)
+            if checkpoint is None:
+                session.add(JournalCheckpoint(name=journal, seq=journal_seq))
+            else:
+                checkpoint.seq = journal_seq
+        session.commit()
+        return [trade_to_dict(trade) for trade in trades]
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def get_journal_checkpoint(journal):
+    """Last journal seq written to the database (0 if none). Raises on failure."""
+    session = SessionLocal()
+    try:
+        checkpoint = session.get(JournalCheckpoint, journal)
+        return checkpoint.seq if checkpoint else 0
+    finally:
+        session.close()
+
+@timed_db('get_pnl_stats')
+def get_pnl_stats(symbol=None, strategy=None):
+    """
+    Reads the running aggregates in trade_stats (O(1) in the size of the trade history),
+    optionally for one symbol and/or strategy.
     Returns (total_pnl, win_rate, total_closed_trades)
     """
+    total_pnl, total_closed, winning_trades = get_pnl_counts(symbol, strategy)
+    win_rate = (winning_trades / total_closed * 100) if total_closed > 0 else 0.0
+    return total_pnl, win_rate, total_closed
+
+@timed_db('get_pnl_counts')
+def get_pnl_counts(symbol=None, strategy=None):
+    """
+    Same aggregates as get_pnl_stats() with the raw counts.
+    Returns (total_pnl, closed_trades, winning_trades)
+    """
     session = SessionLocal()
     try:
-        # 1. Total P&L (Sum of profit column)
-        total_pnl = session.query(func.sum(Trade.profit)).filter(Trade.profit != None).scalar() or 0.0
-        
-        # 2. Counts
-        total_closed = session.query(func.count(Trade.id)).filter(Trade.profit != None).scalar() or 0
-        winning_trades = session.query(func.count(Trade.id)).filter(Trade.profit > 0).scalar() or 0
-        
-        # 3. Win Rate
-        win_rate = (winning_trades / total_closed * 100) if total_closed > 0 else 0.0
-        
-        return total_pnl, win_rate, total_closed
+        query = session.query(
+            func.sum(TradeStats.total_pnl),
+            func.sum(TradeStats.closed_trades),
+            func.sum(TradeStats.winning_trades),
+        )
+        if symbol is not None:
+            query = query.filter(TradeStats.symbol == symbol)
+        if strategy is not None:
+            query = query.filter(TradeStats.strategy == strategy)
+        total_pnl, total_closed, winning_trades = query.one()
+        return total_pnl or 0.0, total_closed or 0, winning_trades or 0
         
     except Exception as e:
         print(f"Error fetching DB stats: {e}")
-        return 0.0, 0.0, 0
+        return 0.0, 0, 0
+    finally:
+        session.close()
+
+@timed_db('get_open_positions')
+def get_open_positions():
+    """
+    All open positions as {symbol: {"entry_price": float, "amount": float}}.
+    One read of the positions table, independent of the trade history size.
+    """
+    session = SessionLocal()
+    try:
+        return {p.symbol: {"entry_price": p.entry_price, "amount": p.amount} for p in session.query(Position).all()}
+    except Exception as e:
+        print(f"Error fetching open positions: {e}")
+        return {}
     finally:
         session.close()
 
+def trade_to_dict(t):
+    """API shape of a Trade row."""
+    return {
+        "id": t.id,
+        "symbol": t.symbol,
+        "side": t.side,
+        "price": t.price,
+        "amount": t.amount,
+        "profit": t.profit,
+        "strategy": t.strategy,
+        "timestamp": t.timestamp.isoformat()
+    }
+
+@timed_db('get_recent_trades')
 def get_recent_trades(limit=10):
     """
     Fetch the last N trades from the database.
@@ -115,34 +446,106 @@ def get_recent_trades(limit=10):
     """
     session = SessionLocal()
     try:
-        trades = session.query(Trade).order_by(Trade.timestamp.desc()).limit(limit).all()
-        result = []
-        for t in trades:
-            result.append({
-                "id": t.id,
-                "symbol": t.symbol,
-                "side": t.side,
-                "price": t.price,
-                "amount": t.amount,
-                "profit": t.profit,
-                "strategy": t.strategy,
-                "timestamp": t.timestamp.isoformat()
-            })
-        return result
+        trades = session.query(Trade).order_by(Trade.timestamp.desc(), Trade.id.desc()).limit(limit).all()
+        return [trade_to_dict(t) for t in trades]
     except Exception as e:
         print(f"Error fetching recent trades: {e}")
         return []
     finally:
         session.close()
 
-def get_latest_trade():
+@timed_db('get_trades_after')
+def get_trades_after(after_id, limit=100):
+    """
+    Trades with an id greater than `after_id`, oldest first.
+    Lets clients fetch only what they have not seen yet.
+    """
+    session = SessionLocal()
+    try:
+        trades = session.query(Trade).filter(Trade.id > after_id).order_by(Trade.id).limit(limit).all()
+        return [trade_to_dict(t) for t in trades]
+    except Exception as e:
+        print(f"Error fetching trades after {after_id}: {e}")
+        return []
+    finally:
+        session.close()
+
+def encode_cursor(trade):
+    """Opaque keyset cursor for a Trade: its (timestamp, id)."""
+    raw = f"{trade.timestamp.isoformat()}|{trade.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """(timestamp, id) from a cursor. Raises ValueError if it is malformed."""
+    try:
+        timestamp, trade_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(trade_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def _filtered_trades(symbol=None, side=None, strategy=None, start=None, end=None):
+    stmt = select(Trade)
+    if symbol:
+        stmt = stmt.where(Trade.symbol == symbol)
+    if side:
+        stmt = stmt.where(Trade.side == side)
+    if strategy:
+        stmt = stmt.where(Trade.strategy == strategy)
+    if start:
+        stmt = stmt.where(Trade.timestamp >= start)
+    if end:
+        stmt = stmt.where(Trade.timestamp < end)
+    return stmt
+
+@timed_db('query_trades')
+def query_trades(cursor=None, limit=100, **filters):
+    """
+    One page of trades, newest first, keyset-paginated on (timestamp, id).
+    Filters: symbol, side, strategy, start, end (timestamp range, end exclusive).
+    Returns (trades, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for a malformed cursor.
+    """
+    session = SessionLocal()
+    try:
+        stmt = _filtered_trades(**filters)
+        if cursor:
+            timestamp, trade_id = decode_cursor(cursor)
+            # Rows strictly after the cursor in (timestamp DESC, id DESC) order
+            stmt = stmt.where(or_(Trade.timestamp < timestamp, and_(Trade.timestamp == timestamp, Trade.id < trade_id)))
+        rows = session.scalars(stmt.order_by(Trade.timestamp.desc(), Trade.id.desc()).limit(limit + 1)).all()
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return [trade_to_dict(t) for t in rows[:limit]], next_cursor
+    finally:
+        session.close()
+
+def iter_trades(batch_size=1000, **filters):
+    """
+    Yields every matching trade (oldest first) as a dict, streaming from a
+    server-side cursor in batches of `batch_size`, so memory stays constant
+    however many rows match. Same filters as query_trades().
+    """
+    session = SessionLocal()
+    try:
+        stmt = (_filtered_trades(**filters)
+                .order_by(Trade.timestamp, Trade.id)
+                .execution_options(stream_results=True, yield_per=batch_size))
+        for trade in session.scalars(stmt):
+            yield trade_to_dict(trade)
+    finally:
+        session.close()
+
+@timed_db('get_latest_trade')
+def get_latest_trade(symbol=None):
     """
-    Fetch the single most recent trade.
+    Fetch the single most recent trade, optionally for one symbol.
     Returns Trade object or None.
     """
     session = SessionLocal()
     try:
-        trade = session.query(Trade).order_by(Trade.timestamp.desc()).first()
+        query = session.query(Trade)
+        if symbol:
+            query = query.filter(Trade.symbol == symbol)
+        trade = query.order_by(Trade.timestamp.desc(), Trade.id.desc()).first()
         if trade:
              # Detach from session to use after close
              session.expunge(trade)
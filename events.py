@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+from collections import deque
+
+class Event:
+    """A published change, encoded once as a server-sent event."""
+    __slots__ = ('id', 'kind', 'data', 'encoded')
+
+    def __init__(self, id, kind, data):
+        self.id = id
+        self.kind = kind
+        self.data = data
+        self.encoded = format_sse(kind, data, id)
+
+def format_sse(kind, data, id=None):
+    lines = []
+    if id is not None:
+        lines.append(f"id: {id}")
+    lines.append(f"event: {kind}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+class Subscription:
+    """One connected client: a bounded queue fed from the broker on its event loop."""
+
+    def __init__(self, loop, max_pending):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def offer(self, event):
+        # Runs on the subscriber's loop. A client too slow to keep up gets a resync (None)
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+class EventBroker:
+    """
+    Fan-out of state changes (trades, RSI, balances, pause state) to push clients.
+
+    `publish()` may be called from any thread (the engine publishes from its
+    worker thread); delivery to each subscriber is scheduled on that
+    subscriber's event loop. Recent events are kept so a reconnecting client
+    can resume from its Last-Event-ID without missing anything.
+    """
+
+    def __init__(self, history=256, max_pending=1000):
+        self.history = deque(maxlen=history)
+        self.max_pending = max_pending
+        self.last_id = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, kind, data):
+        with self._lock:
+            self.last_id += 1
+            event = Event(self.last_id, kind, data)
+            self.history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The client's loop is gone
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, last_event_id=None):
+        """
+        Registers a subscriber on the running loop.
+        Returns (subscription, replay): the missed events since `last_event_id`, or
+        None when they are no longer in the history and the client needs a full state.
+        """
+        subscription = Subscription(asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+            replay = None
+            if last_event_id is not None:
+                oldest = self.history[0].id if self.history else self.last_id + 1
+                # Ids above ours come from a previous process: those clients need a full state too
+                if oldest - 1 <= last_event_id <= self.last_id:
+                    replay = [event for event in self.history if event.id > last_event_id]
+        return subscription, replay
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
@@ -0,0 +1,69 @@
+"""
+Import-time report: what importing a module costs, and which packages it pulls in.
+
+    python import_report.py main                 # Top 15 imports by cumulative time
+    python import_report.py main --budget-ms 1500 --forbid ccxt,pandas,uvicorn
+
+Exits with status 1 when the budget is exceeded or a forbidden package is
+imported, so startup regressions can be caught in CI.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+def import_times(module, env=None):
+    """
+    Imports `module` in a fresh interpreter with `-X importtime`.
+    Returns [(name, self_us, cumulative_us)] in import order.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env={**os.environ, **(env or {})},
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+def top_level_packages(times):
+    return {name.split(".")[0] for name, _, _ in times}
+
+def report(module, top=15, budget_ms=None, forbid=(), env=None):
+    """Prints the report. Returns a list of problems (empty when within budget)."""
+    times = import_times(module, env)
+    total_ms = next((cumulative for name, _, cumulative in times if name == module), 0) / 1000
+
+    print(f"--- import {module}: {total_ms:.0f}ms ---")
+    print(f"{'Cumulative':>11} | {'Self':>8} | Module")
+    for name, self_us, cumulative_us in sorted(times, key=lambda t: t[2], reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>9.1f}ms | {self_us / 1000:>6.1f}ms | {name}")
+
+    problems = []
+    if budget_ms is not None and total_ms > budget_ms:
+        problems.append(f"import {module} took {total_ms:.0f}ms (budget {budget_ms:.0f}ms)")
+    imported = top_level_packages(times)
+    for package in forbid:
+        if package in imported:
+            problems.append(f"import {module} pulled in {package}")
+    for problem in problems:
+        print(f"❌ {problem}")
+    return problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report what importing a module costs.")
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if the import takes longer")
+    parser.add_argument("--forbid", default="", help="Comma-separated packages that must not be imported")
+    args = parser.parse_args()
+
+    forbid = [p.strip() for p in args.forbid.split(",") if p.strip()]
+    sys.exit(1 if report(args.module, args.top, args.budget_ms, forbid) else 0)
@@ -0,0 +1,230 @@
+import functools
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+
+class WilderRSI:
+    """
+    Incremental Wilder RSI.
+
+    Keeps the running average gain/loss of *closed* bars so each new bar is an
+    O(1) update instead of a full `ewm` pass. `peek()` evaluates a still-forming
+    bar provisionally without committing it to the state.
+    Matches `ewm(com=period - 1, adjust=False)` over the same closes.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.alpha = 1.0 / period
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.last_close = None
+        self.value = float('nan')
+
+    def _next(self, close):
+        # The first diff is NaN, which `delta.where(...)` turns into 0
+        if self.last_close is None:
+            return 0.0, 0.0
+
+        delta = close - self.last_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        avg_gain = (1 - self.alpha) * self.avg_gain + self.alpha * gain
+        avg_loss = (1 - self.alpha) * self.avg_loss + self.alpha * loss
+        return avg_gain, avg_loss
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else float('nan')
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+    def update(self, close):
+        """Commit a closed bar. Returns the RSI as of that bar."""
+        self.avg_gain, self.avg_loss = self._next(close)
+        self.last_close = close
+        self.value = self._rsi(self.avg_gain, self.avg_loss)
+        return self.value
+
+    def peek(self, close):
+        """RSI if the current (forming) bar closed at `close`. State is untouched."""
+        avg_gain, avg_loss = self._next(close)
+        return self._rsi(avg_gain, avg_loss)
+
+# --- Batch indicators ---
+# Whole-series indicators for backtests and research. Results are memoized by
+# (data fingerprint, indicator, params) in INDICATOR_CACHE, so a sweep that asks
+# for RSI(14) of the same closes a hundred times computes it once.
+# pandas/numpy are imported on first use: the live engine only needs WilderRSI.
+
+class IndicatorCache:
+    """
+    LRU cache of indicator results, bounded by the bytes of the arrays it holds.
+    Cached arrays are read-only, so a caller cannot corrupt them for the next one.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> tuple of arrays
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, compute):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = compute()
+        for array in value:
+            array.setflags(write=False)
+        size = sum(array.nbytes for array in value)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = value
+                self.nbytes += size
+                while self.nbytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.nbytes -= sum(array.nbytes for array in evicted)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+INDICATOR_CACHE = IndicatorCache()
+
+def fingerprint(*arrays):
+    """Content hash of the input arrays (dtype, shape and values)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        digest.update(f"{array.dtype}{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def indicator(inputs=1):
+    """
+    Makes `fn(*series, **params)` a memoized indicator. The first `inputs`
+    arguments are the data (pandas Series or arrays); `fn` receives them as
+    Series and returns a Series or a tuple of Series. Callers get Series
+    aligned with their input's index (arrays for array input).
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            import numpy as np
+            import pandas as pd
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            values = list(bound.arguments.values())
+            data, params = values[:inputs], tuple(list(bound.arguments.items())[inputs:])
+            index = data[0].index if isinstance(data[0], pd.Series) else None
+            arrays = [np.ascontiguousarray(np.asarray(d, dtype=np.float64)) for d in data]
+
+            def compute():
+                result = fn(*(pd.Series(a) for a in arrays), *[v for _, v in params])
+                results = result if isinstance(result, tuple) else (result,)
+                return tuple(np.asarray(r, dtype=np.float64).copy() for r in results)
+
+            key = (fingerprint(*arrays), fn.__name__, params)
+            results = INDICATOR_CACHE.get(key, compute)
+            if index is not None:
+                results = tuple(pd.Series(r, index=index) for r in results)
+            return results if len(results) > 1 else results[0]
+        return wrapper
+    return decorator
+
+@indicator()
+def rsi(close, period=14):
+    """Wilder RSI (same as WilderRSI, over a whole series)."""
+    import numpy as np
+    import kernels
+    delta = close.diff()
+    gain = kernels.ema(delta.where(delta > 0, 0).values, com=period - 1)
+    loss = kernels.ema((-delta.where(delta < 0, 0)).values, com=period - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+@indicator()
+def sma(close, window=20):
+    return close.rolling(window=window).mean()
+
+@indicator()
+def rolling_std(close, window=20):
+    return close.rolling(window=window).std()
+
+@indicator()
+def bollinger(close, window=20, num_std=2):
+    """(mid, upper, lower) bands."""
+    mid = close.rolling(window=window).mean()
+    std = close.rolling(window=window).std()
+    return mid, mid + (num_std * std), mid - (num_std * std)
+
+@indicator()
+def macd(close, fast=12, slow=26, signal=9):
+    """(macd, signal) lines."""
+    import kernels
+    k = kernels.ema(close.values, com=(fast - 1) / 2.0, min_periods=fast)
+    d = kernels.ema(close.values, com=(slow - 1) / 2.0, min_periods=slow)
+    line = k - d
+    return line, kernels.ema(line, com=(signal - 1) / 2.0, min_periods=signal)
+
+@indicator()
+def zscore(close, window=20):
+    """Distance from the rolling mean in rolling standard deviations."""
+    mean = close.rolling(window=window).mean()
+    std = close.rolling(window=window).std()
+    return (close - mean) / std
+
+@indicator(inputs=3)
+def atr(high, low, close, period=14):
+    """Average true range (simple rolling mean of the true range)."""
+    import pandas as pd
+    prev_close = close.shift()
+    true_range = pd.concat([abs(high - low), abs(high - prev_close), abs(low - prev_close)], axis=1).max(axis=1)
+    return true_range.rolling(window=period).mean()
+
+@indicator()
+def kama(close, n=10, fast=2, slow=30, seed='window', flat_er=0.0):
+    """
+    Kaufman adaptive moving average.
+
+    seed='window': NaN for the first n-1 bars, seeded with the close of bar n-1.
+    seed='first': bars up to n-1 hold the first close (research_v2's original loop).
+    `flat_er` is the efficiency of a window with no movement (0/0); with None it
+    stays NaN, and KAMA is NaN from there on.
+    """
+    import kernels
+    change = close.diff(n).abs()
+    volatility = close.diff().abs().rolling(window=n).sum()
+    er = change / volatility
+    if flat_er is not None:
+        er = er.fillna(flat_er)
+    fast_sc = 2.0 / (fast + 1.0)
+    slow_sc = 2.0 / (slow + 1.0)
+    sc = ((er * (fast_sc - slow_sc) + slow_sc) ** 2).values
+
+    closes = close.values
+    if seed == 'first':
+        return kernels.adaptive_filter(closes, sc, start=n - 1, seed=closes[0] if len(closes) else None)
+    out = kernels.adaptive_filter(closes, sc, start=n - 1)
+    out[:n - 1] = float('nan')
+    return out
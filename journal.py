@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from database import log_trades, get_journal_checkpoint
+from metrics import JOURNAL_PENDING, JOURNAL_BATCH_SIZE
+
+FSYNC_POLICIES = ('always', 'batch', 'off')
+
+class TradeJournal:
+    """
+    Write-behind log for trades.
+
+    `append()` writes the trade to a local append-only file and returns; a
+    background writer then saves pending trades to the database in batches,
+    one transaction per batch (group commit). The batch also moves this
+    journal's checkpoint, so after a crash `open()` replays exactly the
+    entries the database does not have yet.
+
+    fsync policy:
+      always - every append is on disk before it returns (concurrent appends share one fsync)
+      batch  - the file is synced before each database batch (a crash can lose the last few ms)
+      off    - left to the OS
+    """
+
+    def __init__(self, path, fsync='batch', batch_size=500, retry_delay=1.0, name=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy: {fsync}. Use one of {', '.join(FSYNC_POLICIES)}.")
+        self.path = path
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.name = name or os.path.basename(path)
+        self.on_flush = []  # Called with the saved trades (API dicts) after every batch
+        self.flushed_seq = 0
+        self._seq = 0
+        self._synced_seq = 0
+        self._pending = []  # (seq, trade_data), oldest first
+        self._file = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    def holding(self):
+        """
+        Lock that keeps the writer from saving a batch while held, so the
+        database and `pending` can be read as one consistent state.
+        """
+        return self._flush_lock
+
+    @property
+    def pending(self):
+        """Trades appended but not yet in the database, oldest first."""
+        with self._lock:
+            return [trade for _, trade in self._pending]
+
+    def open(self):
+        """
+        Opens the log and queues the entries the database does not have yet
+        (crash recovery). Returns those trades.
+        """
+        checkpoint = get_journal_checkpoint(self.name)
+        entries = []
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break  # Torn last line from a crash mid-write
+        pending = [(entry['seq'], entry['trade']) for entry in entries if entry['seq'] > checkpoint]
+
+        with self._lock:
+            self._seq = max([checkpoint] + [seq for seq, _ in pending])
+            self._synced_seq = self._seq
+            self.flushed_seq = checkpoint
+            self._pending = pending
+            self._rewrite(pending)
+            JOURNAL_PENDING.set(len(pending))
+
+        if pending:
+            print(f"📒 Replaying {len(pending)} journaled trade(s) not yet in the database")
+        return [trade for _, trade in pending]
+
+    def _rewrite(self, entries):
+        """Replaces the file with `entries` (drops flushed entries and any torn tail)."""
+        if self._file:
+            self._file.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for seq, trade in entries:
+                f.write(self._encode(seq, trade))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a')
+
+    @staticmethod
+    def _encode(seq, trade):
+        return json.dumps({"seq": seq, "trade": trade}, default=str) + "\n"
+
+    def append(self, trade_data):
+        """Journals a trade for the database. Returns the journaled copy (timestamped)."""
+        trade = dict(trade_data)
+        trade.setdefault('timestamp', datetime.utcnow().isoformat())
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._file.write(self._encode(seq, trade))
+            self._file.flush()
+            self._pending.append((seq, trade))
+            JOURNAL_PENDING.set(len(self._pending))
+            self._wakeup.notify()
+        if self.fsync == 'always':
+            self._sync(seq)
+        return trade
+
+    def _sync(self, seq):
+        """Group fsync: one caller syncs everything written so far, the ones queued behind it find their seq covered."""
+        with self._sync_lock:
+            if self._synced_seq >= seq:
+                return
+            with self._lock:
+                target = self._seq
+                fileno = self._file.fileno()
+            os.fsync(fileno)
+            self._synced_seq = target
+
+    def flush(self):
+        """
+        Saves every pending trade to the database, in batches of `batch_size`.
+        Returns the number saved. Raises if the database write fails (the
+        entries stay pending and in the file).
+        """
+        saved_count = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.batch_size]
+                if not batch:
+                    return saved_count
+                last_seq = batch[-1][0]
+                if self.fsync == 'batch':
+                    self._sync(last_seq)
+
+                saved = log_trades([trade for _, trade in batch], journal=self.name, journal_seq=last_seq)
+                JOURNAL_BATCH_SIZE.observe(len(batch))
+
+                with self._lock:
+                    del self._pending[:len(batch)]
+                    self.flushed_seq = last_seq
+                    if not self._pending:
+                        # Everything is in the database: start the file over
+                        self._file.seek(0)
+                        self._file.truncate()
+                    JOURNAL_PENDING.set(len(self._pending))
+
+                for listener in self.on_flush:
+                    try:
+                        listener(saved)
+                    except Exception as e:
+                        print(f"Journal listener failed: {e}")
+                saved_count += len(saved)
+
+    def start(self):
+        """Starts the background writer."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._stopping:
+                    self._wakeup.wait()
+                if self._stopping:
+                    return
+            # No artificial delay: trades appended while a batch is being
+            # written are picked up together by the next one
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Trade journal: database write failed, retrying in {self.retry_delay}s: {e}")
+                time.sleep(self.retry_delay)
+
+    def close(self, timeout=10):
+        """Stops the writer after a last flush. Anything still unsaved stays journaled for the next open()."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ Trade journal: {len(self._pending)} trade(s) left for replay on restart: {e}")
+        with self._lock:
+            if self._file:
+                if self.fsync != 'off':
+                    os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
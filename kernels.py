@@ -0,0 +1,95 @@
+"""
+Kernels for path-dependent (recursive) filters: KAMA-style adaptive smoothing,
+Wilder smoothing and EMAs. Each bar depends on the previous output, so these
+cannot be vectorized; they are written as plain loops over arrays instead.
+
+With numba installed the loops are JIT-compiled to native code. Without it,
+the same loops run over Python floats (`tolist()`), which avoids per-element
+pandas/NumPy indexing and gives bit-identical results. numba is optional and
+not in requirements.txt.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKEND = "numba" if numba is not None else "python"
+
+def _adaptive_loop(values, alpha, out, start):
+    for i in range(start + 1, len(values)):
+        out[i] = out[i - 1] + alpha[i] * (values[i] - out[i - 1])
+    return out
+
+def _ema_loop(values, out, alpha, min_periods):
+    # Same arithmetic as pandas' ewm(adjust=False, ignore_na=False), NaNs included
+    old_wt_factor = 1.0 - alpha
+    new_wt = alpha
+    weighted = values[0]
+    nobs = 1 if weighted == weighted else 0
+    out[0] = weighted if nobs >= min_periods else np.nan
+    old_wt = 1.0
+    for i in range(1, len(values)):
+        cur = values[i]
+        is_observation = cur == cur
+        if is_observation:
+            nobs += 1
+        if weighted == weighted:
+            old_wt *= old_wt_factor
+            if is_observation:
+                if weighted != cur:
+                    weighted = old_wt * weighted + new_wt * cur
+                    weighted /= old_wt + new_wt
+                old_wt = 1.0
+        elif is_observation:
+            weighted = cur
+        out[i] = weighted if nobs >= min_periods else np.nan
+    return out
+
+_COMPILED = {}
+
+def _run(loop, arrays, *args, backend=None):
+    """Runs `loop(*arrays, *args)` on the compiled or Python backend; returns its output array."""
+    backend = backend or BACKEND
+    if backend == "numba":
+        if loop not in _COMPILED:
+            _COMPILED[loop] = numba.njit(cache=True, nogil=True)(loop)
+        arrays = [np.ascontiguousarray(a, dtype=np.float64) for a in arrays]
+        return _COMPILED[loop](*arrays, *args)
+    return np.array(loop(*(np.asarray(a, dtype=np.float64).tolist() for a in arrays), *args), dtype=np.float64)
+
+def adaptive_filter(values, alpha, start=0, seed=None, backend=None):
+    """
+    out[i] = out[i-1] + alpha[i] * (values[i] - out[i-1]) for i > start.
+
+    `out[start]` is `seed` (default values[start]); bars before `start` hold
+    `seed` too. A NaN in `alpha` propagates to every later bar.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if seed is None:
+        if start >= len(values):
+            return out
+        seed = values[start]
+    out[:start + 1] = seed
+    return _run(_adaptive_loop, (values, alpha, out), start, backend=backend)
+
+def ema(values, com, min_periods=0, backend=None):
+    """
+    Exponential smoothing equal to pandas'
+    `ewm(com=com, adjust=False, min_periods=min_periods).mean()`.
+    Wilder smoothing over `period` bars is com = period - 1; a span is
+    com = (span - 1) / 2.
+
+    pandas' ewm is already compiled, so without numba it is used directly.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if (backend or BACKEND) != "numba":
+        import pandas as pd
+        return pd.Series(values).ewm(com=com, adjust=False, min_periods=min_periods).mean().values
+    out = np.empty(len(values))
+    if not len(values):
+        return out
+    alpha = 1.0 / (1.0 + com)
+    return _run(_ema_loop, (values, out), alpha, max(int(min_periods), 1), backend=backend)
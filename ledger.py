@@ -0,0 +1,137 @@
+import threading
+from contextlib import nullcontext
+
+from database import log_trade, get_pnl_counts, get_open_positions, trade_to_dict
+
+class Ledger:
+    """
+    In-memory open positions and realized PnL aggregates.
+
+    Loaded from the database once at startup and then the source of truth for
+    the hot path: `record()` writes each trade through to the database and
+    applies it in memory, so risk checks, sizing and stats never query the DB.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.listeners = []  # Called with the recorded trade (API dict) once it is in the database
+        self.journal = None  # Write-behind TradeJournal; None writes each trade straight to the DB
+        self.reset()
+
+    def attach_journal(self, journal):
+        """
+        Makes record() write-behind: trades go to `journal`, which saves them to
+        the database in batches; listeners are called as the batches land.
+        """
+        with self._lock:
+            journal.on_flush.append(self._notify_saved)
+            self.journal = journal
+
+    def reset(self):
+        with self._lock:
+            self.positions = {}  # symbol -> {"entry_price": float, "amount": float}
+            self.total_pnl = 0.0
+            self.closed_trades = 0
+            self.winning_trades = 0
+            self.loaded = False
+
+    def load(self, symbols):
+        """Rebuilds state from the database (startup only)."""
+        # A batch landing between the DB reads and `pending` would be missed or
+        # counted twice: hold the writer for the whole read (before the ledger
+        # lock, which flush listeners take)
+        with (self.journal.holding() if self.journal is not None else nullcontext()), self._lock:
+            self.reset()
+            self.total_pnl, self.closed_trades, self.winning_trades = get_pnl_counts()
+
+            open_positions = get_open_positions()
+            for symbol in symbols:
+                position = open_positions.get(symbol)
+                if position:
+                    self.set_position(symbol, position['entry_price'], position['amount'])
+                    print(f"🔄 Restored State [{symbol}]: IN_POSITION (Entry: ${position['entry_price']:,.2f}, Amount: {position['amount']:.5f})")
+                else:
+                    print(f"🔄 Restored State [{symbol}]: NEUTRAL (No open positions found in DB)")
+            if self.journal is not None:
+                # Fills that are journaled but not yet in the database
+                for trade_data in self.journal.pending:
+                    self._apply(trade_data)
+            self.loaded = True
+
+    def set_position(self, symbol, entry_price, amount):
+        with self._lock:
+            self.positions[symbol] = {"entry_price": entry_price, "amount": amount}
+
+    def position(self, symbol):
+        """Open position for `symbol` as {"entry_price", "amount"}, or None."""
+        with self._lock:
+            position = self.positions.get(symbol)
+            return dict(position) if position else None
+
+    def pnl_stats(self):
+        """Same shape as database.get_pnl_stats(): (total_pnl, win_rate, total_closed_trades)."""
+        with self._lock:
+            win_rate = (self.winning_trades / self.closed_trades * 100) if self.closed_trades > 0 else 0.0
+            return self.total_pnl, win_rate, self.closed_trades
+
+    def record(self, trade_data):
+        """
+        Writes a trade through to the database and applies it in memory.
+        Memory is updated even if the DB write fails, because the fill happened.
+        With a journal attached the trade is only journaled here (no database
+        round trip) and None is returned.
+        """
+        with self._lock:
+            if self.journal is not None:
+                self.journal.append(trade_data)
+                self._apply(trade_data)
+                return None
+            trade = log_trade(trade_data)
+            if trade is None:
+                print(f"⚠️ Trade kept in memory only (DB write failed): {trade_data}")
+            self._apply(trade_data)
+
+        recorded = trade_to_dict(trade) if trade is not None else dict(trade_data)
+        self._notify_saved([recorded])
+        return trade
+
+    def _notify_saved(self, trades):
+        for recorded in trades:
+            for listener in self.listeners:
+                try:
+                    listener(recorded)
+                except Exception as e:
+                    print(f"Trade listener failed: {e}")
+
+    def _apply(self, trade_data):
+        symbol = trade_data.get('symbol')
+        amount = trade_data.get('amount') or 0.0
+        price = trade_data.get('price') or 0.0
+        profit = trade_data.get('profit')
+
+        if trade_data.get('side') == 'BUY':
+            held = self.positions.get(symbol)
+            if held:
+                # Averaging in: volume-weighted entry
+                total = held['amount'] + amount
+                entry = (held['entry_price'] * held['amount'] + price * amount) / total if total else price
+                self.positions[symbol] = {"entry_price": entry, "amount": total}
+            else:
+                self.positions[symbol] = {"entry_price": price, "amount": amount}
+
+        elif trade_data.get('side') == 'SELL':
+            held = self.positions.get(symbol)
+            if held:
+                remaining = held['amount'] - amount
+                if remaining > 1e-12:
+                    held['amount'] = remaining
+                else:
+                    del self.positions[symbol]
+
+        if profit is not None:
+            self.total_pnl += profit
+            self.closed_trades += 1
+            if profit > 0:
+                self.winning_trades += 1
+
+LEDGER = Ledger()
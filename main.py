@@ -1,61 +1,203 @@
-import ccxt
+import asyncio
 import time
-import requests
 import threading
-import uvicorn
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from database import init_db, log_trade, get_pnl_stats, get_recent_trades, get_latest_trade
-import pandas as pd
+from typing import Optional
+from database import init_db, get_trades_after, query_trades, iter_trades
+from ledger import LEDGER
+from journal import TradeJournal
+from market_data import CandleFeed
+from candle_store import CandleStore, CANDLE_STORE_PATH
+from scheduler import CandleScheduler
+from stream import MarketStream, BINANCE_WS_URL
+from market_cache import get_market_cache, load_markets_cached
+from alerts import AlertDispatcher
+from triggers import TriggerBook
+from runtime import EngineRuntime, NO_CHANGE
+from snapshot import SnapshotPublisher, changed_fields
+from events import EventBroker, format_sse
+import metrics
 import os
+import io
+import csv
 import json
+from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app):
+    # The engine is a task on the server's event loop (see run_engine / runtime.py)
+    print("Starting Trading Engine...")
+    ENGINE.start(run_engine)
+    yield
+    await ENGINE.stop()
+    if LEDGER.journal is not None:
+        await asyncio.to_thread(LEDGER.journal.close)
+
 # Initialize FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # --- Paper Trading Mode ---
 PAPER_MODE = True
 STOP_LOSS_PCT = 0.10  # 10% (Mean Reversion needs room)
 TAKE_PROFIT_PCT = 0.20  # 20%
+TRAILING_STOP_PCT = float(os.getenv('TRAILING_STOP_PCT', 0)) or None  # e.g. 0.05 = 5% below the high; off by default
+TRADE_JOURNAL_PATH = os.getenv('TRADE_JOURNAL_PATH', 'trades.journal')  # Empty: write trades straight to the DB
+TRADE_JOURNAL_FSYNC = os.getenv('TRADE_JOURNAL_FSYNC', 'batch')  # always | batch | off (see journal.py)
+RISK_OVERRIDES = {}  # symbol -> {"stop_loss", "take_profit", "trailing_stop"} overriding the defaults above
 INITIAL_CAPITAL = 10000 
 # Dynamic Strategy Parameters
 BUY_RSI_THRESHOLD = 25
 SELL_RSI_THRESHOLD = 65
 BOT_PAUSED = False
 CURRENT_RSI = 0.0
+LOOP_INTERVAL_SECONDS = 10  # Risk-check cadence between candle closes
+CANDLE_TIMEFRAME = '4h'
+CANDLE_CLOSE_DELAY = 2.0    # Seconds after the boundary before the closed candle is fetched
+
+# Market data source: 'poll' (REST, strategy on each candle close) or 'stream' (websocket)
+MARKET_DATA_MODE = os.getenv('MARKET_DATA_MODE', 'poll').lower()
+MARKET_STREAM_URL = os.getenv('MARKET_STREAM_URL', BINANCE_WS_URL)
+STREAM_RISK_INTERVAL = 0.0  # Min seconds between risk checks on trade prints (trigger lookups are O(log n))
+MARKET_CACHE_TTL = float(os.getenv('MARKET_CACHE_TTL', 2))  # Seconds ticker/balance snapshots stay fresh
+MARKETS_CACHE_PATH = os.getenv('MARKETS_CACHE_PATH', 'markets_cache.json')  # Exchange market metadata on disk; empty to always download
+MARKETS_CACHE_MAX_AGE = float(os.getenv('MARKETS_CACHE_MAX_AGE', 86400))  # Seconds before it is downloaded again
+
+# --- Alerts ---
+ALERTS = AlertDispatcher(os.getenv('DISCORD_WEBHOOK_URL'))
+
+# --- Symbols ---
+# Comma-separated USDT pairs, e.g. SYMBOLS=BTC/USDT,ETH/USDT,SOL/USDT
+QUOTE_CURRENCY = 'USDT'
+SYMBOLS = [s.strip().upper() for s in os.getenv('SYMBOLS', 'BTC/USDT').split(',') if s.strip()]
+MAX_FETCH_WORKERS = 8  # Bounded pool so one slow symbol does not delay the others
+
+# Incremental candle/RSI state per symbol (see market_data.CandleFeed)
+CANDLE_FEEDS = {}
+# Closed candles persist here for warm restarts and research (CANDLE_STORE_PATH, empty to disable)
+CANDLE_STORE = CandleStore() if CANDLE_STORE_PATH else None
+FETCH_POOL = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix="fetch")
+
+# Latest engine state for /stats (see snapshot.py), published after every engine step
+SNAPSHOTS = SnapshotPublisher()
+PUBLISH_LOCK = threading.Lock()  # Engine thread vs. a handler publishing the first snapshot
+
+# Push channel for dashboards (/events): state deltas and new trades
+EVENTS = EventBroker()
+SSE_KEEPALIVE_SECONDS = 15
+LEDGER.listeners.append(lambda trade: EVENTS.publish('trade', trade))
+
+# Stop/target levels of open positions (see triggers.py), armed lazily from the ledger
+TRIGGERS = TriggerBook()
+
+# Per-symbol engine state
+LAST_ACTIONS = {}    # symbol -> 'BUY' / 'SELL' / None
+LAST_PRICES = {}     # symbol -> last close seen by the loop
+RSI_BY_SYMBOL = {}   # symbol -> last RSI
 
 
 paper_balance = {"USDT": 10000, "BTC": 0}
 
+# --- Shared Exchange Client ---
+EXCHANGE = None
+_exchange_lock = threading.Lock()
+
+def create_exchange():
+    """
+    Builds the Binance client for the current mode: public data only in paper mode,
+    sandbox keys in testnet mode. Raises ValueError if testnet keys are missing.
+    """
+    # Imported here: ccxt is the heaviest dependency and only the engine needs it
+    import ccxt
+    from requests.adapters import HTTPAdapter
+
+    if PAPER_MODE:
+        # Initialize exchange for public data only (no API keys needed)
+        exchange = ccxt.binance({
+            'enableRateLimit': True,
+            'options': {
+                'defaultType': 'spot',
+            }
+        })
+        print("--- Using Binance Production API (Public Data Only) ---")
+    else:
+        api_key = os.getenv('BINANCE_TESTNET_KEY')
+        secret_key = os.getenv('BINANCE_TESTNET_SECRET')
+
+        if not api_key or not secret_key:
+            raise ValueError("BINANCE_TESTNET_KEY or BINANCE_TESTNET_SECRET not found in .env")
+
+        exchange = ccxt.binance({
+            'apiKey': api_key,
+            'secret': secret_key,
+            'enableRateLimit': True,
+            'options': {
+                'defaultType': 'spot',
+            }
+        })
+        exchange.set_sandbox_mode(True)
+        print("--- Binance Sandbox Mode Enabled ---")
+
+    # Keep-alive pool big enough for the fetch workers plus API handler threads
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_FETCH_WORKERS + 4)
+    exchange.session.mount('https://', adapter)
+    return exchange
+
+def get_exchange():
+    """
+    Process-wide exchange client, owned by the trading engine and reused by the API
+    endpoints: one HTTP session, one rate-limit budget, markets loaded once.
+    """
+    global EXCHANGE
+    if EXCHANGE is None:
+        with _exchange_lock:
+            if EXCHANGE is None:
+                EXCHANGE = create_exchange()
+    return EXCHANGE
+
+def market_cache(exchange):
+    """Ticker/balance cache (TTL + request coalescing) in front of `exchange`."""
+    return get_market_cache(exchange, MARKET_CACHE_TTL)
+
+def base_asset(symbol):
+    return symbol.split('/')[0]
+
+def get_balances(exchange):
+    """
+    Returns {asset: total} for the quote currency and every traded base asset.
+    Paper balances are shared across all symbols.
+    """
+    assets = [QUOTE_CURRENCY] + [base_asset(s) for s in SYMBOLS]
+    if PAPER_MODE:
+        source = paper_balance
+    else:
+        source = market_cache(exchange).balance().get('total', {})
+    return {asset: source.get(asset, 0) or 0 for asset in assets}
+
 def print_balance(exchange):
-    global paper_balance
     try:
-        if PAPER_MODE:
-            print("\n--- Paper Balance ---")
-            print(f"USDT: {paper_balance['USDT']:.2f}")
-            print(f"BTC:  {paper_balance['BTC']:.5f}")
-        else:
-            balance = exchange.fetch_balance()
-            print("\n--- Testnet Balance ---")
-            if 'total' in balance:
-                usdt = balance['total'].get('USDT', 0)
-                btc = balance['total'].get('BTC', 0)
-                print(f"USDT: {usdt}")
-                print(f"BTC:  {btc}")
+        balances = get_balances(exchange)
+        print("\n--- Paper Balance ---" if PAPER_MODE else "\n--- Testnet Balance ---")
+        print(f"{QUOTE_CURRENCY}: {balances.pop(QUOTE_CURRENCY, 0):.2f}")
+        for asset, amount in balances.items():
+            if amount:
+                print(f"{asset}:  {amount:.5f}")
     except Exception as e:
         print(f"Error fetching balance: {e}")
 
 def send_discord_alert(title, description, color=0x0099FF, fields=None):
     """
-    Sends a rich embed alert to Discord.
+    Queues a rich embed alert for Discord (sent in the background, see alerts.py).
     Colors: Green(0x00FF00), Red(0xFF0000), Blue(0x0099FF), Orange(0xFFA500)
     """
-    webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
-    if not webhook_url:
+    if not ALERTS.webhook_url:
         print("Discord Webhook URL not set. Skipping alert.")
         return
 
@@ -70,69 +212,45 @@ def send_discord_alert(title, description, color=0x0099FF, fields=None):
     if fields:
         embed["fields"] = fields
 
-    try:
-        response = requests.post(
-            webhook_url, 
-            json={"embeds": [embed]}, 
-            timeout=5
-        )
-        response.raise_for_status()
-        print("Discord embed alert sent successfully.")
-    except Exception as e:
-        print(f"Failed to send Discord alert: {e}")
+    # Queued for the background dispatcher so the trading loop never waits on Discord
+    if not ALERTS.enqueue(embed):
+        print(f"Alert queue full ({ALERTS.queue_length}). Dropped alert: {title}")
 
 # --- Persistence Helper Functions ---
-# Note: JSON state removed in favor of Database Persistence
+# Positions & stats live in the in-memory LEDGER; the database is written through
+# on every trade and only read once at startup.
 
 def restore_state_from_db():
+    """Loads the in-memory ledger from the database (startup only)."""
     try:
-        total_pnl, win_rate, total_trades = get_pnl_stats()
-        latest_trade = get_latest_trade()
-        
-        # Default State
-        status = "NEUTRAL"
-        entry_price = 0.0
-        amount = 0.0
-        
-        # Check if we are currently holding a position
-        if latest_trade and latest_trade.side == 'BUY' and latest_trade.profit is None:
-            status = "IN_POSITION"
-            entry_price = latest_trade.price
-            amount = latest_trade.amount
-            print(f"🔄 Restored State: IN_POSITION (Entry: ${entry_price:,.2f}, Amount: {amount:.5f})")
-        else:
-            print("🔄 Restored State: NEUTRAL (No open positions found in DB)")
-            
-        return {
-            "status": status,
-            "entry_price": entry_price,
-            "amount": amount,
-            "stats": {
-                "total_pnl_usdt": total_pnl,
-                "win_rate": win_rate,
-                "total_trades": total_trades
-            }
-        }
+        LEDGER.load(SYMBOLS)
     except Exception as e:
         print(f"Error restoring state: {e}")
-        return {"status": "NEUTRAL", "entry_price": 0, "amount": 0, "stats": {}}
 
-def get_dynamic_position_size(usdt_balance, btc_price):
+def get_position_state(symbol):
+    """
+    Position state for `symbol` from the in-memory ledger (no DB access).
+    """
+    position = LEDGER.position(symbol)
+    if position:
+        return {"status": "IN_POSITION", "entry_price": position['entry_price'], "amount": position['amount']}
+    return {"status": "NEUTRAL", "entry_price": 0.0, "amount": 0.0}
+
+def get_dynamic_position_size(usdt_balance, btc_price, asset='BTC'):
     """
     Calculate dynamic position size based on historical win rate (Kelly Criterion tiers).
+    `btc_price` is the price of whichever base asset is being bought.
     Returns: (btc_amount, tier_name, win_rate_percent)
     """
     try:
-        # Use DB stats instead of JSON
-        total_pnl, win_rate, total_trades = get_pnl_stats()
+        # In-memory ledger stats (kept in sync with the DB on every trade)
+        total_pnl, win_rate, total_trades = LEDGER.pnl_stats()
         
         if total_trades == 0:
             win_rate = 0.5
         else:
             win_rate = win_rate / 100.0
         
-        # Determine tier and risk percentage
-        
         # Determine tier and risk percentage
         if win_rate >= 0.60:
             tier = "Tier 1 (Hot Hand)"
@@ -161,7 +279,7 @@ def get_dynamic_position_size(usdt_balance, btc_price):
         
         win_rate_percent = int(win_rate * 100)
         
-        print(f"Calculated Position Size: ${position_usdt:.2f} / {btc_amount:.5f} BTC (Win Rate: {win_rate_percent}% - {tier})")
+        print(f"Calculated Position Size: ${position_usdt:.2f} / {btc_amount:.5f} {asset} (Win Rate: {win_rate_percent}% - {tier})")
         
         return btc_amount, tier, win_rate_percent
         
@@ -177,20 +295,18 @@ def execute_trade(exchange, symbol, signal, price, reason=None, suppress_alert=F
     """
     global paper_balance
     try:
-        # Get current price
-        ticker = exchange.fetch_ticker(symbol)
+        asset = base_asset(symbol)
+        
+        # Get current price (usually primed by the loop's latest candle close)
+        ticker = market_cache(exchange).ticker(symbol)
         btc_price = ticker['last']
         
-        if PAPER_MODE:
-            usdt_free = paper_balance['USDT']
-            btc_free = paper_balance['BTC']
-        else:
-            balance = exchange.fetch_balance()
-            usdt_free = balance['total'].get('USDT', 0)
-            btc_free = balance['total'].get('BTC', 0)
+        balances = get_balances(exchange)
+        usdt_free = balances.get(QUOTE_CURRENCY, 0)
+        btc_free = balances.get(asset, 0)
         
         # Dynamic position sizing
-        amount, tier, win_rate = get_dynamic_position_size(usdt_free, btc_price)
+        amount, tier, win_rate = get_dynamic_position_size(usdt_free, btc_price, asset)
         
         trade_successful = False
         pnl_profit = 0.0
@@ -202,11 +318,12 @@ def execute_trade(exchange, symbol, signal, price, reason=None, suppress_alert=F
                 
                 if PAPER_MODE:
                     # Simulate trade
-                    paper_balance['USDT'] -= required_usdt
-                    paper_balance['BTC'] += amount
-                    print(f"📝 PAPER TRADE: Bought {amount:.5f} BTC at ${btc_price:,.2f}")
+                    paper_balance[QUOTE_CURRENCY] -= required_usdt
+                    paper_balance[asset] = paper_balance.get(asset, 0) + amount
+                    print(f"📝 PAPER TRADE: Bought {amount:.5f} {asset} at ${btc_price:,.2f}")
                 else:
-                    order = exchange.create_market_buy_order(symbol, amount)
+                    order = metrics.exchange_call(exchange, 'create_market_buy_order', symbol, amount)
+                    market_cache(exchange).apply_fill({asset: amount, QUOTE_CURRENCY: -required_usdt})
                     print(f"BUY Execution: {order['id']} | Fill Price: {order.get('price', 'Market')}")
                 
                 # Log Trade to DB
@@ -218,7 +335,7 @@ def execute_trade(exchange, symbol, signal, price, reason=None, suppress_alert=F
                     "strategy": "Mean_Reversion_4H",
                     "profit": None # Profit is calculated on SELL
                 }
-                log_trade(trade_record)
+                LEDGER.record(trade_record)
                 
                 trade_successful = True
                 
@@ -227,8 +344,8 @@ def execute_trade(exchange, symbol, signal, price, reason=None, suppress_alert=F
                 return False
                 
         elif signal == 'SELL':
-            # Check DB state for position details
-            state = restore_state_from_db()
+            # Check ledger state for position details
+            state = get_position_state(symbol)
             if state and state.get('status') == 'IN_POSITION':
                 amount = state.get('amount', amount)
                 entry_price = state.get('entry_price', btc_price) 
@@ -237,17 +354,18 @@ def execute_trade(exchange, symbol, signal, price, reason=None, suppress_alert=F
             
             if btc_free >= amount:
                 reason_msg = reason if reason else "RSI > 65 or Stop Loss"
-                print(f"Signal: SELL ({reason_msg}) | BTC Free: {btc_free:.5f}")
+                print(f"Signal: SELL ({reason_msg}) | {asset} Free: {btc_free:.5f}")
                 
                 pnl_profit = (btc_price - entry_price) * amount 
                 
                 if PAPER_MODE:
                     # Simulate trade
-                    paper_balance['BTC'] -= amount
-                    paper_balance['USDT'] += amount * btc_price
-                    print(f"📝 PAPER TRADE: Sold {amount:.5f} BTC at ${btc_price:,.2f}")
+                    paper_balance[asset] = paper_balance.get(asset, 0) - amount
+                    paper_balance[QUOTE_CURRENCY] += amount * btc_price
+                    print(f"📝 PAPER TRADE: Sold {amount:.5f} {asset} at ${btc_price:,.2f}")
                 else:
-                    order = exchange.create_market_sell_order(symbol, amount)
+                    order = metrics.exchange_call(exchange, 'create_market_sell_order', symbol, amount)
+                    market_cache(exchange).apply_fill({asset: -amount, QUOTE_CURRENCY: amount * btc_price})
                     print(f"SELL Execution: {order['id']} | Fill Price: {order.get('price', 'Market')}")
                 
                 # Log Trade to DB
@@ -259,12 +377,12 @@ def execute_trade(exchange, symbol, signal, price, reason=None, suppress_alert=F
                     "strategy": "Mean_Reversion_4H",
                     "profit": pnl_profit
                 }
-                log_trade(trade_record)
+                LEDGER.record(trade_record)
                 
                 trade_successful = True
                 
             else:
-                 print(f"Signal is SELL, but insufficient BTC. Required: {amount:.5f}, Available: {btc_free:.5f}")
+                 print(f"Signal is SELL, but insufficient {asset}. Required: {amount:.5f}, Available: {btc_free:.5f}")
                  return False
                  
         else:
@@ -278,32 +396,28 @@ def execute_trade(exchange, symbol, signal, price, reason=None, suppress_alert=F
             color = 0x00FF00 if signal == 'BUY' else 0xFFA500 # Green vs Orange
             
             # Get Performance Metrics
-            equity_total, total_pnl_val, roi = get_performance_metrics(exchange, price)
+            equity_total, total_pnl_val, roi = get_performance_metrics(exchange, {symbol: price})
 
             # Get Position Metrics (Post-Trade)
-            if PAPER_MODE:
-                btc_held = paper_balance['BTC']
-                usdt_free = paper_balance['USDT']
-            else:
-                bal = exchange.fetch_balance()
-                btc_held = bal['total'].get('BTC', 0)
-                usdt_free = bal['total'].get('USDT', 0)
+            balances = get_balances(exchange)
+            btc_held = balances.get(asset, 0)
+            usdt_free = balances.get(QUOTE_CURRENCY, 0)
             
-            # Calculate Total Equity (Cash + BTC Value)
+            # Calculate Total Equity (Cash + value of every held asset)
             # note: get_performance_metrics already returns equity, but we want to be consistent with breakdown
-            equity = usdt_free + (btc_held * price)
+            equity = value_holdings(balances, {**LAST_PRICES, symbol: price})
             
             fields = [
                 {"name": "Symbol", "value": symbol, "inline": True},
                 {"name": "Price", "value": f"${price:,.2f}", "inline": True},
-                {"name": "Trade Size", "value": f"{amount:.5f} BTC", "inline": True},
+                {"name": "Trade Size", "value": f"{amount:.5f} {asset}", "inline": True},
                 {"name": "Reason", "value": reason if reason else "Strategy Signal", "inline": False},
                 {"name": "Total PnL", "value": f"{'+' if pnl_profit >= 0 else ''}${pnl_profit:,.2f} ({'+' if roi >= 0 else ''}{roi:.2f}%)", "inline": False},
                 
                 # Wallet Breakdown
                 {"name": "Wallet Total Value", "value": f"${equity:,.2f}", "inline": True},
                 {"name": "USDT Free", "value": f"${usdt_free:,.2f}", "inline": True},
-                {"name": "BTC Held", "value": f"{btc_held:.5f} BTC", "inline": True}
+                {"name": f"{asset} Held", "value": f"{btc_held:.5f} {asset}", "inline": True}
             ]
             
             send_discord_alert(title, "Momentum signal detected and executed.", color, fields)
@@ -315,59 +429,75 @@ def execute_trade(exchange, symbol, signal, price, reason=None, suppress_alert=F
         print(f"Error executing trade: {e}")
         return False
 
+def risk_settings(symbol):
+    """Stop loss / take profit / trailing stop fractions for `symbol` (defaults + overrides)."""
+    settings = {"stop_loss": STOP_LOSS_PCT, "take_profit": TAKE_PROFIT_PCT, "trailing_stop": TRAILING_STOP_PCT}
+    settings.update(RISK_OVERRIDES.get(symbol, {}))
+    return settings
+
+def sync_triggers(symbol):
+    """
+    Makes the trigger book match the symbol's position and risk settings:
+    armed on entry, re-armed when the position or settings change, cleared when flat.
+    Returns the position state, or None when there is no open position.
+    """
+    state = get_position_state(symbol)
+    if not state or state.get('status') != 'IN_POSITION' or not state.get('entry_price'):
+        TRIGGERS.clear(symbol)
+        return None
+
+    settings = risk_settings(symbol)
+    key = (state['entry_price'], state['amount'], settings['stop_loss'], settings['take_profit'], settings['trailing_stop'])
+    if TRIGGERS.armed_key(symbol) != key:
+        TRIGGERS.arm(symbol, state['entry_price'], settings['stop_loss'], settings['take_profit'], settings['trailing_stop'], key=key)
+    return state
+
 def check_risk_exits(exchange, symbol, current_price):
     """
-    # Checks for Stop Loss or Take Profit conditions.
+    # Checks the symbol's stop loss / take profit / trailing stop triggers.
     # Forces a SELL if triggered.
     """
-    state = restore_state_from_db()
-    if not state or state.get('status') != 'IN_POSITION':
+    state = sync_triggers(symbol)
+    if not state:
         return None
 
-    entry_price = state.get('entry_price')
-    if not entry_price:
+    fired = TRIGGERS.check(symbol, current_price)
+    if not fired:
         return None
+    trigger = fired[0]
 
     # Calculate percentage change
+    entry_price = state['entry_price']
     pct_change = (current_price - entry_price) / entry_price
     
-    action = None
-    log_message = ""
-    reason_code = ""
-
-    # Stop Loss Check
-    if pct_change <= -STOP_LOSS_PCT:
-        log_message = f"🛑 STOP LOSS TRIGGERED: Selling at ${current_price:,.0f} (Loss: {pct_change*100:.1f}%)"
-        reason_code = "Stop Loss"
-        action = "SELL"
-        
-    # Take Profit Check
-    elif pct_change >= TAKE_PROFIT_PCT:
-        log_message = f"🥂 TAKE PROFIT TRIGGERED: Selling at ${current_price:,.0f} (Gain: +{pct_change*100:.1f}%)"
-        reason_code = "Take Profit"
-        action = "SELL"
+    action = "SELL"
+    reason_code = trigger.reason
+
+    if trigger.kind == 'target':
+        log_message = f"🥂 {reason_code.upper()} TRIGGERED: Selling at ${current_price:,.0f} (Gain: +{pct_change*100:.1f}%)"
+    else:
+        log_message = f"🛑 {reason_code.upper()} TRIGGERED: Selling at ${current_price:,.0f} ({'Gain: +' if pct_change >= 0 else 'Loss: '}{pct_change*100:.1f}%)"
         
     if action:
         print(log_message)
         # Force SELL
-        # Force SELL
         executed = execute_trade(exchange, symbol, action, current_price, reason=reason_code, suppress_alert=True)
         if executed:
             print_balance(exchange)
             
             # --- Get Performance Data for Alert ---
-            equity, profit, roi = get_performance_metrics(exchange, current_price)
+            equity, profit, roi = get_performance_metrics(exchange, {symbol: current_price})
             log_message += f"\n📊 P&L: {'+' if profit >= 0 else ''}${profit:,.2f} ({'+' if roi >= 0 else ''}{roi:.2f}%)"
             
             # Rich Embed Alert
             title = ""
             color = 0
-            if reason_code == "Stop Loss":
-                title = "🛑 STOP LOSS TRIGGERED"
-                color = 0xFF0000 # Red
-            elif reason_code == "Take Profit":
-                title = "🥂 TAKE PROFIT TRIGGERED"
+            if trigger.kind == 'target':
+                title = f"🥂 {reason_code.upper()} TRIGGERED"
                 color = 0x00FF00 # Green
+            else:
+                title = f"🛑 {reason_code.upper()} TRIGGERED"
+                color = 0xFF0000 # Red
             
             fields = [
                 {"name": "Symbol", "value": symbol, "inline": True},
@@ -381,25 +511,35 @@ def check_risk_exits(exchange, symbol, current_price):
             
     return None
 
-def get_performance_metrics(exchange, current_price=None):
+def value_holdings(balances, prices):
+    """
+    Cash plus every held asset marked at its {symbol: price}.
+    """
+    equity = balances.get(QUOTE_CURRENCY, 0)
+    for asset, amount in balances.items():
+        if asset != QUOTE_CURRENCY and amount:
+            equity += amount * prices.get(f"{asset}/{QUOTE_CURRENCY}", 0)
+    return equity
+
+def get_performance_metrics(exchange, prices=None):
     """
     Returns (equity, profit, roi).
+    `prices` ({symbol: price}) overrides the loop's last seen prices; any held
+    asset still without a price is fetched from the exchange.
     """
-    global paper_balance
     try:
-        if current_price is None:
-            ticker = exchange.fetch_ticker('BTC/USDT')
-            current_price = ticker['last']
+        balances = get_balances(exchange)
+        known_prices = {**LAST_PRICES, **(prices or {})}
         
-        if PAPER_MODE:
-            usdt_bal = paper_balance['USDT']
-            btc_bal = paper_balance['BTC']
-        else:
-            balance = exchange.fetch_balance()
-            usdt_bal = balance['total'].get('USDT', 0)
-            btc_bal = balance['total'].get('BTC', 0)
+        missing = [
+            f"{asset}/{QUOTE_CURRENCY}" for asset, amount in balances.items()
+            if asset != QUOTE_CURRENCY and amount and f"{asset}/{QUOTE_CURRENCY}" not in known_prices
+        ]
+        if missing:
+            for symbol, ticker in market_cache(exchange).tickers(missing).items():
+                known_prices[symbol] = ticker['last']
             
-        equity = usdt_bal + (btc_bal * current_price)
+        equity = value_holdings(balances, known_prices)
         profit = equity - INITIAL_CAPITAL
         roi = (profit / INITIAL_CAPITAL) * 100
         
@@ -416,202 +556,439 @@ def log_performance(exchange):
         equity, profit, roi = get_performance_metrics(exchange)
         print(f"📊 EQUITY: ${equity:,.2f} | P&L: { '+' if profit >= 0 else ''}${profit:,.2f} ({ '+' if roi >= 0 else ''}{roi:.2f}%)")
         
-        # Efficiency Check Log (Now using SQL)
-        total_pnl, win_rate, total_trades = get_pnl_stats()
-        print(f"📊 Efficiency Check: Stats fetched via SQL. Win Rate: {win_rate:.0f}% (Trades: {total_trades}).")
+        # Efficiency Check Log (in-memory ledger, no DB query)
+        total_pnl, win_rate, total_trades = LEDGER.pnl_stats()
+        print(f"📊 Efficiency Check: Stats served from ledger. Win Rate: {win_rate:.0f}% (Trades: {total_trades}).")
         
     except Exception as e:
         print(f"Error logging performance: {e}")
 
-def run_bot(exchange, last_action, symbol='BTC/USDT'):
-    print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] Fetching data for {symbol} (4h)...")
-    
-    try:
-        # 1. Fetch History
-        bars = exchange.fetch_ohlcv(symbol, timeframe='4h', limit=100)
-        df = pd.DataFrame(bars, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        
-        # 2. Calculate Indicators
-        # RSI 14
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).ewm(com=13, adjust=False).mean()
-        loss = (-delta.where(delta < 0, 0)).ewm(com=13, adjust=False).mean()
-        rs = gain / loss
-        df['rsi_14'] = 100 - (100 / (1 + rs))
-        
-        last_close = df['close'].iloc[-1]
-        last_rsi = df['rsi_14'].iloc[-1]
-        
-        # Update Global RSI for dashboard
-        global CURRENT_RSI
+def get_candle_feed(symbol):
+    feed = CANDLE_FEEDS.get(symbol)
+    if feed is None:
+        feed = CANDLE_FEEDS[symbol] = CandleFeed(symbol, timeframe=CANDLE_TIMEFRAME, history=100, store=CANDLE_STORE)
+        try:
+            feed.warm_start()
+        except Exception as e:
+            print(f"Candle store unavailable for warm start: {e}")
+    return feed
+
+def evaluate_strategy(exchange, last_action, symbol, last_close, last_rsi):
+    """
+    Decision logic for one price/RSI update. Shared by the polling loop (run_bot)
+    and the streaming feed. Returns the new last_action.
+    """
+    # Update Global RSI/price for dashboard (CURRENT_RSI tracks the primary symbol)
+    global CURRENT_RSI
+    RSI_BY_SYMBOL[symbol] = last_rsi
+    LAST_PRICES[symbol] = last_close
+    market_cache(exchange).put_price(symbol, last_close)
+    if symbol == SYMBOLS[0]:
         CURRENT_RSI = last_rsi
-        
-        # --- Check Pause ---
-        if BOT_PAUSED:
-            print(f"⏸️ BOT PAUSED. RSI: {last_rsi:.2f}. Standing by...")
-            return last_action
+    
+    # --- Check Pause ---
+    if BOT_PAUSED:
+        print(f"⏸️ BOT PAUSED. {symbol} RSI: {last_rsi:.2f}. Standing by...")
+        return last_action
 
-        # --- Risk Management Check ---
-        risk_action = check_risk_exits(exchange, symbol, last_close)
-        if risk_action:
-            return risk_action
-        
-        # Determine RSI Status
-        rsi_status = "Neutral"
-        if last_rsi > SELL_RSI_THRESHOLD: rsi_status = "Overbought"
-        if last_rsi < BUY_RSI_THRESHOLD: rsi_status = "Oversold"
+    # --- Risk Management Check ---
+    risk_action = check_risk_exits(exchange, symbol, last_close)
+    if risk_action:
+        return risk_action
+    
+    # Determine RSI Status
+    rsi_status = "Neutral"
+    if last_rsi > SELL_RSI_THRESHOLD: rsi_status = "Overbought"
+    if last_rsi < BUY_RSI_THRESHOLD: rsi_status = "Oversold"
+    
+    print(f"{symbol} Price: {last_close:.2f} | RSI: {last_rsi:.2f} ({rsi_status})")
+    
+    # 3. Decision Logic (Mean Reversion)
+    signal = 'HOLD'
+    
+    # BUY: Extreme Oversold (Falling Knife)
+    if last_rsi < BUY_RSI_THRESHOLD:
+        signal = 'BUY'
         
-        print(f"Price: {last_close:.2f} | RSI: {last_rsi:.2f} ({rsi_status})")
+    # SELL: Overbought or Recovered
+    elif last_rsi > SELL_RSI_THRESHOLD:
+        signal = 'SELL'
         
-        # 3. Decision Logic (Mean Reversion)
-        signal = 'HOLD'
+    # 4. State Machine Check
+    if signal == last_action:
+        print(f"{symbol} signal {signal} ignored: Already in position.")
+        return last_action
         
-        # BUY: Extreme Oversold (Falling Knife)
-        if last_rsi < BUY_RSI_THRESHOLD:
-            signal = 'BUY'
-            
-        # SELL: Overbought or Recovered
-        elif last_rsi > SELL_RSI_THRESHOLD:
-            signal = 'SELL'
-            
-        # 4. State Machine Check
-        if signal == last_action:
-            print(f"Signal {signal} ignored: Already in position.")
+    # 5. Execute Trade with Balance Checks
+    if signal != 'HOLD':
+        executed = execute_trade(exchange, symbol, signal, last_close)
+        if executed:
+            # Update last_action only if trade succeeded
+            # Also Show updated balance
             print_balance(exchange)
-            return last_action
             
-        # 5. Execute Trade with Balance Checks
-        if signal != 'HOLD':
-            executed = execute_trade(exchange, symbol, signal, last_close)
-            if executed:
-                # Update last_action only if trade succeeded
-                # Also Show updated balance
-                print_balance(exchange)
-                
-                # Alert is now handled inside execute_trade
-                
-                return signal
-                
-                return signal
-        
-        # If HOLD or Trade Failed, keep state
+            # Alert is now handled inside execute_trade
+            
+            return signal
+    
+    # If HOLD or Trade Failed, keep state
+    return last_action
+
+def report_loop_error(e):
+    print(f"An error occurred: {e}")
+    send_discord_alert("⚠️ CRITICAL ERROR", f"Bot crashed with error: {str(e)}", 0xFF0000)
+
+def fetch_market_data(exchange, symbols):
+    """
+    Refreshes the candle feeds of all symbols concurrently on the bounded fetch pool,
+    so an iteration takes as long as the slowest symbol rather than the sum.
+    Returns {symbol: (last_close, last_rsi)}; failed symbols are reported and omitted.
+    """
+    futures = {FETCH_POOL.submit(get_candle_feed(symbol).refresh, exchange): symbol for symbol in symbols}
+    results = {}
+    for future in as_completed(futures):
+        symbol = futures[future]
+        try:
+            results[symbol] = future.result()
+        except Exception as e:
+            report_loop_error(f"{symbol}: {e}")
+    return results
+
+def run_bot(exchange, symbols=None):
+    """
+    One strategy evaluation of the multi-symbol engine: concurrent data fetch, then
+    the per-symbol decision logic on the last *closed* candle against the shared
+    balance. Updates LAST_ACTIONS. Returns {symbol: (closed_close, closed_rsi)}.
+    """
+    symbols = symbols or SYMBOLS
+    print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] Fetching data for {len(symbols)} symbol(s) ({CANDLE_TIMEFRAME})...")
+    
+    # 1. Fetch only new candles & update RSI incrementally (all symbols in parallel)
+    with metrics.PHASE_DURATION.time(phase='fetch'):
+        fetched = fetch_market_data(exchange, symbols)
+    market_data = {}
+    for symbol in fetched:
+        last_close, last_rsi = get_candle_feed(symbol).closed()
+        if last_close is not None:
+            market_data[symbol] = (last_close, last_rsi)
+    
+    # 2. Decisions run serially since they share one balance
+    traded = False
+    with metrics.PHASE_DURATION.time(phase='decide'):
+        for symbol in symbols:
+            if symbol not in market_data:
+                continue
+            last_close, last_rsi = market_data[symbol]
+            last_action = LAST_ACTIONS.get(symbol)
+            try:
+                LAST_ACTIONS[symbol] = evaluate_strategy(exchange, last_action, symbol, last_close, last_rsi)
+                traded = traded or LAST_ACTIONS[symbol] != last_action
+            except Exception as e:
+                report_loop_error(e)
+    
+    if not traded:
         print_balance(exchange)
-        return last_action
+    return market_data
 
+def run_risk_checks(exchange, symbols=None):
+    """
+    Cheap between-closes step: one batched ticker request for the symbols with an
+    open position, then stop-loss/take-profit checks. No candles, no strategy.
+    """
+    if BOT_PAUSED:
+        return
+    held = [symbol for symbol in (symbols or SYMBOLS) if LEDGER.position(symbol)]
+    if not held:
+        return
+    with metrics.PHASE_DURATION.time(phase='risk'):
+        for symbol, ticker in market_cache(exchange).tickers(held).items():
+            price = ticker['last']
+            LAST_PRICES[symbol] = price
+            try:
+                if check_risk_exits(exchange, symbol, price):
+                    LAST_ACTIONS[symbol] = 'SELL'
+            except Exception as e:
+                report_loop_error(e)
+
+def on_stream_kline(exchange, symbol, last_close, last_rsi):
+    """Engine command: strategy evaluation for a closed kline from the stream."""
+    try:
+        LAST_ACTIONS[symbol] = evaluate_strategy(exchange, LAST_ACTIONS.get(symbol), symbol, last_close, last_rsi)
     except Exception as e:
-        print(f"An error occurred: {e}")
-        send_discord_alert("⚠️ CRITICAL ERROR", f"Bot crashed with error: {str(e)}", 0xFF0000)
-        return last_action
+        report_loop_error(e)
 
-def start_trading_loop():
-    global paper_balance
-    
-    # Initialize Database
+def on_stream_trade(exchange, symbol, price):
+    """
+    Engine command: stop-loss/take-profit check for a trade print from the stream.
+    Returns NO_CHANGE unless it sold, so the snapshot is not re-published per print.
+    """
+    market_cache(exchange).put_price(symbol, price)
+    if BOT_PAUSED:
+        return NO_CHANGE
+    try:
+        if check_risk_exits(exchange, symbol, price):
+            LAST_ACTIONS[symbol] = 'SELL'
+            return None
+    except Exception as e:
+        report_loop_error(e)
+        return None
+    return NO_CHANGE
+
+async def run_streaming(runtime, exchange, symbols=None):
+    """
+    Event-driven alternative to the polling loop, one websocket per symbol:
+    kline closes drive the strategy, trade prints drive stop-loss/take-profit checks.
+    Stream callbacks only post engine commands; the engine applies them in order.
+    """
+    symbols = symbols or SYMBOLS
+
+    def make_stream(symbol):
+        feed = get_candle_feed(symbol)
+
+        def on_kline(bar, closed):
+            # The strategy only runs on closed candles; trade prints cover risk in between
+            if not closed:
+                return
+            if feed.bars and bar[0] == feed.bars[-1][0]:
+                runtime.post('stream_kline', exchange, symbol, feed.last_close, feed.last_rsi)
+            else:
+                # Closed while the stream was reconnecting; the backfill already opened the next bar
+                runtime.post('stream_kline', exchange, symbol, *feed.closed())
+
+        def on_trade(price):
+            # Only the newest print matters: a burst while the engine is busy is one risk check
+            runtime.post_latest('stream_trade', symbol, exchange, symbol, price)
+
+        return MarketStream(feed, exchange, on_kline=on_kline, on_trade=on_trade,
+                            url=MARKET_STREAM_URL, trade_interval=STREAM_RISK_INTERVAL)
+
+    market_streams = [make_stream(symbol) for symbol in symbols]
+    print(f"Starting Streaming Mode ({len(market_streams)} symbol(s) via {MARKET_STREAM_URL})...")
+
+    await asyncio.gather(runtime.process(), *(market_stream.run() for market_stream in market_streams))
+
+def start_trade_journal():
+    """
+    Switches the ledger to write-behind trade logging (before state restore,
+    which replays it). The writer is started once the ledger is loaded.
+    """
+    if not TRADE_JOURNAL_PATH or LEDGER.journal is not None:
+        return
+    try:
+        journal = TradeJournal(TRADE_JOURNAL_PATH, fsync=TRADE_JOURNAL_FSYNC)
+        journal.open()
+        LEDGER.attach_journal(journal)
+        print(f"📒 Trade journal: {TRADE_JOURNAL_PATH} (fsync={TRADE_JOURNAL_FSYNC})")
+    except Exception as e:
+        print(f"⚠️ Trade journal unavailable, writing trades straight to the DB: {e}")
+
+def startup_step(phase, fn, *args):
+    """Runs one startup step and records how long it took."""
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.STARTUP_DURATION.set(elapsed, phase=phase)
+        print(f"⏱️ Startup [{phase}]: {elapsed * 1000:.0f}ms")
+
+def start_database():
+    """Schema, trade journal and ledger restore: everything that needs only the DB."""
     init_db()
+    start_trade_journal()
+    print(f"Detecting initial state from Database ({len(SYMBOLS)} symbol(s))...")
+    restore_state_from_db()
+    if LEDGER.journal is not None:
+        # Only now: a batch saved during the restore would be counted twice or not at all
+        LEDGER.journal.start()
+
+def load_markets(exchange):
+    """Market metadata from the on-disk cache when fresh (see market_cache.load_markets_cached)."""
+    if not MARKETS_CACHE_PATH:
+        exchange.load_markets()
+        return "exchange"
+    return load_markets_cached(exchange, MARKETS_CACHE_PATH, MARKETS_CACHE_MAX_AGE)
+
+def warm_candle_feeds():
+    for symbol in SYMBOLS:
+        get_candle_feed(symbol)
+
+def prepare_engine():
+    """
+    Startup: database, exchange connection and state restore.
+    Steps that do not depend on each other (database + ledger, market metadata,
+    candle warm-up) run concurrently.
+    Returns the exchange client, or None if the bot cannot trade.
+    """
+    global paper_balance
     
     if PAPER_MODE:
         print("\n⚠️ RUNNING IN PAPER MODE (Real Data / Fake Money)")
         print(f"Starting Paper Balance: ${paper_balance['USDT']:.2f} USDT")
-        
-        # Initialize exchange for public data only (no API keys needed)
-        exchange = ccxt.binance({
-            'enableRateLimit': True,
-            'options': {
-                'defaultType': 'spot',
-            }
-        })
-        print("--- Using Binance Production API (Public Data Only) ---")
     else:
         print("Starting Crypto Bot in [TESTNET] mode...")
-        
-        api_key = os.getenv('BINANCE_TESTNET_KEY')
-        secret_key = os.getenv('BINANCE_TESTNET_SECRET')
-
-        if not api_key or not secret_key:
-            print("Error: BINANCE_TESTNET_KEY or BINANCE_TESTNET_SECRET not found in .env")
-            return
-
-        exchange = ccxt.binance({
-            'apiKey': api_key,
-            'secret': secret_key,
-            'enableRateLimit': True,
-            'options': {
-                'defaultType': 'spot',
-            }
-        })
-        exchange.set_sandbox_mode(True)
-        print("--- Binance Sandbox Mode Enabled ---")
     
-    # Verify connection
     try:
-        exchange.load_markets()
-        print("Connected to Binance successfully!")
-        if not PAPER_MODE:
-             # Startup Alert
-            fields = [
-                {"name": "Strategy", "value": "Mean Reversion (4H)", "inline": True},
-                {"name": "Buy/Sell RSI", "value": f"{BUY_RSI_THRESHOLD} / {SELL_RSI_THRESHOLD}", "inline": True},
-                {"name": "Stop Loss", "value": f"{STOP_LOSS_PCT*100}%", "inline": True},
-                {"name": "Status", "value": "Waiting for Signal...", "inline": False}
-            ]
-            send_discord_alert("🤖 SYSTEM ONLINE", "Bot started successfully.", 0x0099FF, fields)
-    except Exception as e:
-        print(f"Connection failed: {e}")
-        return
+        exchange = get_exchange()
+    except ValueError as e:
+        print(f"Error: {e}")
+        return None
+
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup") as pool:
+        database = pool.submit(startup_step, 'database', start_database)
+        markets = pool.submit(startup_step, 'markets', load_markets, exchange)
+        candles = pool.submit(startup_step, 'candles', warm_candle_feeds)
+
+        # Verify connection (markets are loaded once here and shared with the API)
+        try:
+            source = markets.result()
+            print(f"Connected to Binance successfully! (markets from {source})")
+            if not PAPER_MODE:
+                 # Startup Alert
+                fields = [
+                    {"name": "Strategy", "value": "Mean Reversion (4H)", "inline": True},
+                    {"name": "Buy/Sell RSI", "value": f"{BUY_RSI_THRESHOLD} / {SELL_RSI_THRESHOLD}", "inline": True},
+                    {"name": "Stop Loss", "value": f"{STOP_LOSS_PCT*100}%", "inline": True},
+                    {"name": "Status", "value": "Waiting for Signal...", "inline": False}
+                ]
+                send_discord_alert("🤖 SYSTEM ONLINE", "Bot started successfully.", 0x0099FF, fields)
+        except Exception as e:
+            print(f"Connection failed: {e}")
+            return None
+
+        try:
+            database.result()
+        except ValueError as e:
+            # No DATABASE_URL: the bot cannot run without durable storage
+            print(f"Error: {e}")
+            return None
+        try:
+            candles.result()
+        except Exception as e:
+            print(f"Startup step failed: {e}")
 
-    print("Detecting initial state from Database...")
     try:
-        saved_state = restore_state_from_db()
-        last_action = None
+        total_pnl = LEDGER.pnl_stats()[0]
+        invested = 0.0
+        
+        for symbol in SYMBOLS:
+            saved_state = get_position_state(symbol)
+            
+            # Reconstruct Paper Balance from DB History
+            if PAPER_MODE:
+                asset = base_asset(symbol)
+                if saved_state['status'] == 'IN_POSITION':
+                    held_amount = saved_state['amount']
+                    entry_price = saved_state['entry_price']
+                    
+                    paper_balance[asset] = held_amount
+                    invested += entry_price * held_amount
+                    LAST_ACTIONS[symbol] = 'BUY'
+                    print(f"🔄 Restored Position: {held_amount:.5f} {asset} @ ${entry_price:,.2f}")
+                else:
+                    paper_balance[asset] = 0
+                    LAST_ACTIONS[symbol] = 'SELL'
         
-        # Reconstruct Paper Balance from DB History
         if PAPER_MODE:
-             total_pnl = saved_state['stats'].get('total_pnl_usdt', 0.0)
-             
-             if saved_state['status'] == 'IN_POSITION':
-                 # If in position, we hold BTC
-                 held_amount = saved_state['amount']
-                 entry_price = saved_state['entry_price']
-                 
-                 paper_balance['BTC'] = held_amount
-                 # USDT is Initial + Realized PnL (excluding current trade) - Cost of current trade
-                 # Actually, total_pnl from DB is ONLY realized profit.
-                 # So Balance = 10000 + total_pnl - (entry_price * held_amount)
-                 paper_balance['USDT'] = INITIAL_CAPITAL + total_pnl - (entry_price * held_amount)
-                 
-                 last_action = 'BUY'
-                 print(f"🔄 Restored Position: {held_amount:.5f} BTC @ ${entry_price:,.2f}")
-             else:
-                 # Neutral
-                 paper_balance['BTC'] = 0
-                 paper_balance['USDT'] = INITIAL_CAPITAL + total_pnl
-                 last_action = 'SELL'
-                 print(f"🔄 Restored Neutral: ${paper_balance['USDT']:,.2f} USDT")
-
+            # USDT is Initial + Realized PnL - Cost of the currently open positions
+            # (total_pnl from DB is ONLY realized profit, shared across symbols)
+            paper_balance[QUOTE_CURRENCY] = INITIAL_CAPITAL + total_pnl - invested
+        
         if not PAPER_MODE:
              # Logic for Testnet state matching (omitted for brevity, relying on wallet)
              pass
         
-        btc_value_in_usdt = paper_balance['BTC'] * exchange.fetch_ticker('BTC/USDT')['last']
-        print(f"Initial Logic State: {last_action} | Balance: ${paper_balance['USDT']:.2f} USDT / ${btc_value_in_usdt:.2f} BTC")
+        print(f"Initial Logic State: {LAST_ACTIONS} | Balance: ${paper_balance[QUOTE_CURRENCY]:.2f} USDT")
         
     except Exception as e:
         print(f"Error detecting initial state: {e}")
-        last_action = 'SELL'
+        for symbol in SYMBOLS:
+            LAST_ACTIONS.setdefault(symbol, 'SELL')
 
-    print("Starting Trading Loop (Interval: 10s)... Press Ctrl+C to stop.")
-    
-    loop_count = 0
-    while True:
-        loop_count += 1
-        last_action = run_bot(exchange, last_action)
-        
-        # Log performance every 360 loops (approx 1 hour at 10s interval)
-        if loop_count % 360 == 0:
-            log_performance(exchange)
-            
-        time.sleep(10)
+    return exchange
+
+async def run_engine(runtime):
+    """
+    The trading engine task (started by the app lifespan). Blocking steps run on a
+    worker thread one at a time; commands from the API are applied between them.
+    """
+    started = time.perf_counter()
+    exchange = await runtime.call(prepare_engine)
+    if exchange is None:
+        return
+
+    if MARKET_DATA_MODE == 'stream':
+        await run_streaming(runtime, exchange)
+        return
+
+    scheduler = CandleScheduler(CANDLE_TIMEFRAME, LOOP_INTERVAL_SECONDS, CANDLE_CLOSE_DELAY)
+    try:
+        offset = await runtime.call(scheduler.sync, exchange)
+        print(f"Exchange clock offset: {offset * 1000:+.0f}ms")
+    except Exception as e:
+        print(f"Could not sync exchange time ({e}). Using local clock.")
+
+    print(f"Starting Trading Loop (Strategy on {CANDLE_TIMEFRAME} close, risk checks every {LOOP_INTERVAL_SECONDS}s)...")
+
+    # Evaluate the last closed candle once at startup, then once per close
+    await runtime.call(run_bot, exchange)
+    elapsed = time.perf_counter() - started
+    metrics.STARTUP_DURATION.set(elapsed, phase='first_decision')
+    print(f"🚀 Time to first decision: {elapsed:.2f}s")
+
+    tick_count = 0
+    async def on_tick():
+        nonlocal tick_count
+        tick_count += 1
+        await runtime.call(run_risk_checks, exchange)
+        
+        # Log performance approx once an hour
+        if tick_count % max(1, 3600 // LOOP_INTERVAL_SECONDS) == 0:
+            await runtime.call(log_performance, exchange)
+
+    async def on_close():
+        await runtime.call(run_bot, exchange)
+
+    await scheduler.run_async(on_close, on_tick, wait=runtime.process)
+
+# --- Engine Commands ---
+# Applied by the engine task (see runtime.py), never concurrently with a loop step.
+
+def set_paused(paused):
+    global BOT_PAUSED
+    BOT_PAUSED = paused
+    return {"status": "paused" if paused else "running"}
+
+def apply_config(config):
+    global BUY_RSI_THRESHOLD, SELL_RSI_THRESHOLD, STOP_LOSS_PCT, TAKE_PROFIT_PCT, TRAILING_STOP_PCT
+    BUY_RSI_THRESHOLD = config.buy_rsi
+    SELL_RSI_THRESHOLD = config.sell_rsi
+    if config.symbol:
+        override = {"stop_loss": config.stop_loss, "take_profit": config.take_profit}
+        if config.trailing_stop is not None:
+            override["trailing_stop"] = config.trailing_stop or None
+        RISK_OVERRIDES[config.symbol.upper()] = override
+    else:
+        STOP_LOSS_PCT = config.stop_loss
+        TAKE_PROFIT_PCT = config.take_profit
+        if config.trailing_stop is not None:
+            TRAILING_STOP_PCT = config.trailing_stop or None  # 0 turns it off
+    # Triggers re-arm on the next price check since the settings are part of their key
+
+def manual_trade_command(action, symbol):
+    # Shared client: same session & rate limit as the loop
+    exchange = get_exchange()
+    ticker = market_cache(exchange).ticker(symbol)
+    price = ticker['last']
+    return execute_trade(exchange, symbol, action, price, reason="Manual Override")
+
+ENGINE = EngineRuntime(after_step=lambda: publish_snapshot())
+ENGINE.register('pause', lambda: set_paused(True))
+ENGINE.register('resume', lambda: set_paused(False))
+ENGINE.register('config', apply_config)
+ENGINE.register('trade', manual_trade_command)
+ENGINE.register('stream_kline', on_stream_kline)
+ENGINE.register('stream_trade', on_stream_trade)
 
 # --- FastAPI Endpoints ---
 
@@ -620,38 +997,105 @@ def read_root():
     return {
         "status": "online",
         "paper_mode": PAPER_MODE,
-        "balance": paper_balance if PAPER_MODE else "Testnet (Hidden)"
+        "balance": paper_balance if PAPER_MODE else "Testnet (Hidden)",
+        "alerts": ALERTS.stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    metrics.ALERT_QUEUE_LENGTH.set(ALERTS.queue_length)
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+MAX_TRADES_PER_REQUEST = 500
+EXPORT_BATCH_ROWS = 1000  # Rows per DB fetch and per streamed chunk
+TRADE_FIELDS = ["id", "symbol", "side", "price", "amount", "profit", "strategy", "timestamp"]
+
+def trade_filters(symbol=None, side=None, strategy=None, start=None, end=None):
+    return {
+        "symbol": symbol.upper() if symbol else None,
+        "side": side.upper() if side else None,
+        "strategy": strategy,
+        "start": start,
+        "end": end,
     }
 
 @app.get("/trades")
-def read_trades():
-    return get_recent_trades(limit=10)
+def read_trades(response: Response, limit: int = 10, after_id: int = None, cursor: str = None,
+                symbol: str = None, side: str = None, strategy: str = None,
+                start: datetime = None, end: datetime = None):
+    """
+    Trades newest first, keyset-paginated on (timestamp, id): pass the
+    `X-Next-Cursor` response header back as `cursor` for the next page.
+    Filters: symbol, side, strategy, start/end (end exclusive).
+    With `after_id`, only the trades newer than that id (oldest first) for incremental clients.
+    """
+    limit = max(1, min(limit, MAX_TRADES_PER_REQUEST))
+    if after_id is not None:
+        return get_trades_after(after_id, limit=limit)
+    try:
+        trades, next_cursor = query_trades(cursor=cursor, limit=limit, **trade_filters(symbol, side, strategy, start, end))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return trades
 
-@app.get("/stats")
-def read_stats():
-    total_pnl, win_rate, total_trades = get_pnl_stats()
+def export_chunks(rows, fmt):
+    """Groups rows into NDJSON/CSV text chunks of EXPORT_BATCH_ROWS rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TRADE_FIELDS) if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+    count = 0
+    for row in rows:
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row))
+            buffer.write("\n")
+        count += 1
+        if count % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.get("/trades/export")
+def export_trades(fmt: str = Query("ndjson", alias="format"), symbol: str = None, side: str = None, strategy: str = None,
+                  start: datetime = None, end: datetime = None):
+    """
+    Streams every matching trade (oldest first) as NDJSON or CSV, straight from a
+    server-side DB cursor: constant memory, first bytes sent right away.
+    """
+    fmt = fmt.lower()
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Invalid format. Use ndjson or csv.")
+    rows = iter_trades(batch_size=EXPORT_BATCH_ROWS, **trade_filters(symbol, side, strategy, start, end))
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="trades.{fmt}"'}
+    return StreamingResponse(export_chunks(rows, fmt), media_type=media_type, headers=headers)
+
+def build_stats():
+    """
+    The engine state served by /stats, from memory only: ledger aggregates,
+    balances, and the prices/RSI last seen by the loop.
+    """
+    total_pnl, win_rate, total_trades = LEDGER.pnl_stats()
     
     # Get current wallet
-    usdt = 0
-    btc = 0
+    balances = {}
     if PAPER_MODE:
-        usdt = paper_balance['USDT']
-        btc = paper_balance['BTC']
+        balances = get_balances(None)
     else:
         # For production balance, we would need keys.
-        # Ideally, main loop updates a global variable with latest balance to avoid API spam here.
         # But for now, we return what we have (PAPER_MODE is True on production anyway).
         pass
 
-    # Fetch Price for Equity Calculation
-    try:
-        temp_exchange = ccxt.binance({'enableRateLimit': True})
-        ticker = temp_exchange.fetch_ticker('BTC/USDT')
-        current_price = ticker['last']
-    except:
-        current_price = 0
-        
-    total_equity = usdt + (btc * current_price)
+    # Prices for Equity Calculation (last seen by the loop)
+    prices = dict(LAST_PRICES)
+    total_equity = value_holdings(balances, prices)
         
     return {
         "status": "paused" if BOT_PAUSED else "running",
@@ -659,96 +1103,125 @@ def read_stats():
         "win_rate": f"{win_rate:.2f}%",
         "total_trades": total_trades,
         "wallet_value": total_equity, # New Field
-        "usdt_balance": usdt,
-        "btc_balance": btc,
+        "usdt_balance": balances.get(QUOTE_CURRENCY, 0),
+        "btc_balance": balances.get('BTC', 0),
+        "balances": balances,
+        "symbols": SYMBOLS,
         "current_rsi": CURRENT_RSI,
+        "rsi": dict(RSI_BY_SYMBOL),
+        "prices": prices,
         "config": {
             "buy_rsi": BUY_RSI_THRESHOLD,
             "sell_rsi": SELL_RSI_THRESHOLD,
             "stop_loss": STOP_LOSS_PCT,
-            "take_profit": TAKE_PROFIT_PCT
+            "take_profit": TAKE_PROFIT_PCT,
+            "trailing_stop": TRAILING_STOP_PCT,
+            "overrides": {symbol: dict(o) for symbol, o in RISK_OVERRIDES.items()}
         }
     }
 
+def publish_snapshot():
+    """
+    Publishes the current engine state for /stats (called after every engine step)
+    and pushes what changed to /events subscribers.
+    """
+    with PUBLISH_LOCK:
+        # One publisher at a time: the delta is computed against the snapshot it replaces
+        previous = SNAPSHOTS.current
+        snapshot = SNAPSHOTS.publish(build_stats())
+        if snapshot is not previous:
+            EVENTS.publish('state', changed_fields(previous.data if previous else None, snapshot.data))
+        return snapshot
+
+@app.get("/stats")
+async def read_stats(request: Request):
+    # Latest published snapshot: no DB, no exchange, pre-serialized body
+    snapshot = SNAPSHOTS.current or publish_snapshot()
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+def snapshot_event():
+    """Full state as an SSE message, tagged with the latest event id for resuming."""
+    snapshot = SNAPSHOTS.current or publish_snapshot()
+    return format_sse('snapshot', snapshot.data, EVENTS.last_id)
+
+@app.get("/events")
+async def stream_events(request: Request):
+    """
+    Server-sent events: a full `snapshot` first (or the missed events when resuming
+    with Last-Event-ID), then `state` deltas and `trade` events as they happen.
+    Idle connections only carry a keep-alive comment every SSE_KEEPALIVE_SECONDS.
+    """
+    try:
+        last_event_id = int(request.headers.get("last-event-id"))
+    except (TypeError, ValueError):
+        last_event_id = None
+    subscription, replay = EVENTS.subscribe(last_event_id)
+
+    async def event_stream():
+        try:
+            if replay is None:
+                yield snapshot_event()
+            else:
+                for event in replay:
+                    yield event.encoded
+            while True:
+                try:
+                    event = await subscription.get(SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                # None = this client fell behind and its backlog was dropped
+                yield event.encoded if event is not None else snapshot_event()
+        finally:
+            EVENTS.unsubscribe(subscription)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
 class ConfigUpdate(BaseModel):
     buy_rsi: int
     sell_rsi: int
     stop_loss: float
     take_profit: float
+    trailing_stop: Optional[float] = None  # Omitted = unchanged, 0 = off
+    symbol: Optional[str] = None  # If set, stop/take/trailing apply to this symbol only
 
 @app.post("/config")
-def update_config(config: ConfigUpdate):
-    global BUY_RSI_THRESHOLD, SELL_RSI_THRESHOLD, STOP_LOSS_PCT, TAKE_PROFIT_PCT
-    BUY_RSI_THRESHOLD = config.buy_rsi
-    SELL_RSI_THRESHOLD = config.sell_rsi
-    STOP_LOSS_PCT = config.stop_loss
-    TAKE_PROFIT_PCT = config.take_profit
+async def update_config(config: ConfigUpdate):
+    if config.symbol and config.symbol.upper() not in SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Unknown symbol. Trading: {', '.join(SYMBOLS)}")
+    await ENGINE.submit('config', config)
     return {"message": "Configuration updated", "config": config}
 
 @app.post("/control/{command}")
-def control_bot(command: str):
-    global BOT_PAUSED
+async def control_bot(command: str):
     command = command.lower()
-    if command == "pause":
-        BOT_PAUSED = True
-        return {"status": "paused"}
-    elif command == "resume":
-        BOT_PAUSED = False
-        return {"status": "running"}
-    else:
+    if command not in ("pause", "resume"):
         raise HTTPException(status_code=400, detail="Invalid command. Use pause or resume.")
+    return await ENGINE.submit(command)
 
 @app.post("/trade/{action}")
-def manual_trade(action: str):
+async def manual_trade(action: str, symbol: str = None):
     action = action.upper()
     if action not in ['BUY', 'SELL']:
         raise HTTPException(status_code=400, detail="Invalid action. Use BUY or SELL.")
+    symbol = (symbol or SYMBOLS[0]).upper()
+    if symbol not in SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Unknown symbol. Trading: {', '.join(SYMBOLS)}")
         
-    # We need to fetch current price to execute
+    # Executed by the engine, in order with the loop's own trades
     try:
-        if PAPER_MODE:
-             # Just init a public exchange instance for price check if using production api
-             # But main() initializes 'exchange' locally. We need access to 'exchange'.
-             # For simplicity, we create a temporary exchange instance here since it's just one call.
-             temp_exchange = ccxt.binance({'enableRateLimit': True, 'options': {'defaultType': 'spot'}})
-             ticker = temp_exchange.fetch_ticker('BTC/USDT')
-             price = ticker['last']
-             
-             success = execute_trade(temp_exchange, 'BTC/USDT', action, price, reason="Manual Override")
-             if success:
-                 return {"message": f"Manual {action} executed successfully"}
-             else:
-                 raise HTTPException(status_code=400, detail="Trade failed (Insufficient balance or error)")
-        else:
-             # In Testnet mode, we need keys. 
-             # Refactoring to make 'exchange' global would be best, but for now:
-             api_key = os.getenv('BINANCE_TESTNET_KEY')
-             secret_key = os.getenv('BINANCE_TESTNET_SECRET')
-             temp_exchange = ccxt.binance({
-                'apiKey': api_key,
-                'secret': secret_key,
-                'enableRateLimit': True,
-                'options': {'defaultType': 'spot'}
-             })
-             temp_exchange.set_sandbox_mode(True)
-             
-             ticker = temp_exchange.fetch_ticker('BTC/USDT')
-             price = ticker['last']
-             
-             success = execute_trade(temp_exchange, 'BTC/USDT', action, price, reason="Manual Override")
-             if success:
-                 return {"message": f"Manual {action} executed successfully"}
-             else:
-                 raise HTTPException(status_code=400, detail="Trade failed")
-                 
+        success = await ENGINE.submit('trade', action, symbol)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.on_event("startup")
-def startup_event():
-    print("Starting Trading Bot in Background Thread...")
-    t = threading.Thread(target=start_trading_loop, daemon=True)
-    t.start()
+    if success:
+        return {"message": f"Manual {action} executed successfully"}
+    raise HTTPException(status_code=400, detail="Trade failed (Insufficient balance or error)")
     
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+import weakref
+
+from metrics import exchange_call
+
+class _Call:
+    """An in-flight exchange request that other callers can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class MarketDataCache:
+    """
+    TTL cache for ticker and balance snapshots in front of one exchange client.
+
+    Concurrent misses for the same key are coalesced: the first caller performs
+    the request and everyone else waits for its result (single flight), so a
+    burst of readers costs one exchange call.
+    """
+
+    def __init__(self, exchange, ttl=2.0, clock=time.monotonic):
+        # Weak so the registry below does not keep dead clients alive
+        self.exchange = weakref.proxy(exchange)
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}   # key -> (expires_at, value)
+        self._inflight = {}  # key -> _Call
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > self.clock():
+                self.hits += 1
+                return entry[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                self.misses += 1
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = loader()
+            self.put(key, call.value)
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    # --- Typed accessors ---
+
+    def ticker(self, symbol):
+        return self.get(('ticker', symbol), lambda: exchange_call(self.exchange, 'fetch_ticker', symbol))
+
+    def tickers(self, symbols):
+        """Tickers for several symbols; the stale ones are fetched in one batched call."""
+        result = {}
+        missing = []
+        now = self.clock()
+        with self._lock:
+            for symbol in symbols:
+                entry = self._entries.get(('ticker', symbol))
+                if entry and entry[0] > now:
+                    self.hits += 1
+                    result[symbol] = entry[1]
+                else:
+                    missing.append(symbol)
+        if missing:
+            self.misses += 1
+            for symbol, ticker in exchange_call(self.exchange, 'fetch_tickers', missing).items():
+                self.put(('ticker', symbol), ticker)
+                result[symbol] = ticker
+        return result
+
+    def balance(self):
+        return self.get(('balance',), lambda: exchange_call(self.exchange, 'fetch_balance'))
+
+    def put_price(self, symbol, price):
+        """Primes the ticker from a price we already have (candle close, trade print)."""
+        self.put(('ticker', symbol), {'symbol': symbol, 'last': price})
+
+    def apply_fill(self, deltas):
+        """
+        Applies an order fill ({asset: signed amount}) to the cached balance snapshot
+        instead of re-fetching it right after the order. The next refresh after the
+        TTL picks up fees and anything else the estimate missed.
+        """
+        with self._lock:
+            entry = self._entries.get(('balance',))
+            if not entry:
+                return
+            expires_at, snapshot = entry
+            snapshot = dict(snapshot)
+            for section in ('total', 'free'):
+                if section in snapshot:
+                    snapshot[section] = dict(snapshot[section])
+                    for asset, delta in deltas.items():
+                        snapshot[section][asset] = (snapshot[section].get(asset) or 0) + delta
+            self._entries[('balance',)] = (expires_at, snapshot)
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+def get_market_cache(exchange, ttl=2.0):
+    """The cache belonging to `exchange` (created on first use, dropped with the client)."""
+    with _caches_lock:
+        cache = _caches.get(exchange)
+        if cache is None:
+            cache = _caches[exchange] = MarketDataCache(exchange, ttl)
+        return cache
+
+def load_markets_cached(exchange, path, max_age=86400, clock=time.time):
+    """
+    Loads the exchange's market metadata from the on-disk cache at `path` when
+    it is younger than `max_age` seconds, otherwise from the exchange (and
+    refreshes the cache). A stale cache is still used if the exchange is unreachable.
+    Returns "cache", "exchange" or "stale cache".
+    """
+    cached = None
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get('exchange') != exchange.id or cached.get('sandbox') != bool(getattr(exchange, 'isSandboxModeEnabled', False)):
+            cached = None  # Written for another exchange/mode
+    except (OSError, ValueError):
+        pass
+
+    if cached and clock() - cached['saved_at'] < max_age:
+        exchange.set_markets(cached['markets'], cached.get('currencies'))
+        return "cache"
+
+    try:
+        markets = exchange_call(exchange, 'load_markets', True)
+    except Exception:
+        if not cached:
+            raise
+        print("⚠️ Market metadata refresh failed, using the stale cache")
+        exchange.set_markets(cached['markets'], cached.get('currencies'))
+        return "stale cache"
+
+    try:
+        payload = {
+            "exchange": exchange.id,
+            "sandbox": bool(getattr(exchange, 'isSandboxModeEnabled', False)),
+            "saved_at": clock(),
+            "markets": markets,
+            "currencies": exchange.currencies,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Could not write the markets cache: {e}")
+    return "exchange"
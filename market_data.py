@@ -0,0 +1,122 @@
+import time
+from collections import deque
+
+from indicators import WilderRSI
+from metrics import exchange_call, PHASE_DURATION
+from scheduler import timeframe_seconds
+
+
+class CandleFeed:
+    """
+    Rolling OHLCV window for one symbol/timeframe.
+
+    The first refresh pulls `history` bars; after that only candles at or after
+    the last one seen are requested (normally just the forming bar, plus the
+    next one right after a close). Closed bars are pushed into a `WilderRSI`
+    once, and the forming bar is evaluated provisionally on every refresh.
+    """
+
+    def __init__(self, symbol, timeframe='4h', history=100, rsi_period=14, store=None):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.history = history
+        self.bars = deque(maxlen=history)  # [timestamp, open, high, low, close, volume], forming bar last
+        self.rsi = WilderRSI(rsi_period)
+        self.store = store  # Optional CandleStore that receives every closed bar
+        self._unsaved = []
+        self._batching = False
+        self.autosave = True  # False: the owner calls save() itself, e.g. the stream, off the event loop
+
+    def warm_start(self, now=None):
+        """
+        Seeds the window from the candle store so the first refresh only asks
+        the exchange for what happened since. Returns True if it was used.
+        Skipped when the stored bars are too old for one refresh to catch up.
+        """
+        if self.store is None or self.bars:
+            return False
+        bars = self.store.latest(self.symbol, self.timeframe, self.history)
+        now_ms = (now if now is not None else time.time()) * 1000
+        if not bars or now_ms - bars[-1][0] > (self.history - 1) * timeframe_seconds(self.timeframe) * 1000:
+            return False
+        # The newest stored bar is taken as forming; the next refresh re-fetches it
+        for bar in bars:
+            self.update(bar)
+        self._unsaved = []
+        print(f"🗄️ Warm start [{self.symbol}]: {len(bars)} bars from the candle store")
+        return True
+
+    def save(self):
+        """Writes the bars closed since the last save to the store."""
+        if self.store is None or not self._unsaved:
+            return
+        # Swapped out first: the stream keeps appending while a save runs on a worker thread
+        bars, self._unsaved = self._unsaved, []
+        try:
+            self.store.upsert(self.symbol, self.timeframe, bars)
+        except Exception as e:
+            self._unsaved = bars + self._unsaved
+            print(f"Error saving candles to the store: {e}")
+
+    @property
+    def last_close(self):
+        return self.bars[-1][4] if self.bars else None
+
+    @property
+    def last_rsi(self):
+        """Provisional RSI including the still-forming bar."""
+        if not self.bars:
+            return float('nan')
+        return self.rsi.peek(self.bars[-1][4])
+
+    def closed(self):
+        """(close, rsi) of the most recent closed bar, i.e. the one before the forming bar."""
+        if len(self.bars) < 2:
+            return None, float('nan')
+        return self.bars[-2][4], self.rsi.value
+
+    def update(self, bar):
+        """
+        Merge a single candle into the window.
+        Returns True if it closed the previous forming bar.
+        """
+        bar = list(bar)
+        if self.bars:
+            forming_ts = self.bars[-1][0]
+            if bar[0] < forming_ts:
+                return False  # Stale candle, already accounted for
+            if bar[0] == forming_ts:
+                self.bars[-1] = bar
+                return False
+            # A newer candle means the forming bar is final
+            self.rsi.update(self.bars[-1][4])
+            if self.store is not None:
+                self._unsaved.append(self.bars[-1])
+                if self.autosave and not self._batching:
+                    self.save()
+            self.bars.append(bar)
+            return True
+
+        self.bars.append(bar)
+        return False
+
+    def refresh(self, exchange):
+        """
+        Fetch only the candles we have not seen yet.
+        Returns (last_close, last_rsi) for the forming bar.
+        """
+        if self.bars:
+            bars = exchange_call(exchange, 'fetch_ohlcv', self.symbol, timeframe=self.timeframe, since=self.bars[-1][0], limit=self.history)
+        else:
+            bars = exchange_call(exchange, 'fetch_ohlcv', self.symbol, timeframe=self.timeframe, limit=self.history)
+
+        with PHASE_DURATION.time(phase='indicators'):
+            self._batching = True
+            try:
+                for bar in bars:
+                    self.update(bar)
+            finally:
+                self._batching = False
+        if self.autosave:
+            self.save()
+        return self.last_close, self.last_rsi
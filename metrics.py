@@ -0,0 +1,199 @@
+import functools
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+        return sum(counts)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    """Process-wide metric registry rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- Bot metrics ---
+STARTUP_DURATION = REGISTRY.gauge("bot_startup_seconds", "Duration of each startup step, and total time to the first decision", ["phase"])
+LOOP_DURATION = REGISTRY.histogram("bot_loop_duration_seconds", "Wall time of one trading loop iteration", ["kind"])
+LOOP_LAG = REGISTRY.histogram("bot_loop_lag_seconds", "How late a loop iteration started versus its schedule", ["kind"])
+LOOP_OVERRUNS = REGISTRY.counter("bot_loop_overruns_total", "Loop iterations that exceeded their time budget", ["kind"])
+PHASE_DURATION = REGISTRY.histogram("bot_phase_duration_seconds", "Time spent per trading loop phase", ["phase"])
+EXCHANGE_DURATION = REGISTRY.histogram("bot_exchange_request_duration_seconds", "Exchange API call latency", ["call"])
+EXCHANGE_ERRORS = REGISTRY.counter("bot_exchange_errors_total", "Exchange API calls that raised", ["call"])
+EXCHANGE_WEIGHT = REGISTRY.gauge("bot_exchange_used_weight_1m", "Binance request weight used in the current minute")
+DB_DURATION = REGISTRY.histogram("bot_db_query_duration_seconds", "Database call latency", ["op"])
+DB_ERRORS = REGISTRY.counter("bot_db_errors_total", "Database calls that raised", ["op"])
+ALERT_DURATION = REGISTRY.histogram("bot_alert_post_duration_seconds", "Discord webhook POST latency")
+ALERTS_TOTAL = REGISTRY.counter("bot_alerts_total", "Discord alerts by outcome (sent, dropped, failed)", ["outcome"])
+ALERT_QUEUE_LENGTH = REGISTRY.gauge("bot_alert_queue_length", "Discord alerts waiting to be sent")
+ENGINE_COMMANDS = REGISTRY.counter("bot_engine_commands_total", "Engine commands by outcome (applied, coalesced, dropped)", ["outcome"])
+JOURNAL_PENDING = REGISTRY.gauge("bot_trade_journal_pending", "Journaled trades not yet written to the database")
+JOURNAL_BATCH_SIZE = REGISTRY.histogram("bot_trade_journal_batch_size", "Trades per database commit from the trade journal", buckets=(1, 5, 10, 50, 100, 500, 1000))
+
+def exchange_call(exchange, call, *args, **kwargs):
+    """
+    Runs `exchange.<call>(*args, **kwargs)` with latency/error accounting and
+    records Binance's used request weight from the response headers.
+    """
+    start = time.perf_counter()
+    try:
+        return getattr(exchange, call)(*args, **kwargs)
+    except Exception:
+        EXCHANGE_ERRORS.inc(call=call)
+        raise
+    finally:
+        EXCHANGE_DURATION.observe(time.perf_counter() - start, call=call)
+        weight = used_weight(getattr(exchange, 'last_response_headers', None))
+        if weight is not None:
+            EXCHANGE_WEIGHT.set(weight)
+
+def used_weight(headers):
+    """
+    X-MBX-USED-WEIGHT-1M from response headers, or None. ccxt keeps them in a
+    requests CaseInsensitiveDict (a Mapping, not a dict); any header case matches.
+    """
+    if not isinstance(headers, Mapping):
+        return None
+    for name, value in headers.items():
+        if name.lower() == 'x-mbx-used-weight-1m':
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+def timed_db(op):
+    """Decorator timing a database helper under bot_db_query_duration_seconds{op=...}."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                DB_ERRORS.inc(op=op)
+                raise
+            finally:
+                DB_DURATION.observe(time.perf_counter() - start, op=op)
+        return wrapper
+    return decorator
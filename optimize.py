@@ -1,32 +1,31 @@
-import pandas as pd
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+from candle_store import load_history
+import indicators
 
 def calculate_indicators(df):
-    # RSI 14
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).ewm(com=13, adjust=False).mean()
-    loss = (-delta.where(delta < 0, 0)).ewm(com=13, adjust=False).mean()
-    rs = gain / loss
-    df['rsi_14'] = 100 - (100 / (1 + rs))
-    
-    # SMAs
-    df['sma_20'] = df['close'].rolling(window=20).mean()
-    df['sma_50'] = df['close'].rolling(window=50).mean()
-    df['sma_100'] = df['close'].rolling(window=100).mean()
-    
+    df['rsi_14'] = indicators.rsi(df['close'], 14)
+    for window in (20, 50, 100):
+        df[f'sma_{window}'] = indicators.sma(df['close'], window)
     return df
 
 def run_simulation(df, buy_rsi, sell_rsi, sl_pct):
+    return simulate(df['close'].values, df['rsi_14'].values, buy_rsi, sell_rsi, sl_pct)
+
+def simulate(closes, rsis, buy_rsi, sell_rsi, sl_pct):
     usdt_balance = 10000
     btc_balance = 0
     in_position = False
     entry_price = 0
     trade_count = 0
     
-    # Pre-calculate values
-    closes = df['close'].values
-    rsis = df['rsi_14'].values
-    
-    for i in range(20, len(df)):
+    for i in range(20, len(closes)):
         price = closes[i]
         rsi = rsis[i]
         
@@ -52,58 +51,163 @@ def run_simulation(df, buy_rsi, sell_rsi, sl_pct):
 
     # Final Value
     if in_position:
-        final_equity = btc_balance * df.iloc[-1]['close']
+        final_equity = btc_balance * closes[-1]
     else:
         final_equity = usdt_balance
         
     roi = ((final_equity - 10000) / 10000) * 100
     return roi, trade_count
 
-def optimize():
+# --- Parallel grid search ---
+# The close and indicator arrays are copied into shared memory once; workers
+# map them read-only instead of receiving a pickled DataFrame per task.
+
+class SharedArrays:
+    """Named float64 arrays in shared memory. `spec` is what a worker needs to attach."""
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.spec = {}
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values, dtype=np.float64)
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=np.float64, buffer=block.buf)[:] = values
+            self.blocks.append(block)
+            self.spec[name] = (block.name, values.shape)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_worker_blocks = []
+_worker_arrays = {}
+_worker_lists = {}
+
+def _attach(spec):
+    """Pool initializer: maps the shared arrays into this worker."""
+    for name, (block_name, shape) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_blocks.append(block)  # Keep the mapping alive
+        array = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        array.setflags(write=False)
+        _worker_arrays[name] = array
+        # Python floats, converted once per worker: the per-bar loop is faster
+        # on lists than on NumPy scalars
+        _worker_lists[name] = array.tolist()
+
+def _evaluate(chunk):
+    closes, rsis = _worker_lists['close'], _worker_lists['rsi_14']
+    return [(params, *simulate(closes, rsis, *params)) for params in chunk]
+
+def grid_search(df, grid, workers=None, chunk_size=None, progress=True):
+    """
+    Runs `simulate` for every (buy_rsi, sell_rsi, sl_pct) in `grid` over a
+    process pool and yields (params, roi, trades) as results come in, in
+    completion order. workers=1 runs in this process.
+    """
+    grid = list(grid)
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per worker: enough to balance the load, few enough that
+    # dispatch overhead stays small next to the simulations
+    chunk_size = chunk_size or max(1, len(grid) // (workers * 4))
+    chunks = [grid[i:i + chunk_size] for i in range(0, len(grid), chunk_size)]
+    arrays = {'close': df['close'].values, 'rsi_14': df['rsi_14'].values}
+
+    done = 0
+    started = time.perf_counter()
+    with SharedArrays(arrays) as shared:
+        if workers == 1:
+            _attach(shared.spec)
+            finished = (_evaluate(chunk) for chunk in chunks)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shared.spec,))
+            futures = [pool.submit(_evaluate, chunk) for chunk in chunks]
+            finished = (future.result() for future in as_completed(futures))
+        try:
+            for results in finished:
+                for result in results:
+                    yield result
+                done += len(results)
+                if progress:
+                    elapsed = time.perf_counter() - started
+                    print(f"\r⏳ {done}/{len(grid)} ({done / len(grid):.0%}) | {done / elapsed:.0f} runs/s", end="", flush=True)
+        finally:
+            if workers == 1:
+                _detach()
+            else:
+                pool.shutdown(cancel_futures=True)
+            if progress:
+                print()
+
+def _detach():
+    _worker_arrays.clear()
+    _worker_lists.clear()
+    for block in _worker_blocks:
+        block.close()
+    _worker_blocks.clear()
+
+def parse_range(text):
+    """"25,30,35" or "start:stop:step" (stop inclusive)."""
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        values = [round(v, 10) for v in np.arange(start, stop + step / 2, step)]
+    else:
+        values = [float(x) for x in text.split(",")]
+    return [int(v) if v.is_integer() else v for v in values]
+
+def optimize(buy_rsis=(25, 30, 35), sell_rsis=(65, 70, 75), stop_losses=(0.05, 0.10, 100.0), workers=None):
+    # Parameter Grid (Mean Reversion). 100.0 stop loss is the "No Stop" option
+    grid = list(itertools.product(buy_rsis, sell_rsis, stop_losses))
+    if not grid:
+        print("Error: empty parameter grid. Check the --buy-rsi, --sell-rsi and --stop-loss ranges.")
+        return
+    
     print("--- Loading Data ---")
     try:
-        df = pd.read_csv('btc_4h_2023.csv')
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df = load_history('BTC/USDT', '4h', start='2023-01-01', end='2024-01-01', csv='btc_4h_2023.csv')
     except:
-        print("Error: btc_4h_2023.csv not found.")
+        print("Error: 2023 data not found. Run download_data.py first.")
         return
         
     print("--- Calculating Indicators ---")
     df = calculate_indicators(df)
     
-    # Parameter Grids (Mean Reversion)
-    buy_rsis = [25, 30, 35]
-    sell_rsis = [65, 70, 75]
-    stop_losses = [0.05, 0.10, 100.0] # Added 100.0 as "No Stop" option just in case
-    
-    best_roi = -9999
-    best_params = {}
+    order = {params: i for i, params in enumerate(grid)}
+    best = None
     
-    print("--- Starting Mean Reversion Grid Search ---")
+    print(f"--- Starting Mean Reversion Grid Search ({len(grid)} combinations) ---")
     
-    for buy_r in buy_rsis:
-        for sell_r in sell_rsis:
-            for sl in stop_losses:
-                roi, trades = run_simulation(df, buy_r, sell_r, sl)
-                
-                # print(f"Tested: Buy RSI {buy_r} | Sell RSI {sell_r} | SL {sl*100}% -> ROI: {roi:.2f}% ({trades} trades)")
-                
-                if roi > best_roi:
-                    best_roi = roi
-                    best_params = {
-                        "BuyRSI": buy_r,
-                        "SellRSI": sell_r,
-                        "SL": sl,
-                        "Trades": trades
-                    }
+    for params, roi, trades in grid_search(df, grid, workers=workers):
+        # Results arrive out of order: ties go to the earlier grid point, as in a serial run
+        if best is None or (roi, -order[params]) > (best[1], -order[best[0]]):
+            best = (params, roi, trades)
+    if best is None:
+        print("Error: the grid search returned no results.")
+        return
     
+    (buy_r, sell_r, sl), best_roi, trades = best
     print("-" * 40)
     print(f"🏆 WINNING PARAMETERS (Mean Reversion):")
-    print(f"Buy RSI < {best_params['BuyRSI']}")
-    print(f"Sell RSI > {best_params['SellRSI']}")
-    print(f"Stop Loss: {best_params['SL']*100:.0f}%")
-    print(f"Result: {best_roi:.2f}% ROI (Trades: {best_params['Trades']})")
+    print(f"Buy RSI < {buy_r}")
+    print(f"Sell RSI > {sell_r}")
+    print(f"Stop Loss: {sl*100:.0f}%")
+    print(f"Result: {best_roi:.2f}% ROI (Trades: {trades})")
     print("-" * 40)
     
 if __name__ == "__main__":
-    optimize()
+    parser = argparse.ArgumentParser(description="Mean reversion grid search.")
+    parser.add_argument("--buy-rsi", default="25,30,35", help='Values: "25,30,35" or "start:stop:step"')
+    parser.add_argument("--sell-rsi", default="65,70,75")
+    parser.add_argument("--stop-loss", default="0.05,0.10,100.0")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    args = parser.parse_args()
+
+    optimize(parse_range(args.buy_rsi), parse_range(args.sell_rsi), parse_range(args.stop_loss), args.workers)
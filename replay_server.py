@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import json
+
+import pandas as pd
+from websockets.asyncio.server import serve
+
+def load_candles(filename):
+    """Loads a download_data.py CSV into ccxt-style [ms, o, h, l, c, v] bars."""
+    df = pd.read_csv(filename)
+    ts = pd.to_datetime(df['timestamp'])
+    df['timestamp'] = (ts - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+    return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].values.tolist()
+
+def kline_event(symbol, timeframe, bar, closed):
+    market = symbol.replace('/', '')
+    ts, o, h, l, c, v = bar
+    return {
+        "stream": f"{market.lower()}@kline_{timeframe}",
+        "data": {
+            "e": "kline",
+            "s": market,
+            "k": {"t": int(ts), "i": timeframe, "o": str(o), "h": str(h), "l": str(l), "c": str(c), "v": str(v), "x": closed}
+        }
+    }
+
+def trade_event(symbol, ts, price):
+    market = symbol.replace('/', '')
+    return {
+        "stream": f"{market.lower()}@trade",
+        "data": {"e": "trade", "s": market, "T": int(ts), "p": str(price), "q": "0.001"}
+    }
+
+def bar_events(symbol, timeframe, bar):
+    """
+    Replays one candle as Binance would: trades walking open -> extreme -> extreme -> close,
+    each followed by a forming-kline update, then the final closed kline.
+    """
+    ts, o, h, l, c, v = bar
+    path = [o, l, h, c] if c >= o else [o, h, l, c]
+    high = low = o
+    for price in path:
+        high, low = max(high, price), min(low, price)
+        yield trade_event(symbol, ts, price)
+        yield kline_event(symbol, timeframe, [ts, o, high, low, price, v], False)
+    yield kline_event(symbol, timeframe, bar, True)
+
+class ReplayServer:
+    """
+    Local stand-in for the Binance combined stream, replaying recorded candles.
+
+    The replay cursor is shared across connections, so a client that reconnects
+    resumes where it left off. `drop_every` closes the connection after that many
+    candles to exercise reconnect/backfill logic.
+    """
+
+    def __init__(self, candles, symbol='BTC/USDT', timeframe='4h', delay=0.0, drop_every=None):
+        self.candles = candles
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.delay = delay
+        self.drop_every = drop_every
+        self.cursor = 0
+        self.connections = 0
+
+    async def handler(self, websocket):
+        self.connections += 1
+        sent = 0
+        while self.cursor < len(self.candles):
+            for event in bar_events(self.symbol, self.timeframe, self.candles[self.cursor]):
+                await websocket.send(json.dumps(event))
+            self.cursor += 1
+            sent += 1
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.drop_every and sent >= self.drop_every:
+                break
+        await websocket.close()
+
+    def serve(self, host='127.0.0.1', port=8765):
+        return serve(self.handler, host, port)
+
+async def main(args):
+    server = ReplayServer(load_candles(args.csv), args.symbol, args.timeframe, args.delay)
+    async with server.serve(args.host, args.port):
+        print(f"Replaying {len(server.candles)} candles on ws://{args.host}:{args.port}")
+        await asyncio.Future()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded candles as a Binance-style websocket stream.")
+    parser.add_argument("csv", help="CSV produced by download_data.py, e.g. btc_4h_2023.csv")
+    parser.add_argument("--symbol", default="BTC/USDT")
+    parser.add_argument("--timeframe", default="4h")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.05, help="Seconds between candles")
+    asyncio.run(main(parser.parse_args()))
@@ -1,26 +1,12 @@
 import pandas as pd
+from candle_store import load_history
 import numpy as np
+import indicators
 
 def calculate_indicators(df):
-    # RSI 14
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).ewm(com=13, adjust=False).mean()
-    loss = (-delta.where(delta < 0, 0)).ewm(com=13, adjust=False).mean()
-    rs = gain / loss
-    df['rsi'] = 100 - (100 / (1 + rs))
-
-    # MACD (12, 26, 9)
-    k = df['close'].ewm(span=12, adjust=False, min_periods=12).mean()
-    d = df['close'].ewm(span=26, adjust=False, min_periods=26).mean()
-    df['macd'] = k - d
-    df['macd_signal'] = df['macd'].ewm(span=9, adjust=False, min_periods=9).mean()
-
-    # Bollinger Bands (20, 2)
-    df['bb_mid'] = df['close'].rolling(window=20).mean()
-    df['bb_std'] = df['close'].rolling(window=20).std()
-    df['bb_upper'] = df['bb_mid'] + (2 * df['bb_std'])
-    df['bb_lower'] = df['bb_mid'] - (2 * df['bb_std'])
-    
+    df['rsi'] = indicators.rsi(df['close'], 14)
+    df['macd'], df['macd_signal'] = indicators.macd(df['close'], 12, 26, 9)
+    df['bb_mid'], df['bb_upper'], df['bb_lower'] = indicators.bollinger(df['close'], 20, 2)
     return df
 
 def run_simulation(df, strategy_name):
@@ -100,7 +86,7 @@ def run_simulation(df, strategy_name):
 
 def research():
     try:
-        df = pd.read_csv('btc_4h_2024.csv') # Use 2024 data
+        df = load_history('BTC/USDT', '4h', start='2024-01-01', end='2025-01-01', csv='btc_4h_2024.csv') # Use 2024 data
         df = calculate_indicators(df)
     except:
         print("Error: 2024 Data not found.")
@@ -1,45 +1,14 @@
 import pandas as pd
+from candle_store import load_history
 import numpy as np
+import indicators
 
 def calculate_kama(df, n=10):
-    # Change = abs(Price - Price[n])
-    df['diff_n'] = df['close'].diff(n).abs()
-    # Volatility = sum(abs(Price[i] - Price[i-1])) over n
-    df['volatility'] = df['close'].diff().abs().rolling(window=n).sum()
-    
-    # Efficiency Ratio
-    df['er'] = df['diff_n'] / df['volatility']
-    df['er'] = df['er'].fillna(0)
-    
-    # Smoothing Constant
-    fast_sc = 2.0 / (2.0 + 1.0)
-    slow_sc = 2.0 / (30.0 + 1.0)
-    
-    df['sc'] = (df['er'] * (fast_sc - slow_sc) + slow_sc) ** 2
-    
-    # KAMA Loop
-    kama = np.zeros(len(df))
-    kama[:] = np.nan
-    
-    # Initialize first valid KAMA with close price
-    start_idx = n
-    kama[start_idx-1] = df['close'].iloc[start_idx-1]
-    
-    closes = df['close'].values
-    sc = df['sc'].values
-    
-    for i in range(start_idx, len(df)):
-        kama[i] = kama[i-1] + sc[i] * (closes[i] - kama[i-1])
-        
-    df['kama'] = kama
+    df['kama'] = indicators.kama(df['close'], n, 2, 30)
     return df
 
 def calculate_rsi(df):
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).ewm(com=13, adjust=False).mean()
-    loss = (-delta.where(delta < 0, 0)).ewm(com=13, adjust=False).mean()
-    rs = gain / loss
-    df['rsi'] = 100 - (100 / (1 + rs))
+    df['rsi'] = indicators.rsi(df['close'], 14)
     return df
 
 def run_simulation(df, strategy_name):
@@ -131,7 +100,8 @@ def research():
     
     for year, filename in files.items():
         try:
-            df = pd.read_csv(filename)
+            end = f"{int(year) + 1}-01-01" if year != "2025" else None
+            df = load_history('BTC/USDT', '4h', start=f"{year}-01-01", end=end, csv=filename)
             df = calculate_rsi(df)
             df = calculate_kama(df)
             
@@ -1,38 +1,19 @@
 import pandas as pd
+from candle_store import load_history
 import numpy as np
+import indicators
 
 def calculate_advanced_indicators(df):
     # --- Z-Score (Statistical) ---
-    df['mean_20'] = df['close'].rolling(window=20).mean()
-    df['std_20'] = df['close'].rolling(window=20).std()
-    df['z_score'] = (df['close'] - df['mean_20']) / df['std_20']
+    df['z_score'] = indicators.zscore(df['close'], 20)
 
     # --- ATR (Volatility) ---
-    df['tr0'] = abs(df['high'] - df['low'])
-    df['tr1'] = abs(df['high'] - df['close'].shift())
-    df['tr2'] = abs(df['low'] - df['close'].shift())
-    df['tr'] = df[['tr0', 'tr1', 'tr2']].max(axis=1)
-    df['atr'] = df['tr'].rolling(window=14).mean()
+    df['atr'] = indicators.atr(df['high'], df['low'], df['close'], 14)
 
     # --- KAMA (Adaptive Moving Average) ---
-    # ER = Change / Volatility
-    # Change = abs(Price - Price[n])
-    # Volatility = sum(abs(Price[i] - Price[i-1]))
-    n = 10
-    df['change'] = abs(df['close'] - df['close'].shift(n))
-    df['volatility'] = df['close'].diff().abs().rolling(window=n).sum()
-    df['er'] = df['change'] / df['volatility']
-    
-    # SC = [ER * (2/(2+1) - 2/(30+1)) + 2/(30+1)] ^ 2
-    fast_sc = 2/(2+1)
-    slow_sc = 2/(30+1)
-    df['sc'] = (df['er'] * (fast_sc - slow_sc) + slow_sc) ** 2
-    
-    # KAMA Calculation loop
-    kama = [df['close'].iloc[0]] * len(df)
-    for i in range(n, len(df)):
-        kama[i] = kama[i-1] + df['sc'].iloc[i] * (df['close'].iloc[i] - kama[i-1])
-    df['kama'] = kama
+    # Seeded with the first close, and a flat window (undefined ER) is not
+    # zero-filled, as this script has always computed it
+    df['kama'] = indicators.kama(df['close'], 10, 2, 30, seed='first', flat_er=None)
     
     return df
 
@@ -117,7 +98,7 @@ def run_simulation(df, strategy_name):
 
 def research():
     try:
-        df = pd.read_csv('btc_4h_2024.csv') # Use 2024 data
+        df = load_history('BTC/USDT', '4h', start='2024-01-01', end='2025-01-01', csv='btc_4h_2024.csv') # Use 2024 data
         df = calculate_advanced_indicators(df)
     except:
         print("Error: 2024 Data not found.")
@@ -0,0 +1,177 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from metrics import ENGINE_COMMANDS
+
+QUEUE_SIZE = 1000  # Fire-and-forget commands beyond this are dropped (the engine is stalled)
+
+# Returned by a handler whose step changed nothing: after_step (publishing) is skipped
+NO_CHANGE = object()
+
+class Command:
+    """A request for the engine (pause, config change, manual trade, stream event...)."""
+    __slots__ = ('name', 'args', 'future', 'key')
+
+    def __init__(self, name, args, future=None, key=None):
+        self.name = name
+        self.args = args
+        self.future = future
+        self.key = key  # Set for coalesced commands: args are read from the latest post when applied
+
+class EngineRuntime:
+    """
+    Runs the trading engine as one asyncio task on the app's event loop.
+
+    Engine steps and commands are executed strictly one at a time by that task,
+    so bot state has a single writer. Blocking work (exchange REST calls, DB
+    writes) runs through `call()` on a worker thread, which keeps the event loop
+    free to serve requests. API handlers never touch engine state directly: they
+    `submit()` a command and await its result.
+    """
+
+    def __init__(self, after_step=None, queue_size=QUEUE_SIZE):
+        self.handlers = {}
+        self.queue_size = queue_size
+        self.after_step = after_step  # Called on the worker thread after every step/command (e.g. publish state)
+        self.queue = None
+        self.task = None
+        self.loop = None
+        self.processed = 0
+        self._latest = {}  # (name, key) -> newest args of a queued coalesced command
+        self._executor = ThreadPoolExecutor(thread_name_prefix="engine-step")
+        self._steps = set()  # Steps still running on a worker thread
+
+    def register(self, name, handler):
+        self.handlers[name] = handler
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def start(self, main):
+        """Starts `main(runtime)` as the engine task on the running loop."""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.queue_size)
+        self._latest = {}
+        self.task = asyncio.create_task(self._main(main), name="trading-engine")
+        return self.task
+
+    async def _main(self, main):
+        try:
+            await main(self)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Trading engine stopped: {e}")
+
+    async def stop(self, timeout=30):
+        """
+        Cancels the engine task, then waits for a step already running on a
+        worker thread (cancelling its awaiter does not stop the thread), so
+        nothing the engine touches is closed under a half-done step.
+        """
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        steps = list(self._steps)
+        if steps:
+            _, running = await asyncio.to_thread(wait, steps, timeout)
+            if running:
+                print(f"⚠️ Engine stopped with {len(running)} step(s) still running after {timeout}s")
+
+    async def submit(self, name, *args):
+        """
+        Queues a command and waits until the engine has applied it.
+        Without a running engine (e.g. it failed to connect) the command is applied directly.
+        """
+        if not self.running:
+            return await self.call(self.handlers[name], *args)
+        future = self.loop.create_future()
+        await self.queue.put(Command(name, args, future))
+        return await future
+
+    def post(self, name, *args):
+        """Fire-and-forget variant of submit(), for callbacks already on the event loop."""
+        if self.queue is not None:
+            self._post(Command(name, args))
+
+    def post_latest(self, name, key, *args):
+        """
+        post() for updates where only the newest matters (e.g. trade prints per
+        symbol): while a (name, key) command is still queued, later posts just
+        replace its args, so a burst costs one engine step.
+        """
+        if self.queue is None:
+            return
+        slot = (name, key)
+        queued = slot in self._latest
+        self._latest[slot] = args
+        if queued:
+            ENGINE_COMMANDS.inc(outcome='coalesced')
+        elif not self._post(Command(name, None, key=slot)):
+            del self._latest[slot]
+
+    def _post(self, command):
+        try:
+            self.queue.put_nowait(command)
+            return True
+        except asyncio.QueueFull:
+            ENGINE_COMMANDS.inc(outcome='dropped')
+            print(f"⚠️ Engine queue full: dropped '{command.name}'")
+            return False
+
+    async def call(self, fn, *args):
+        """Runs one blocking engine step off the event loop."""
+        step = self._executor.submit(self._step, fn, *args)
+        self._steps.add(step)
+        step.add_done_callback(self._steps.discard)
+        return await asyncio.wrap_future(step)
+
+    def _step(self, fn, *args):
+        result = None
+        try:
+            result = fn(*args)
+            return None if result is NO_CHANGE else result
+        finally:
+            if self.after_step and result is not NO_CHANGE:
+                try:
+                    self.after_step()
+                except Exception as e:
+                    print(f"Engine after-step hook failed: {e}")
+
+    async def process(self, timeout=None):
+        """
+        Applies queued commands as they arrive for up to `timeout` seconds
+        (forever if None). This is how the engine spends its idle time.
+        """
+        deadline = None if timeout is None else self.loop.time() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - self.loop.time()
+            if remaining is not None and remaining <= 0:
+                return
+            try:
+                command = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return
+            await self._apply(command)
+
+    async def _apply(self, command):
+        args = self._latest.pop(command.key) if command.key is not None else command.args
+        try:
+            result = await self.call(self.handlers[command.name], *args)
+        except Exception as e:
+            if command.future is None:
+                print(f"Engine command '{command.name}' failed: {e}")
+            elif not command.future.done():
+                command.future.set_exception(e)
+        else:
+            if command.future is not None and not command.future.done():
+                command.future.set_result(result)
+        finally:
+            self.processed += 1
+            ENGINE_COMMANDS.inc(outcome='applied')
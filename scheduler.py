@@ -0,0 +1,112 @@
+import asyncio
+import math
+import time
+
+import metrics
+
+TIMEFRAME_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def timeframe_seconds(timeframe):
+    """'4h' -> 14400"""
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+
+class CandleScheduler:
+    """
+    Drives the polling loop on exchange time.
+
+    `on_close` runs exactly once per candle, `close_delay` seconds after the
+    candle boundary. `on_tick` runs in between at a fixed rate: ticks stay on
+    the grid set by the first one, so a tick's own runtime does not push the
+    next one later. An iteration that takes longer than `interval` is logged as
+    an overrun and the slots it ran over are skipped, not fired back to back.
+    """
+
+    def __init__(self, timeframe='4h', interval=10, close_delay=2.0, clock=time.time, sleep=time.sleep):
+        self.period = timeframe_seconds(timeframe)
+        self.interval = interval
+        self.close_delay = close_delay
+        self.clock = clock
+        self.sleep = sleep
+        self.offset = 0.0  # Exchange time minus local time, in seconds
+        self.overruns = 0
+        self.running = False
+
+    def now(self):
+        return self.clock() + self.offset
+
+    def sync(self, exchange):
+        """Measures the local clock's offset from the exchange's server time."""
+        before = self.clock()
+        server_ms = metrics.exchange_call(exchange, 'fetch_time')
+        after = self.clock()
+        self.offset = server_ms / 1000 - (before + after) / 2
+        return self.offset
+
+    def next_close(self, now=None):
+        """Timestamp (seconds) of the next candle boundary after `now`."""
+        now = self.now() if now is None else now
+        return (math.floor(now / self.period) + 1) * self.period
+
+    def stop(self):
+        self.running = False
+
+    def _start(self):
+        self.running = True
+        next_tick = self.now()
+        return next_tick, self.next_close(next_tick) + self.close_delay
+
+    def _select(self, next_tick, next_close):
+        """Which event is due next: (kind, scheduled_time, next_close)."""
+        if next_close <= next_tick:
+            return 'close', next_close, next_close + self.period
+        return 'tick', next_tick, next_close
+
+    def _finish(self, kind, started, next_tick):
+        """Overrun accounting; returns the next tick on the original grid, skipping past slots."""
+        finished = self.now()
+        elapsed = finished - started
+        if elapsed > self.interval:
+            self.overruns += 1
+            metrics.LOOP_OVERRUNS.inc(kind=kind)
+            print(f"⏱️ Loop overrun: {kind} took {elapsed:.2f}s (budget {self.interval}s)")
+        if next_tick <= finished:
+            next_tick += (math.floor((finished - next_tick) / self.interval) + 1) * self.interval
+        return next_tick
+
+    def run(self, on_close, on_tick):
+        next_tick, next_close = self._start()
+        while self.running:
+            delay = min(next_tick, next_close) - self.now()
+            if delay > 0:
+                self.sleep(delay)
+
+            kind, scheduled, next_close = self._select(next_tick, next_close)
+            started = self.now()
+            metrics.LOOP_LAG.observe(max(0.0, started - scheduled), kind=kind)
+            try:
+                with metrics.LOOP_DURATION.time(kind=kind):
+                    (on_close if kind == 'close' else on_tick)()
+            except Exception as e:
+                print(f"Scheduler {kind} failed: {e}")
+            next_tick = self._finish(kind, started, next_tick)
+
+    async def run_async(self, on_close, on_tick, wait=asyncio.sleep):
+        """
+        Same schedule as run() for coroutine callbacks. `wait(seconds)` is awaited
+        between events, e.g. to process engine commands while idle.
+        """
+        next_tick, next_close = self._start()
+        while self.running:
+            delay = min(next_tick, next_close) - self.now()
+            if delay > 0:
+                await wait(delay)
+
+            kind, scheduled, next_close = self._select(next_tick, next_close)
+            started = self.now()
+            metrics.LOOP_LAG.observe(max(0.0, started - scheduled), kind=kind)
+            try:
+                with metrics.LOOP_DURATION.time(kind=kind):
+                    await (on_close if kind == 'close' else on_tick)()
+            except Exception as e:
+                print(f"Scheduler {kind} failed: {e}")
+            next_tick = self._finish(kind, started, next_tick)
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import math
+import os
+import threading
+
+class Snapshot:
+    """One published engine state: the data, its JSON body and an ETag."""
+    __slots__ = ('version', 'etag', 'body', 'data', 'content')
+
+    def __init__(self, version, etag, body, data, content):
+        self.version = version
+        self.etag = etag
+        self.body = body        # Serialized response, version included
+        self.data = data
+        self.content = content  # Canonical JSON of the state alone, for change detection
+
+def _clean(value):
+    """NaN/inf are not valid JSON; publish them as null."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(v) for v in value]
+    return value
+
+class SnapshotPublisher:
+    """
+    Holds the latest state snapshot for readers such as /stats.
+
+    The engine calls `publish()` after every step; readers take `current`, a
+    single reference read, so they never see a half-updated state and never
+    do I/O. The JSON body is serialized once at publish time. Publishing
+    identical data keeps the version (and ETag) unchanged, so pollers get 304s.
+    Publishers (the engine thread, a handler serving the first request) are
+    serialized, so versions only move forward.
+    """
+
+    def __init__(self):
+        self._boot = os.urandom(4).hex()  # ETags from a previous process never match
+        self._current = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self):
+        return self._current
+
+    def publish(self, data):
+        data = _clean(data)
+        content = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        with self._lock:
+            current = self._current
+            if current is not None and content == current.content:
+                return current
+
+            version = current.version + 1 if current else 1
+            data = {**data, "version": version}
+            digest = hashlib.blake2b(content.encode(), digest_size=6).hexdigest()
+            etag = f'"{self._boot}-{version}-{digest}"'
+            self._current = Snapshot(version, etag, json.dumps(data).encode(), data, content)
+            return self._current
+
+def changed_fields(old, new):
+    """Top-level fields of `new` that differ from `old` (a state delta for push clients)."""
+    if old is None:
+        return dict(new)
+    return {key: value for key, value in new.items() if old.get(key) != value}
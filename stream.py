@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+
+BINANCE_WS_URL = "wss://stream.binance.com:9443"
+
+def stream_names(symbol, timeframe):
+    """Binance combined-stream names for a ccxt symbol, e.g. btcusdt@kline_4h / btcusdt@trade."""
+    market = symbol.replace('/', '').lower()
+    return [f"{market}@kline_{timeframe}", f"{market}@trade"]
+
+def parse_kline(data):
+    """
+    Converts a Binance kline event into a ccxt-style OHLCV bar.
+    Returns (bar, is_closed).
+    """
+    k = data['k']
+    bar = [int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]
+    return bar, bool(k['x'])
+
+def parse_trade(data):
+    return float(data['p'])
+
+class MarketStream:
+    """
+    Websocket kline/trade feed for one symbol.
+
+    Kline events are merged into the given `CandleFeed` and passed to
+    `on_kline(bar, closed)`; trade prints are passed to `on_trade(price)`,
+    at most once per `trade_interval` seconds. On every (re)connect the gap is
+    backfilled over REST through `feed.refresh(exchange)` before events are
+    consumed; a candle that closed while disconnected is passed to
+    `on_kline(bar, True)` too. Dropped connections are retried with exponential
+    backoff. Closed candles are saved to the feed's store on a worker thread.
+    """
+
+    def __init__(self, feed, exchange, on_kline=None, on_trade=None, url=BINANCE_WS_URL,
+                 trade_interval=0.0, min_backoff=1, max_backoff=30):
+        self.feed = feed
+        self.exchange = exchange
+        self.on_kline = on_kline
+        self.on_trade = on_trade
+        self.url = url.rstrip('/')
+        self.trade_interval = trade_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connections = 0
+        self.last_trade_price = None
+        self._last_trade_dispatch = 0.0
+        self._last_closed_ts = None  # Newest candle already passed to on_kline as closed
+        self._running = False
+        self.feed.autosave = False
+
+    @property
+    def stream_url(self):
+        return f"{self.url}/stream?streams={'/'.join(stream_names(self.feed.symbol, self.feed.timeframe))}"
+
+    def handle_message(self, raw):
+        """Applies one websocket event. Returns True if it closed a candle."""
+        msg = json.loads(raw)
+        data = msg.get('data', msg)
+        event = data.get('e')
+
+        if event == 'kline':
+            bar, closed = parse_kline(data)
+            self.feed.update(bar)
+            if closed:
+                self._last_closed_ts = bar[0]
+            if self.on_kline:
+                self.on_kline(bar, closed)
+            return closed
+
+        elif event == 'trade':
+            price = parse_trade(data)
+            self.last_trade_price = price
+            now = time.monotonic()
+            if self.on_trade and now - self._last_trade_dispatch >= self.trade_interval:
+                self._last_trade_dispatch = now
+                self.on_trade(price)
+        return False
+
+    async def backfill(self):
+        """
+        Catches the feed up over REST. The newest candle that closed since the
+        last one seen is passed on as closed; older ones in the gap are stale.
+        """
+        await asyncio.to_thread(self.feed.refresh, self.exchange)
+        await asyncio.to_thread(self.feed.save)
+        if len(self.feed.bars) < 2:
+            return
+        bar = self.feed.bars[-2]
+        seen = self._last_closed_ts
+        self._last_closed_ts = bar[0] if seen is None else max(seen, bar[0])
+        # Nothing is passed on for the first backfill: that is history, not a missed close
+        if seen is not None and bar[0] > seen and self.on_kline:
+            self.on_kline(list(bar), True)
+
+    async def run(self):
+        # Only stream mode needs websockets; importing it here keeps it off the poll-mode/API path
+        from websockets.asyncio.client import connect
+
+        self._running = True
+        backoff = self.min_backoff
+        while self._running:
+            try:
+                async with connect(self.stream_url) as ws:
+                    self.connections += 1
+                    print(f"📡 Market stream connected ({self.feed.symbol}). Backfilling over REST...")
+                    await self.backfill()
+                    backoff = self.min_backoff
+                    async for raw in ws:
+                        if self.handle_message(raw):
+                            await asyncio.to_thread(self.feed.save)
+                        if not self._running:
+                            break
+            except Exception as e:
+                # Socket errors, handshake failures and REST backfill errors all end in a reconnect
+                print(f"Market stream disconnected: {e}")
+
+            if self._running:
+                print(f"Reconnecting market stream in {backoff}s...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def stop(self):
+        self._running = False
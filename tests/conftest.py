@@ -8,16 +8,19 @@ sys.path.append(os.getcwd())
 # Force a test database BEFORE importing database module
 TEST_DB = "sqlite:///./test_bot.db"
 os.environ["DATABASE_URL"] = TEST_DB
+os.environ["CANDLE_STORE_PATH"] = ""  # No candle store side effects from the engine in tests
 
 from database import init_db, engine, Base, SessionLocal
+from ledger import LEDGER
 
 @pytest.fixture(scope="function")
 def db_session():
     """
     Creates a fresh database for each test function.
     """
-    # Create tables
+    # Create tables (and start from an empty in-memory ledger to match)
     Base.metadata.create_all(bind=engine)
+    LEDGER.reset()
     session = SessionLocal()
     yield session
     session.close()
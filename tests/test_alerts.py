@@ -0,0 +1,93 @@
+import threading
+from alerts import AlertDispatcher
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.headers = {}
+    def json(self):
+        return self.body
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+class FakeSession:
+    def __init__(self, responses=None, gate=None):
+        self.posts = []
+        self.responses = list(responses or [])
+        self.gate = gate
+    def post(self, url, json=None, timeout=None):
+        if self.gate:
+            self.gate.wait()
+        self.posts.append(json["embeds"])
+        return self.responses.pop(0) if self.responses else FakeResponse(204)
+
+def embed(i):
+    return {"title": f"Alert {i}", "description": "x", "color": 0}
+
+def test_enqueue_does_not_block_on_slow_webhook():
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    dispatcher = AlertDispatcher("http://hook", session=session)
+
+    for i in range(50):
+        assert dispatcher.enqueue(embed(i))
+
+    # All 50 were accepted while the webhook is still stuck on the first post
+    assert session.posts == []
+    assert dispatcher.queue.unfinished_tasks == 50
+    gate.set()
+    assert dispatcher.flush()
+
+def test_bursts_are_coalesced_into_multi_embed_messages():
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    dispatcher = AlertDispatcher("http://hook", session=session)
+
+    for i in range(13):
+        dispatcher.enqueue(embed(i))
+    gate.set()
+    assert dispatcher.flush()
+
+    # At most 10 embeds per post, nothing lost, order kept
+    assert all(len(p) <= 10 for p in session.posts)
+    assert [e["title"] for p in session.posts for e in p] == [f"Alert {i}" for i in range(13)]
+    assert len(session.posts) <= 3
+    assert dispatcher.sent == 13
+
+def test_honors_retry_after_on_429(monkeypatch):
+    import alerts
+    sleeps = []
+    monkeypatch.setattr(alerts.time, "sleep", sleeps.append)
+    session = FakeSession(responses=[FakeResponse(429, {"retry_after": 0.05})])
+    dispatcher = AlertDispatcher("http://hook", session=session)
+
+    assert dispatcher._post([embed(1)])
+
+    assert sleeps == [0.05]
+    assert len(session.posts) == 2
+    assert dispatcher.stats()["sent"] == 1
+
+def test_full_queue_drops_and_counts():
+    gate = threading.Event()
+    dispatcher = AlertDispatcher("http://hook", maxsize=2, session=FakeSession(gate=gate))
+
+    results = [dispatcher.enqueue(embed(i)) for i in range(6)]
+
+    assert results.count(False) >= 3
+    assert dispatcher.dropped == results.count(False)
+    gate.set()
+    dispatcher.flush()
+
+def test_gives_up_without_waiting_after_the_last_attempt(monkeypatch):
+    import alerts
+    sleeps = []
+    monkeypatch.setattr(alerts.time, "sleep", sleeps.append)
+    session = FakeSession(responses=[FakeResponse(500)] * 3)
+    dispatcher = AlertDispatcher("http://hook", session=session, max_attempts=3)
+
+    assert dispatcher._post([embed(1)]) is False
+    assert len(session.posts) == 3
+    assert sleeps == [1, 2]  # Backoff between attempts only
+    assert dispatcher.failed == 1
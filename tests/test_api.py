@@ -42,3 +42,98 @@ def test_control_bot():
     response = client.post("/control/resume")
     assert response.status_code == 200
     assert response.json()['status'] == "running"
+
+def test_endpoints_share_one_exchange_client(db_session):
+    from unittest.mock import MagicMock, patch
+    import main
+
+    shared = MagicMock()
+    shared.fetch_ticker.return_value = {'last': 50000.0}
+    with patch("main.EXCHANGE", shared), \
+         patch("main.PAPER_MODE", True), \
+         patch("main.paper_balance", {"USDT": 10000.0, "BTC": 0.0}), \
+         patch("main.send_discord_alert"), \
+         patch("main.create_exchange") as mock_create:
+        assert main.get_exchange() is shared
+
+        response = client.post("/trade/buy")
+        assert response.status_code == 200
+        assert shared.fetch_ticker.call_count >= 1
+
+        # No per-request clients were built
+        mock_create.assert_not_called()
+
+def test_manual_trade_rejects_unknown_symbol():
+    response = client.post("/trade/buy?symbol=DOGE/USDT")
+    assert response.status_code == 400
+
+def test_stats_etag_and_not_modified(db_session):
+    import main
+
+    main.publish_snapshot()
+    first = client.get("/stats")
+    etag = first.headers["etag"]
+    version = first.json()["version"]
+
+    # Nothing changed: 304 with the same ETag
+    cached = client.get("/stats", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    # Re-publishing identical state keeps the version
+    main.publish_snapshot()
+    assert client.get("/stats", headers={"If-None-Match": etag}).status_code == 304
+
+    # A command changes state -> new snapshot
+    client.post("/control/pause")
+    changed = client.get("/stats", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["version"] == version + 1
+    assert changed.json()["status"] == "paused"
+    client.post("/control/resume")
+
+def test_stats_does_no_io(db_session):
+    from unittest.mock import patch
+    import main
+
+    main.publish_snapshot()
+    with patch("main.LEDGER.pnl_stats", side_effect=AssertionError("ledger read")), \
+         patch("main.get_exchange", side_effect=AssertionError("exchange used")):
+        assert client.get("/stats").status_code == 200
+
+def test_trades_keyset_pagination_and_filters(db_session):
+    from database import log_trade
+    for i in range(5):
+        log_trade({"symbol": "BTC/USDT", "side": "BUY" if i % 2 == 0 else "SELL", "price": 100.0 + i, "amount": 1.0, "strategy": "Test"})
+    log_trade({"symbol": "ETH/USDT", "side": "BUY", "price": 10.0, "amount": 1.0, "strategy": "Test"})
+
+    first = client.get("/trades", params={"symbol": "BTC/USDT", "limit": 2})
+    assert [t["price"] for t in first.json()] == [104.0, 103.0]
+    second = client.get("/trades", params={"symbol": "BTC/USDT", "limit": 2, "cursor": first.headers["x-next-cursor"]})
+    third = client.get("/trades", params={"symbol": "BTC/USDT", "limit": 2, "cursor": second.headers["x-next-cursor"]})
+    assert [t["price"] for t in second.json()] == [102.0, 101.0]
+    assert [t["price"] for t in third.json()] == [100.0]
+    assert "x-next-cursor" not in third.headers
+
+    sells = client.get("/trades", params={"side": "sell"}).json()
+    assert {t["side"] for t in sells} == {"SELL"} and len(sells) == 2
+    assert client.get("/trades", params={"cursor": "garbage"}).status_code == 400
+
+def test_trades_export_streams_ndjson_and_csv(db_session):
+    import json
+    from unittest.mock import patch
+    from database import log_trade
+    for i in range(5):
+        log_trade({"symbol": "BTC/USDT", "side": "BUY", "price": 100.0 + i, "amount": 1.0, "strategy": "Test"})
+
+    with patch("main.EXPORT_BATCH_ROWS", 2):
+        with client.stream("GET", "/trades/export") as response:
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            chunks = list(response.iter_text())
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert [r["price"] for r in rows] == [100.0, 101.0, 102.0, 103.0, 104.0]
+
+    csv_text = client.get("/trades/export", params={"format": "csv", "symbol": "BTC/USDT"}).text
+    lines = csv_text.strip().splitlines()
+    assert lines[0].startswith("id,symbol,side,price")
+    assert len(lines) == 6
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import backtest_engine
+from backtest import calculate_indicators, simulate
+
+def make_frame(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return calculate_indicators(pd.DataFrame({"close": close}))
+
+def legacy_loop(df, stop_loss, take_profit):
+    # The per-row iloc loop run_backtest used before backtest_engine
+    usdt_balance, btc_balance, in_position, trade_count = 10000, 0, False, 0
+    for i in range(20, len(df)):
+        row = df.iloc[i]
+        price, sma, rsi = row['close'], row['sma_20'], row['rsi_14']
+        if in_position:
+            pct_change = (price - entry_price) / entry_price
+            if pct_change <= -stop_loss or pct_change >= take_profit:
+                usdt_balance, btc_balance, in_position = btc_balance * price, 0, False
+                trade_count += 1
+                continue
+            if price < sma or rsi > 80:
+                usdt_balance, btc_balance, in_position = btc_balance * price, 0, False
+                trade_count += 1
+        elif price > sma and rsi < 70:
+            btc_balance, usdt_balance, in_position = usdt_balance / price, 0, True
+            entry_price = price
+            trade_count += 1
+    return usdt_balance + btc_balance * df.iloc[-1]['close'], trade_count
+
+def test_matches_the_legacy_loop_exactly():
+    df = make_frame(3000)
+    for stop_loss, take_profit in [(0.02, 0.04), (0.005, 0.01), (0.10, 0.20), (1.0, 100.0)]:
+        result = simulate(df, stop_loss, take_profit)
+        assert (result.final_equity, result.trade_count) == legacy_loop(df, stop_loss, take_profit)
+
+def test_trades_and_equity_curve():
+    close = np.array([100, 100, 104, 103, 100, 98, 101, 107, 99, 100], dtype=float)
+    entries = np.array([0, 1, 0, 0, 1, 0, 0, 0, 0, 1], dtype=bool)
+    exits = np.array([0, 0, 0, 1, 0, 0, 0, 0, 1, 0], dtype=bool)
+
+    result = backtest_engine.run(close, entries, exits, stop_loss=0.02, take_profit=0.05, initial_balance=1000)
+
+    assert [(t.entry_index, t.exit_index, t.reason) for t in result.trades] == [
+        (1, 3, 'signal'), (4, 5, 'stop_loss'), (9, None, None)]
+    assert result.trade_count == 5
+    equity = result.equity
+    assert equity[0] == 1000 and equity[2] == 1040          # Flat, then marked to market
+    assert equity[5] == equity[8] == 1030 / 100 * 98          # Cash after the stop, no re-entry until bar 9
+    assert result.final_equity == equity[-1]
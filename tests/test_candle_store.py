@@ -0,0 +1,77 @@
+from candle_store import CandleStore, load_history
+from market_data import CandleFeed
+
+HOUR = 3600 * 1000
+STEP = 4 * HOUR
+
+def bars(first, last, price=100.0):
+    return [[t, price, price + 1, price - 1, price, 1.0] for t in range(first * STEP, (last + 1) * STEP, STEP)]
+
+class FakeExchange:
+    def __init__(self, candles):
+        self.candles = candles
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe='4h', since=None, limit=None):
+        self.calls.append(since)
+        if since is None:
+            return self.candles[-limit:]
+        return [b for b in self.candles if b[0] >= since][:limit]
+
+def test_upsert_is_idempotent_and_range_queries(tmp_path):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    assert store.upsert("BTC/USDT", "4h", bars(0, 9)) == 10
+    store.upsert("BTC/USDT", "4h", bars(5, 9, price=200.0))  # Re-written candles are replaced, not duplicated
+
+    assert store.bounds("BTC/USDT", "4h") == (0, 9 * STEP, 10)
+    assert [b[4] for b in store.candles("BTC/USDT", "4h", start=3 * STEP, end=7 * STEP)] == [100.0, 100.0, 200.0, 200.0]
+    assert [b[0] for b in store.latest("BTC/USDT", "4h", 2)] == [8 * STEP, 9 * STEP]
+    assert store.candles("ETH/USDT", "4h") == []
+
+def test_gaps_and_fill_fetch_only_missing_candles(tmp_path):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    store.upsert("BTC/USDT", "4h", bars(2, 4) + bars(8, 9))
+
+    assert store.gaps("BTC/USDT", "4h", 0, 12 * STEP) == [(0, STEP), (5 * STEP, 7 * STEP), (10 * STEP, 11 * STEP)]
+
+    exchange = FakeExchange(bars(0, 20))
+    # "Now" is inside candle 12: it is still forming and must not be stored
+    added = store.fill(exchange, "BTC/USDT", "4h", 0, now=(12 * STEP + HOUR) / 1000)
+    assert added == 7
+    assert exchange.calls == [0, 5 * STEP, 10 * STEP]
+    assert store.gaps("BTC/USDT", "4h", 0, 12 * STEP) == []
+    assert store.bounds("BTC/USDT", "4h") == (0, 11 * STEP, 12)
+
+def test_load_history_imports_legacy_csv_once(tmp_path):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    csv = tmp_path / "btc_4h.csv"
+    csv.write_text("timestamp,open,high,low,close,volume\n"
+                   "2024-01-01 00:00:00,1,2,0.5,1.5,10\n"
+                   "2024-01-01 04:00:00,1.5,2,1,1.8,12\n")
+
+    df = load_history("BTC/USDT", "4h", start="2024-01-01", csv=str(csv), store=store)
+    assert list(df['close']) == [1.5, 1.8]
+    assert str(df['timestamp'].iloc[1]) == "2024-01-01 04:00:00"
+
+    csv.unlink()  # From now on the store is the source
+    assert len(load_history("BTC/USDT", "4h", start="2024-01-01", store=store)) == 2
+
+def test_feed_persists_closed_bars_and_warm_starts(tmp_path):
+    store = CandleStore(str(tmp_path / "candles.db"))
+    feed = CandleFeed("BTC/USDT", history=20, store=store)
+    feed.refresh(FakeExchange(bars(10, 29)))
+    # Closed bars only: the forming one (29) is not stored
+    assert store.bounds("BTC/USDT", "4h") == (10 * STEP, 28 * STEP, 19)
+
+    restarted = CandleFeed("BTC/USDT", history=20, store=store)
+    assert restarted.warm_start(now=(29 * STEP + HOUR) / 1000)
+    assert len(restarted.bars) == 19
+    exchange = FakeExchange(bars(10, 30))
+    restarted.refresh(exchange)
+    # Only the bars since the last stored one were requested
+    assert exchange.calls == [28 * STEP]
+    assert restarted.last_close == 100.0 and store.bounds("BTC/USDT", "4h")[1] == 29 * STEP
+
+    # A store too old to catch up in one refresh is not used
+    stale = CandleFeed("BTC/USDT", history=20, store=store)
+    assert not stale.warm_start(now=(60 * STEP) / 1000)
@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+from dashboard_data import ApiClient, TradeHistory
+from database import log_trade
+from main import app
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+class CountingSession:
+    """Routes dashboard requests to the app in-process and records them."""
+    def __init__(self):
+        self.client = TestClient(app)
+        self.requests = []
+    def get(self, url, params=None, headers=None, timeout=None):
+        path = url.replace("http://bot", "")
+        self.requests.append((path, params))
+        return self.client.get(path, params=params, headers=headers)
+
+def trade(price):
+    return log_trade({"symbol": "BTC/USDT", "side": "BUY", "price": price, "amount": 0.1, "strategy": "Test"})
+
+def test_trade_history_fetches_only_new_trades(db_session):
+    for price in (100.0, 101.0, 102.0):
+        trade(price)
+    session = CountingSession()
+    api = ApiClient("http://bot", session=session)
+    history = TradeHistory(initial=2, page_size=2)
+
+    assert history.refresh(api)
+    assert list(history.frame['price']) == [101.0, 102.0]
+    version = history.version
+
+    # Nothing new: no change, chart can be reused
+    assert not history.refresh(api)
+    assert history.version == version
+
+    for price in (103.0, 104.0, 105.0):
+        trade(price)
+    assert history.refresh(api)
+    assert list(history.frame['price']) == [101.0, 102.0, 103.0, 104.0, 105.0]
+    # Incremental requests carry the last seen id, paging until a short page
+    assert [p["after_id"] for _, p in session.requests[1:]] == [3, 3, 5]
+
+def test_stats_are_cached_and_revalidated_with_etag(db_session):
+    clock = FakeClock()
+    session = CountingSession()
+    api = ApiClient("http://bot", session=session, stats_ttl=2.0, clock=clock)
+
+    first = api.stats()
+    assert api.stats() is first
+    assert len(session.requests) == 1
+
+    clock.now = 3.0
+    assert api.stats() == first  # 304 -> previous body reused
+    assert len(session.requests) == 2
@@ -48,3 +48,131 @@ def test_get_latest_trade_persistence(db_session):
     # Assert
     assert latest.side == "SELL"
     assert latest.profit == 10
+
+def test_ledger_write_through_and_reload(db_session):
+    from ledger import Ledger
+
+    ledger = Ledger()
+    ledger.record({"symbol": "BTC/USDT", "side": "BUY", "price": 100, "amount": 2, "profit": None})
+    ledger.record({"symbol": "ETH/USDT", "side": "BUY", "price": 10, "amount": 5, "profit": None})
+    ledger.record({"symbol": "BTC/USDT", "side": "SELL", "price": 110, "amount": 2, "profit": 20})
+
+    # Memory is the hot-path source of truth
+    assert ledger.position("BTC/USDT") is None
+    assert ledger.position("ETH/USDT") == {"entry_price": 10, "amount": 5}
+    assert ledger.pnl_stats() == (20, 100.0, 1)
+
+    # Every trade reached the DB, so a restart rebuilds the same state
+    assert db_session.query(Trade).count() == 3
+    restarted = Ledger()
+    restarted.load(["BTC/USDT", "ETH/USDT"])
+    assert restarted.positions == ledger.positions
+    assert restarted.pnl_stats() == ledger.pnl_stats()
+
+def test_pnl_stats_are_maintained_per_strategy_and_symbol(db_session):
+    from database import TradeStats, rebuild_trade_stats
+
+    log_trade({"symbol": "BTC/USDT", "side": "SELL", "price": 1, "amount": 1, "strategy": "MR", "profit": 100})
+    log_trade({"symbol": "ETH/USDT", "side": "SELL", "price": 1, "amount": 1, "strategy": "MR", "profit": -40})
+    log_trade({"symbol": "ETH/USDT", "side": "SELL", "price": 1, "amount": 1, "strategy": "KAMA", "profit": 10})
+    log_trade({"symbol": "ETH/USDT", "side": "BUY", "price": 1, "amount": 1, "strategy": "KAMA", "profit": None})
+
+    # One aggregate row per (strategy, symbol), no trades scan needed
+    assert db_session.query(TradeStats).count() == 3
+    assert get_pnl_stats() == (70.0, 2 / 3 * 100, 3)
+    assert get_pnl_stats(symbol="ETH/USDT") == (-30.0, 50.0, 2)
+    assert get_pnl_stats(strategy="MR") == (60.0, 50.0, 2)
+
+    # The ledger restores the raw counts, not a count rebuilt from the rounded win rate
+    from database import get_pnl_counts
+    from ledger import Ledger
+    assert get_pnl_counts() == (70.0, 3, 2)
+    restarted = Ledger()
+    restarted.load([])
+    assert (restarted.closed_trades, restarted.winning_trades) == (3, 2)
+
+    # Running aggregates agree with a full recomputation
+    before = get_pnl_stats()
+    rebuild_trade_stats(db_session)
+    db_session.commit()
+    assert get_pnl_stats() == before
+
+def test_positions_table_tracks_open_positions(db_session):
+    from database import get_open_positions, rebuild_positions
+
+    log_trade({"symbol": "BTC/USDT", "side": "BUY", "price": 100, "amount": 1, "profit": None})
+    log_trade({"symbol": "BTC/USDT", "side": "BUY", "price": 130, "amount": 2, "profit": None})
+    log_trade({"symbol": "ETH/USDT", "side": "BUY", "price": 10, "amount": 5, "profit": None})
+    log_trade({"symbol": "ETH/USDT", "side": "SELL", "price": 12, "amount": 5, "profit": 10})
+    log_trade({"symbol": "SOL/USDT", "side": "BUY", "price": 20, "amount": 4, "profit": None})
+    log_trade({"symbol": "SOL/USDT", "side": "SELL", "price": 22, "amount": 1, "profit": 2})
+
+    expected = {
+        "BTC/USDT": {"entry_price": 120.0, "amount": 3},
+        "SOL/USDT": {"entry_price": 20, "amount": 3},
+    }
+    assert get_open_positions() == expected
+
+    # Replaying the history gives the same table
+    rebuild_positions(db_session)
+    db_session.commit()
+    assert get_open_positions() == expected
+
+def test_log_trades_writes_a_batch_in_one_flush(db_session):
+    from sqlalchemy import event
+    from database import _sessions, get_open_positions, log_trades
+
+    log_trade({"symbol": "ETH/USDT", "side": "BUY", "price": 10, "amount": 5, "profit": None})
+    batch = [
+        {"symbol": "BTC/USDT", "side": "BUY", "price": 100, "amount": 1, "strategy": "MR", "profit": None},
+        {"symbol": "BTC/USDT", "side": "SELL", "price": 110, "amount": 1, "strategy": "MR", "profit": 10},
+        {"symbol": "BTC/USDT", "side": "BUY", "price": 90, "amount": 2, "strategy": "MR", "profit": None},
+        {"symbol": "ETH/USDT", "side": "SELL", "price": 12, "amount": 5, "strategy": "KAMA", "profit": -1},
+    ]
+    flushes = []
+    listener = lambda session, context: flushes.append(1)
+    event.listen(_sessions, "after_flush", listener)
+    try:
+        log_trades(batch)
+    finally:
+        event.remove(_sessions, "after_flush", listener)
+
+    assert len(flushes) == 1
+    # Positions and stats are the net of the whole batch
+    assert get_open_positions() == {"BTC/USDT": {"entry_price": 90.0, "amount": 2.0}}
+    assert get_pnl_stats() == (9.0, 50.0, 2)
+
+def test_migrate_db_adds_indexes_and_backfills_positions(db_session):
+    from sqlalchemy import inspect, text
+    from database import Position, engine, get_open_positions, migrate_db
+
+    log_trade({"symbol": "BTC/USDT", "side": "BUY", "price": 100, "amount": 1, "profit": None})
+    # A database from before the schema revision: no composite index, no positions,
+    # and the old single-column symbol index
+    db_session.execute(text("DROP INDEX ix_trades_symbol_timestamp_id"))
+    db_session.execute(text("CREATE INDEX ix_trades_symbol ON trades (symbol)"))
+    db_session.query(Position).delete()
+    db_session.commit()
+
+    migrate_db()
+    migrate_db()  # Idempotent
+
+    indexes = {index['name'] for index in inspect(engine).get_indexes('trades')}
+    assert {'ix_trades_timestamp_id', 'ix_trades_symbol_timestamp_id', 'ix_trades_strategy_symbol'} <= indexes
+    assert 'ix_trades_symbol' not in indexes
+    assert get_open_positions() == {"BTC/USDT": {"entry_price": 100, "amount": 1}}
+
+def test_flat_restarts_do_not_rebuild_positions(db_session, monkeypatch):
+    import database
+    from database import init_db
+
+    init_db()  # A new database: nothing to backfill, recorded as done
+    log_trade({"symbol": "BTC/USDT", "side": "BUY", "price": 100, "amount": 1, "profit": None})
+    log_trade({"symbol": "BTC/USDT", "side": "SELL", "price": 110, "amount": 1, "profit": 10})
+
+    rebuilds = []
+    monkeypatch.setattr(database, "rebuild_positions", rebuilds.append)
+    # Flat: the positions table is empty, yet the trade history is not replayed
+    init_db()
+    init_db()
+    assert rebuilds == []
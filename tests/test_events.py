@@ -0,0 +1,66 @@
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+from starlette.requests import Request
+from events import EventBroker
+import main
+
+def parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+    return fields["event"], json.loads(fields["data"]), fields.get("id")
+
+def test_publish_from_another_thread_reaches_subscribers():
+    broker = EventBroker()
+
+    async def scenario():
+        subscription, replay = broker.subscribe()
+        assert replay is None
+        threading.Thread(target=broker.publish, args=('trade', {"id": 1})).start()
+        event = await subscription.get(timeout=2)
+        return event.kind, event.data
+
+    assert asyncio.run(scenario()) == ('trade', {"id": 1})
+
+def test_resume_replays_missed_events_or_asks_for_resync():
+    broker = EventBroker(history=3)
+    for i in range(5):
+        broker.publish('state', {"n": i})
+
+    async def scenario(last_id):
+        subscription, replay = broker.subscribe(last_id)
+        broker.unsubscribe(subscription)
+        return None if replay is None else [e.data["n"] for e in replay]
+
+    assert asyncio.run(scenario(3)) == [3, 4]
+    assert asyncio.run(scenario(1)) is None    # Older than the kept history
+    assert asyncio.run(scenario(99)) is None   # Id from a previous process
+
+def test_events_endpoint_pushes_snapshot_then_deltas(db_session):
+    request = Request({"type": "http", "method": "GET", "path": "/events", "headers": []})
+
+    main.publish_snapshot()
+
+    async def scenario():
+        response = await main.stream_events(request)
+        body = response.body_iterator
+        first = parse(await body.__anext__())
+
+        # A paused bot + a trade -> a state delta and a trade event, no polling involved
+        await main.ENGINE.submit('pause')
+        await asyncio.to_thread(main.LEDGER.record, {"symbol": "BTC/USDT", "side": "BUY", "price": 100.0, "amount": 1.0})
+        events = [parse(await asyncio.wait_for(body.__anext__(), 2)) for _ in range(2)]
+        await body.aclose()
+        return first, events
+
+    with patch("main.BOT_PAUSED", False):
+        first, events = asyncio.run(scenario())
+    assert first[0] == "snapshot"
+    assert "config" in first[1]
+
+    kinds = [kind for kind, _, _ in events]
+    assert kinds == ["state", "trade"]
+    assert events[0][1]["status"] == "paused"
+    assert "config" not in events[0][1]  # Only what changed
+    assert events[1][1]["symbol"] == "BTC/USDT" and events[1][1]["id"]
+    assert main.EVENTS.subscriber_count == 0
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+from import_report import import_times, top_level_packages
+
+def test_main_import_leaves_heavy_dependencies_to_the_engine():
+    times = import_times("main", env={"DATABASE_URL": ""})
+    imported = top_level_packages(times)
+    assert "main" in imported and "fastapi" in imported
+    # ccxt loads with the exchange client, websockets with stream mode, uvicorn only under __main__
+    assert not imported & {"ccxt", "pandas", "uvicorn", "websockets"}
+
+def test_database_connects_on_first_use():
+    code = (
+        "import database\n"
+        "assert database._engine is None\n"
+        "try:\n"
+        "    database.SessionLocal()\n"
+        "except ValueError as e:\n"
+        "    print(e)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env={"PATH": "", "DATABASE_URL": ""})
+    assert result.returncode == 0, result.stderr
+    assert "DATABASE_URL is not set" in result.stdout
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import indicators
+from indicators import IndicatorCache
+
+def make_close(n=500, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.Series(30000 * np.exp(np.cumsum(rng.normal(0, 0.01, n))), index=pd.RangeIndex(1000, 1000 + n))
+
+def same(a, b):
+    return np.array_equal(np.asarray(a), np.asarray(b), equal_nan=True)
+
+def test_matches_the_formulas_the_scripts_used():
+    close = make_close()
+    high, low = close * 1.01, close * 0.99
+
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).ewm(com=13, adjust=False).mean()
+    loss = (-delta.where(delta < 0, 0)).ewm(com=13, adjust=False).mean()
+    assert same(indicators.rsi(close, 14), 100 - (100 / (1 + gain / loss)))
+
+    mid, upper, lower = indicators.bollinger(close, 20, 2)
+    std = close.rolling(window=20).std()
+    assert same(upper, close.rolling(window=20).mean() + 2 * std) and same(lower, mid - 2 * std)
+
+    tr = pd.concat([abs(high - low), abs(high - close.shift()), abs(low - close.shift())], axis=1).max(axis=1)
+    assert same(indicators.atr(high, low, close, 14), tr.rolling(window=14).mean())
+
+    kama = indicators.kama(close, 10)
+    assert np.isnan(kama.iloc[8]) and kama.iloc[9] == close.iloc[9]
+    assert list(kama.index) == list(close.index)
+
+def test_repeated_requests_compute_once():
+    indicators.INDICATOR_CACHE.clear()
+    close = make_close()
+    misses = indicators.INDICATOR_CACHE.misses
+
+    first = indicators.rsi(close, 14)
+    for _ in range(50):
+        # Same values under another index (e.g. a re-sliced frame) still hit
+        again = indicators.rsi(close.reset_index(drop=True), period=14)
+    assert indicators.INDICATOR_CACHE.misses == misses + 1
+    assert same(first, again) and list(again.index) == list(range(len(close)))
+
+    indicators.rsi(close, 21)
+    assert indicators.INDICATOR_CACHE.misses == misses + 2
+
+def test_cache_is_bounded_and_read_only():
+    cache = IndicatorCache(max_bytes=3 * 800)
+    arrays = {key: (np.arange(100, dtype=np.float64),) for key in "abcd"}
+    for key in "abc":
+        cache.get(key, lambda key=key: arrays[key])
+    cache.get("a", lambda: None)  # Hit: "a" becomes the most recently used
+    cache.get("d", lambda: arrays["d"])
+
+    # "b" was the least recently used
+    assert len(cache) == 3 and cache.nbytes == 3 * 800
+    assert "b" not in cache and "a" in cache
+    assert not arrays["a"][0].flags.writeable
@@ -0,0 +1,135 @@
+import shutil
+from database import Trade, get_journal_checkpoint, get_pnl_stats
+from journal import TradeJournal
+from ledger import Ledger
+
+def fill(i, side="BUY", profit=None):
+    return {"symbol": "BTC/USDT", "side": side, "price": 100.0 + i, "amount": 0.01, "strategy": "Test", "profit": profit}
+
+def test_appends_are_saved_in_batches_by_the_writer(db_session, tmp_path):
+    journal = TradeJournal(str(tmp_path / "trades.journal"), batch_size=500)
+    journal.open()
+    saved = []
+    journal.on_flush.append(lambda trades: saved.append(len(trades)))
+
+    for i in range(2000):
+        journal.append(fill(i))
+    # Appending never touches the database: the writer saves them
+    assert db_session.query(Trade).count() == 0
+    assert len(journal.pending) == 2000
+
+    journal.start()
+    journal.close()
+    assert db_session.query(Trade).count() == 2000
+    assert sum(saved) == 2000 and max(saved) <= 500
+    assert get_journal_checkpoint(journal.name) == 2000
+    assert (tmp_path / "trades.journal").read_text() == ""  # Truncated once everything is saved
+
+def test_unsaved_entries_are_replayed_exactly_once(db_session, tmp_path):
+    path = str(tmp_path / "trades.journal")
+    journal = TradeJournal(path, fsync='always')
+    journal.open()
+    journal.append(fill(1))
+    journal.flush()
+    journal.append(fill(2))
+    journal.append(fill(3, side="SELL", profit=2.0))
+    shutil.copy(path, f"{path}.crash")
+    # Crash: the process dies before the writer saves the last two (plus a torn write)
+    with open(f"{path}.crash", "a") as f:
+        f.write('{"seq": 4, "tra')
+    shutil.copy(f"{path}.crash", path)
+
+    restarted = TradeJournal(path)
+    assert [t["price"] for t in restarted.open()] == [102.0, 103.0]
+    assert restarted.flush() == 2
+    assert [t.price for t in db_session.query(Trade).order_by(Trade.id)] == [101.0, 102.0, 103.0]
+    assert get_pnl_stats() == (2.0, 100.0, 1)
+
+    # Saved entries are never replayed again, even from a stale copy of the file
+    shutil.copy(f"{path}.crash", path)
+    again = TradeJournal(path)
+    assert again.open() == []
+    assert again.append(fill(5))  # Sequence numbers continue after the checkpoint
+    again.flush()
+    assert get_journal_checkpoint(again.name) == 4
+
+def test_ledger_records_through_the_journal(db_session, tmp_path):
+    journal = TradeJournal(str(tmp_path / "trades.journal"))
+    journal.open()
+    ledger = Ledger()
+    ledger.attach_journal(journal)
+    events = []
+    ledger.listeners.append(events.append)
+
+    assert ledger.record(fill(0)) is None
+    # Applied in memory right away, saved and announced (with its id) on flush
+    assert ledger.position("BTC/USDT") == {"entry_price": 100.0, "amount": 0.01}
+    assert events == []
+
+    # A restart before the flush still restores the fill from the journal
+    restarted = Ledger()
+    restarted.listeners.append(events.append)
+    replay = TradeJournal(journal.path)
+    replay.open()
+    restarted.attach_journal(replay)
+    restarted.load(["BTC/USDT"])
+    assert restarted.position("BTC/USDT") == ledger.position("BTC/USDT")
+
+    replay.flush()
+    assert db_session.query(Trade).count() == 1
+    assert [(e["price"], bool(e["id"])) for e in events] == [(100.0, True)]
+
+def journal_with_pending(path):
+    """A journal left by a crash: a buy saved, its sell and a new buy still pending."""
+    journal = TradeJournal(path)
+    journal.open()
+    journal.append(fill(0))
+    journal.flush()
+    journal.append(fill(3, side="SELL", profit=3.0))
+    journal.append(fill(5))
+    return journal
+
+def test_startup_restores_pending_entries_before_the_writer_starts(db_session, tmp_path, monkeypatch):
+    import main
+    path = str(tmp_path / "trades.journal")
+    journal_with_pending(path)
+    monkeypatch.setattr(main, "TRADE_JOURNAL_PATH", path)
+    monkeypatch.setattr(main, "SYMBOLS", ["BTC/USDT"])
+
+    started = []
+    monkeypatch.setattr(TradeJournal, "start", lambda self: started.append(main.LEDGER.loaded))
+    try:
+        main.start_database()
+        # The writer starts only after the ledger has read the DB and the pending entries
+        assert started == [True]
+        assert main.LEDGER.pnl_stats() == (3.0, 100.0, 1)
+        assert main.LEDGER.position("BTC/USDT") == {"entry_price": 105.0, "amount": 0.01}
+
+        main.LEDGER.journal.flush()
+        assert get_pnl_stats() == (3.0, 100.0, 1)
+    finally:
+        main.LEDGER.journal.close()
+        main.LEDGER.journal = None
+
+def test_load_is_not_interleaved_with_a_batch(db_session, tmp_path, monkeypatch):
+    import threading
+    import ledger as ledger_module
+    replay = TradeJournal(journal_with_pending(str(tmp_path / "trades.journal")).path)
+    replay.open()
+    restored = Ledger()
+    restored.attach_journal(replay)
+
+    # The writer tries to save the pending round trip while load is between its reads
+    writer = threading.Thread(target=replay.flush)
+    read_positions = ledger_module.get_open_positions
+    def positions_then_flush():
+        writer.start()
+        writer.join(timeout=0.2)
+        return read_positions()
+    monkeypatch.setattr(ledger_module, "get_open_positions", positions_then_flush)
+
+    restored.load(["BTC/USDT"])
+    writer.join()
+    assert restored.pnl_stats() == (3.0, 100.0, 1)
+    assert restored.position("BTC/USDT") == {"entry_price": 105.0, "amount": 0.01}
+    assert get_pnl_stats() == (3.0, 100.0, 1)
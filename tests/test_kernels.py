@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import indicators
+import kernels
+from bench_kernels import legacy_kama_multi_year, legacy_kama_v2, legacy_rsi, random_walk
+
+BACKENDS = ["python"] + (["numba"] if kernels.numba is not None else [])
+
+def same(a, b):
+    return np.array_equal(np.asarray(a), np.asarray(b), equal_nan=True)
+
+def test_kama_matches_the_research_loops():
+    df = random_walk(3000)
+    df.loc[1500:1512, 'close'] = df['close'].iloc[1500]  # A flat stretch: ER is 0/0 there
+    assert same(indicators.kama(df['close'], 10), legacy_kama_multi_year(df))
+    # research_v2 never zero-filled that ER, so its KAMA turns NaN for good
+    expected = legacy_kama_v2(df)
+    assert np.isnan(expected[-1])
+    assert same(indicators.kama(df['close'], 10, seed='first', flat_er=None), expected)
+
+def test_backends_agree():
+    values = random_walk(2000)['close'].values.copy()
+    values[700] = np.nan
+    alpha = np.random.default_rng(1).uniform(0.01, 0.5, len(values))
+    for backend in BACKENDS:
+        assert same(kernels.adaptive_filter(values, alpha, start=9, backend=backend),
+                    kernels.adaptive_filter(values, alpha, start=9, backend="python"))
+        # The loop numba compiles, run in Python, is pandas' ewm bit for bit
+        out = np.empty(len(values))
+        assert same(kernels._run(kernels._ema_loop, (values, out), 1.0 / 14, 14, backend=backend),
+                    pd.Series(values).ewm(com=13, adjust=False, min_periods=14).mean())
+
+def test_rsi_and_macd_unchanged():
+    df = random_walk(1000)
+    assert same(indicators.rsi(df['close'], 14), legacy_rsi(df))
+    k = df['close'].ewm(span=12, adjust=False, min_periods=12).mean()
+    d = df['close'].ewm(span=26, adjust=False, min_periods=26).mean()
+    line, signal = indicators.macd(df['close'])
+    assert same(line, k - d) and same(signal, (k - d).ewm(span=9, adjust=False, min_periods=9).mean())
@@ -19,8 +19,8 @@ def test_dynamic_position_size_tiers(db_session):
     assert amount == (10000 * 0.01) / 50000 # 1% risk
 
     # Case 2: Hot Hand (>60% WR)
-    log_trade({"symbol": "BTC", "side": "SELL", "price": 0, "amount": 0, "profit": 10}) # Win
-    log_trade({"symbol": "BTC", "side": "SELL", "price": 0, "amount": 0, "profit": 10}) # Win
+    main.LEDGER.record({"symbol": "BTC", "side": "SELL", "price": 0, "amount": 0, "profit": 10}) # Win
+    main.LEDGER.record({"symbol": "BTC", "side": "SELL", "price": 0, "amount": 0, "profit": 10}) # Win
     # 2 wins / 2 total = 100% WR
     
     amount, tier, win_rate = get_dynamic_position_size(10000, 50000)
@@ -40,8 +40,9 @@ def test_check_risk_exits(db_session):
     # Use patch to ensure strict mode separation
     with patch("main.PAPER_MODE", False):
         # Needs to be IN_POSITION based on DB
-        # Setup: Log a BUY so the bot thinks it has a position to sell
+        # Setup: Log a BUY so the bot thinks it has a position to sell, then restore like a restart
         log_trade({"symbol": "BTC/USDT", "side": "BUY", "price": 50000, "amount": 1, "profit": None})
+        main.LEDGER.load(["BTC/USDT"])
         
         # 1. Stop Loss Hit (Price drops 10%)
         # Entry: 50000. SL @ 10% = 45000.
@@ -50,3 +51,36 @@ def test_check_risk_exits(db_session):
         action = check_risk_exits(MockExchange(), "BTC/USDT", 44000)
         
         assert action == "SELL"
+
+def test_run_bot_multi_symbol(db_session):
+    import threading
+
+    symbols = ["BTC/USDT", "ETH/USDT", "SOL/USDT", "XRP/USDT"]
+    # Every fetch waits until all four are in flight: fetched one after another, the barrier breaks
+    in_flight = threading.Barrier(len(symbols), timeout=5)
+
+    class SlowExchange:
+        # Falling closes -> oversold RSI for ETH, flat closes -> no signal for BTC
+        def fetch_ohlcv(self, symbol, timeframe='4h', since=None, limit=None):
+            in_flight.wait()
+            step = -10 if symbol == "ETH/USDT" else 0
+            return [[i * 14400000, 0, 0, 0, 3000 + i * step + (i % 2), 1] for i in range(100)]
+        def fetch_ticker(self, symbol):
+            return {'last': 3000.0}
+
+    with patch("main.PAPER_MODE", True), \
+         patch("main.SYMBOLS", symbols), \
+         patch.dict("main.LAST_ACTIONS", {}, clear=True), \
+         patch.dict("main.CANDLE_FEEDS", {}, clear=True), \
+         patch("main.paper_balance", {"USDT": 10000.0}):
+        market_data = main.run_bot(SlowExchange())
+
+        # Fetches overlap
+        assert not in_flight.broken
+        assert set(market_data) == set(symbols)
+
+        # Only the oversold symbol trades, out of the shared USDT balance
+        assert main.LAST_ACTIONS["ETH/USDT"] == "BUY"
+        assert main.LAST_ACTIONS.get("BTC/USDT") is None
+        assert main.paper_balance["ETH"] > 0
+        assert main.paper_balance["USDT"] < 10000.0
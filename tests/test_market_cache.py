@@ -0,0 +1,140 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from market_cache import MarketDataCache, get_market_cache
+import main
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_ticker_is_cached_until_ttl_expires():
+    exchange = MagicMock()
+    exchange.fetch_ticker.return_value = {'last': 100.0}
+    clock = FakeClock()
+    cache = MarketDataCache(exchange, ttl=2.0, clock=clock)
+
+    cache.ticker("BTC/USDT")
+    clock.now = 1.9
+    cache.ticker("BTC/USDT")
+    assert exchange.fetch_ticker.call_count == 1
+
+    clock.now = 2.1
+    cache.ticker("BTC/USDT")
+    assert exchange.fetch_ticker.call_count == 2
+
+def test_concurrent_misses_share_one_request():
+    exchange = MagicMock()
+    def slow_balance():
+        time.sleep(0.2)
+        return {'total': {'USDT': 500.0}}
+    exchange.fetch_balance.side_effect = slow_balance
+    cache = MarketDataCache(exchange, ttl=5.0)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.balance())) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert exchange.fetch_balance.call_count == 1
+    assert all(r['total']['USDT'] == 500.0 for r in results)
+
+def test_errors_reach_waiters_and_are_not_cached():
+    exchange = MagicMock()
+    exchange.fetch_ticker.side_effect = [ConnectionError("boom"), {'last': 1.0}]
+    cache = MarketDataCache(exchange, ttl=5.0)
+
+    with pytest.raises(ConnectionError):
+        cache.ticker("BTC/USDT")
+    assert cache.ticker("BTC/USDT")['last'] == 1.0
+
+def test_live_buy_costs_one_exchange_call(db_session):
+    exchange = MagicMock()
+    exchange.fetch_balance.return_value = {'total': {'USDT': 10000.0, 'BTC': 0.0}}
+    exchange.create_market_buy_order.return_value = {'id': '1', 'price': 50000.0}
+
+    # Steady state: the loop has already primed the price and the balance snapshot
+    cache = get_market_cache(exchange, main.MARKET_CACHE_TTL)
+    cache.put_price("BTC/USDT", 50000.0)
+    cache.balance()
+    exchange.reset_mock()
+
+    with patch("main.PAPER_MODE", False), patch("main.send_discord_alert"):
+        assert main.execute_trade(exchange, "BTC/USDT", "BUY", 50000.0)
+
+    calls = [name for name, _, _ in exchange.mock_calls if not name.startswith('__')]
+    assert calls == ['create_market_buy_order']
+    # Alert balances reflect the fill without a re-fetch
+    assert cache.balance()['total']['BTC'] > 0
+
+class FakeMarketsExchange:
+    id = 'binance'
+    isSandboxModeEnabled = False
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.downloads = 0
+        self.markets = None
+        self.currencies = None
+
+    def load_markets(self, reload=False):
+        if self.fail:
+            raise ConnectionError("offline")
+        self.downloads += 1
+        self.set_markets({"BTC/USDT": {"id": "BTCUSDT"}}, {"BTC": {"id": "BTC"}})
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+        self.currencies = currencies
+        return markets
+
+def test_market_metadata_is_cached_on_disk(tmp_path):
+    from market_cache import load_markets_cached
+    path = str(tmp_path / "markets.json")
+    clock = FakeClock()
+
+    assert load_markets_cached(FakeMarketsExchange(), path, max_age=60, clock=clock) == "exchange"
+
+    # A restart within max_age needs no download
+    restarted = FakeMarketsExchange()
+    assert load_markets_cached(restarted, path, max_age=60, clock=clock) == "cache"
+    assert restarted.downloads == 0
+    assert restarted.markets == {"BTC/USDT": {"id": "BTCUSDT"}}
+    assert restarted.currencies == {"BTC": {"id": "BTC"}}
+
+    # Stale: downloaded again, unless the exchange is unreachable
+    clock.now = 61
+    offline = FakeMarketsExchange(fail=True)
+    assert load_markets_cached(offline, path, max_age=60, clock=clock) == "stale cache"
+    assert offline.markets
+    fresh = FakeMarketsExchange()
+    assert load_markets_cached(fresh, path, max_age=60, clock=clock) == "exchange"
+    assert fresh.downloads == 1
+
+def test_independent_startup_steps_run_concurrently():
+    # Each step waits until all three are running: run one after another, the barrier breaks
+    running = threading.Barrier(3, timeout=5)
+
+    def slow(result=None):
+        def step(*args):
+            running.wait()
+            return result
+        return step
+
+    with patch("main.get_exchange", return_value=MagicMock()), \
+         patch("main.start_database", side_effect=slow()), \
+         patch("main.load_markets", side_effect=slow("cache")), \
+         patch("main.warm_candle_feeds", side_effect=slow()), \
+         patch.dict("main.paper_balance", {}), \
+         patch.dict("main.LAST_ACTIONS", {}):
+        exchange = main.prepare_engine()
+
+    assert exchange is not None
+    assert not running.broken
+    assert main.metrics.STARTUP_DURATION.value(phase='markets') > 0
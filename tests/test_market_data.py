@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from market_data import CandleFeed
+from indicators import WilderRSI
+
+def reference_rsi(closes):
+    # The full-history computation run_bot used before incremental state
+    delta = pd.Series(closes).diff()
+    gain = (delta.where(delta > 0, 0)).ewm(com=13, adjust=False).mean()
+    loss = (-delta.where(delta < 0, 0)).ewm(com=13, adjust=False).mean()
+    rs = gain / loss
+    return (100 - (100 / (1 + rs))).values
+
+def make_bars(n, start=0, step=4 * 3600 * 1000, seed=1):
+    rng = np.random.default_rng(seed)
+    closes = 50000 + np.cumsum(rng.normal(0, 300, n))
+    return [[start + i * step, c, c + 10, c - 10, c, 1.0] for i, c in enumerate(closes)]
+
+class FakeExchange:
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe='4h', since=None, limit=None):
+        self.calls.append({"since": since, "limit": limit})
+        rows = [b for b in self.bars if since is None or b[0] >= since]
+        return rows[-limit:] if since is None else rows[:limit]
+
+def test_wilder_rsi_matches_pandas():
+    closes = [b[4] for b in make_bars(200)]
+    expected = reference_rsi(closes)
+
+    rsi = WilderRSI(14)
+    values = [rsi.update(c) for c in closes]
+
+    assert np.isnan(values[0])
+    assert np.allclose(values[1:], expected[1:], rtol=1e-10)
+
+def test_peek_does_not_commit():
+    rsi = WilderRSI(14)
+    for c in [100, 101, 99, 102, 103]:
+        rsi.update(c)
+    before = (rsi.avg_gain, rsi.avg_loss, rsi.last_close)
+
+    provisional = rsi.peek(90)
+
+    assert provisional < rsi.value
+    assert (rsi.avg_gain, rsi.avg_loss, rsi.last_close) == before
+
+def test_feed_fetches_only_new_candles():
+    bars = make_bars(150)
+    exchange = FakeExchange(bars[:100])
+    feed = CandleFeed("BTC/USDT", history=100)
+
+    # Warm-up pulls the full window
+    last_close, last_rsi = feed.refresh(exchange)
+    assert exchange.calls[0]["since"] is None
+    assert np.isclose(last_rsi, reference_rsi([b[4] for b in bars[:100]])[-1], rtol=1e-10)
+
+    # Forming bar ticks, then a new bar opens
+    forming = list(bars[99])
+    forming[4] += 250
+    exchange.bars = bars[:99] + [forming, bars[100]]
+    last_close, last_rsi = feed.refresh(exchange)
+
+    assert exchange.calls[1]["since"] == bars[99][0]
+    assert last_close == bars[100][4]
+    closes = [b[4] for b in bars[:99]] + [forming[4], bars[100][4]]
+    assert np.isclose(last_rsi, reference_rsi(closes)[-1], rtol=1e-10)
+    assert len(feed.bars) == 100
@@ -0,0 +1,56 @@
+import pytest
+from unittest.mock import MagicMock
+from requests.structures import CaseInsensitiveDict
+from fastapi.testclient import TestClient
+from main import app
+from metrics import Registry, exchange_call, EXCHANGE_ERRORS, EXCHANGE_WEIGHT, EXCHANGE_DURATION, DB_DURATION
+from database import log_trade
+import main
+
+client = TestClient(app)
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("test_latency_seconds", "Test latency", ["phase"], buckets=(0.1, 1.0))
+    latency.observe(0.05, phase="fetch")
+    latency.observe(0.5, phase="fetch")
+    latency.observe(5.0, phase="fetch")
+
+    text = registry.render()
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{phase="fetch",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{phase="fetch",le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{phase="fetch",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{phase="fetch"} 3' in text
+
+def test_exchange_call_records_latency_errors_and_weight():
+    exchange = MagicMock()
+    # What ccxt stores: the requests response headers, not a plain dict
+    exchange.last_response_headers = CaseInsensitiveDict({'X-MBX-USED-WEIGHT-1M': '42'})
+    exchange.fetch_order_book.side_effect = ConnectionError("boom")
+    errors_before = EXCHANGE_ERRORS.value(call='fetch_order_book')
+    calls_before = EXCHANGE_DURATION.count(call='fetch_order_book')
+
+    with pytest.raises(ConnectionError):
+        exchange_call(exchange, 'fetch_order_book', 'BTC/USDT')
+
+    assert EXCHANGE_ERRORS.value(call='fetch_order_book') == errors_before + 1
+    assert EXCHANGE_DURATION.count(call='fetch_order_book') == calls_before + 1
+    assert EXCHANGE_WEIGHT.value() == 42
+
+def test_metrics_endpoint_exposes_loop_and_db_timings(db_session):
+    before = DB_DURATION.count(op='log_trade')
+    log_trade({"symbol": "BTC/USDT", "side": "BUY", "price": 50000.0, "amount": 0.01, "strategy": "Test"})
+    assert DB_DURATION.count(op='log_trade') == before + 1
+
+    exchange = MagicMock()
+    exchange.fetch_ohlcv.return_value = [[i * 1000, 100, 100, 100, 100 + i, 1] for i in range(30)]
+    main.run_bot(exchange, ["BTC/USDT"])
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'bot_phase_duration_seconds_count{phase="fetch"}' in response.text
+    assert 'bot_phase_duration_seconds_count{phase="indicators"}' in response.text
+    assert 'bot_db_query_duration_seconds_count{op="log_trade"}' in response.text
+    assert 'bot_exchange_request_duration_seconds_count{call="fetch_ohlcv"}' in response.text
@@ -0,0 +1,52 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from multiprocessing import shared_memory
+import optimize
+
+def make_frame(n=1500, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return optimize.calculate_indicators(pd.DataFrame({"close": close}))
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_grid_search_matches_serial_runs(workers):
+    df = make_frame()
+    grid = list(itertools.product([25, 30, 35], [65, 70], [0.05, 100.0]))
+
+    results = list(optimize.grid_search(df, grid, workers=workers, chunk_size=2, progress=False))
+
+    assert sorted(params for params, _, _ in results) == sorted(grid)
+    for params, roi, trades in results:
+        assert (roi, trades) == optimize.run_simulation(df, *params)
+
+def test_shared_arrays_are_released():
+    with optimize.SharedArrays({"close": np.arange(10.0)}) as shared:
+        name, shape = shared.spec["close"]
+        optimize._attach(shared.spec)
+        assert optimize._worker_arrays["close"].tolist() == list(np.arange(10.0))
+        assert not optimize._worker_arrays["close"].flags.writeable
+        optimize._detach()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+def test_parse_range():
+    assert optimize.parse_range("25,30,35") == [25, 30, 35]
+    assert optimize.parse_range("20:30:5") == [20, 25, 30]
+    assert optimize.parse_range("0.02:0.06:0.02") == [0.02, 0.04, 0.06]
+
+def test_workers_convert_the_shared_arrays_once():
+    with optimize.SharedArrays({"close": np.arange(30.0), "rsi_14": np.full(30, 50.0)}) as shared:
+        optimize._attach(shared.spec)
+        lists = dict(optimize._worker_lists)
+        optimize._evaluate([(30, 70, 0.05)])
+        optimize._evaluate([(25, 75, 0.05)])
+        # Every chunk reuses the lists made in _attach
+        assert all(optimize._worker_lists[name] is lists[name] for name in lists)
+        optimize._detach()
+
+def test_empty_grid_is_reported(capsys, monkeypatch):
+    monkeypatch.setattr(optimize, "load_history", lambda *a, **k: pytest.fail("loaded data for an empty grid"))
+    optimize.optimize(buy_rsis=optimize.parse_range("40:30:1"))
+    assert "empty parameter grid" in capsys.readouterr().out
@@ -12,8 +12,8 @@ def mock_exchange():
     exchange.create_market_sell_order.return_value = {'id': '124', 'price': 55000.0}
     return exchange
 
-@patch('main.restore_state_from_db')
-@patch('main.get_pnl_stats')
+@patch('main.get_position_state')
+@patch('main.LEDGER.pnl_stats')
 @patch('main.send_discord_alert')
 @patch('main.get_performance_metrics')
 def test_buy_alert_content(mock_metrics, mock_send, mock_stats, mock_state, mock_exchange):
@@ -61,8 +61,8 @@ def test_buy_alert_content(mock_metrics, mock_send, mock_stats, mock_state, mock
     balance_field = next(f for f in fields if f['name'] == "Wallet Total Value")
     assert balance_field['value'] == "$10,000.00"
 
-@patch('main.restore_state_from_db')
-@patch('main.get_pnl_stats')
+@patch('main.get_position_state')
+@patch('main.LEDGER.pnl_stats')
 @patch('main.send_discord_alert')
 @patch('main.get_performance_metrics')
 def test_sell_alert_content(mock_metrics, mock_send, mock_stats, mock_state, mock_exchange):
@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+import threading
+import time
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from runtime import EngineRuntime, NO_CHANGE
+import main
+
+def test_commands_never_overlap_engine_steps():
+    runtime = EngineRuntime()
+    active = threading.Lock()
+    overlaps = []
+    log = []
+
+    def step(name):
+        if not active.acquire(blocking=False):
+            overlaps.append(name)
+            return
+        try:
+            time.sleep(0.01)
+            log.append(name)
+        finally:
+            active.release()
+        return name
+
+    runtime.register('cmd', step)
+
+    async def engine(rt):
+        for i in range(5):
+            await rt.call(step, f"step{i}")
+            await rt.process(0.005)
+
+    async def scenario():
+        runtime.start(engine)
+        results = await asyncio.gather(*(runtime.submit('cmd', f"cmd{i}") for i in range(5)))
+        await runtime.task
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [f"cmd{i}" for i in range(5)]
+    assert overlaps == []
+    assert sorted(log) == sorted([f"step{i}" for i in range(5)] + [f"cmd{i}" for i in range(5)])
+
+def test_command_errors_reach_the_caller():
+    runtime = EngineRuntime()
+    def fail():
+        raise ValueError("nope")
+    runtime.register('fail', fail)
+
+    async def scenario():
+        runtime.start(lambda rt: rt.process())
+        try:
+            await runtime.submit('fail')
+        finally:
+            await runtime.stop()
+
+    with pytest.raises(ValueError, match="nope"):
+        asyncio.run(scenario())
+
+def test_lifespan_runs_engine_and_routes_control_through_it():
+    async def idle_engine(runtime):
+        await runtime.process()
+
+    with patch("main.run_engine", idle_engine), patch("main.BOT_PAUSED", False):
+        with TestClient(main.app) as client:
+            assert main.ENGINE.running
+            before = main.ENGINE.processed
+
+            response = client.post("/control/pause")
+            assert response.json()["status"] == "paused"
+            assert main.BOT_PAUSED is True
+            assert main.ENGINE.processed == before + 1
+
+            client.post("/control/resume")
+            assert main.BOT_PAUSED is False
+
+        assert not main.ENGINE.running
+
+def test_trade_prints_coalesce_to_the_newest_per_symbol():
+    published = []
+    runtime = EngineRuntime(after_step=lambda: published.append(1))
+    seen = []
+
+    def check(symbol, price):
+        seen.append((symbol, price))
+        return NO_CHANGE if price < 150 else None  # Only the "sell" publishes
+
+    runtime.register('trade', check)
+
+    async def scenario():
+        runtime.start(lambda rt: rt.process())
+        # A burst arrives while the engine is busy: one queued check per symbol, newest price
+        for price in range(100):
+            runtime.post_latest('trade', 'BTC', 'BTC', float(price))
+            runtime.post_latest('trade', 'ETH', 'ETH', float(price + 100))
+        assert runtime.queue.qsize() == 2
+        while runtime.processed < 2:
+            await asyncio.sleep(0)
+        await runtime.stop()
+
+    asyncio.run(scenario())
+    assert seen == [('BTC', 99.0), ('ETH', 199.0)]
+    assert published == [1]  # The BTC check changed nothing
+
+def test_full_queue_drops_fire_and_forget_commands():
+    runtime = EngineRuntime(queue_size=2)
+    runtime.register('cmd', lambda: None)
+
+    async def scenario():
+        runtime.start(lambda rt: asyncio.sleep(3600))
+        for _ in range(5):
+            runtime.post('cmd')
+        size = runtime.queue.qsize()
+        await runtime.stop()
+        return size
+
+    assert asyncio.run(scenario()) == 2
+
+def test_stop_waits_for_a_running_step():
+    runtime = EngineRuntime()
+    started, release = threading.Event(), threading.Event()
+    log = []
+
+    def blocking_step():
+        started.set()
+        release.wait(5)
+        log.append("step done")
+
+    async def engine(rt):
+        await rt.call(blocking_step)
+
+    async def scenario():
+        runtime.start(engine)
+        await asyncio.to_thread(started.wait, 5)
+        stopping = asyncio.create_task(runtime.stop())
+        for _ in range(20):
+            await asyncio.sleep(0)
+        # The engine task is cancelled, but stop() still waits on the step
+        assert not stopping.done()
+        release.set()
+        await stopping
+        log.append("stopped")
+
+    asyncio.run(scenario())
+    assert log == ["step done", "stopped"]
@@ -0,0 +1,86 @@
+from unittest.mock import MagicMock, patch
+from scheduler import CandleScheduler, timeframe_seconds
+import main
+
+BAR = 4 * 3600
+
+class FakeClock:
+    """Virtual time: sleep() and work() advance the clock instead of blocking."""
+    def __init__(self, now):
+        self.now = now
+    def __call__(self):
+        return self.now
+    def sleep(self, seconds):
+        self.now += seconds
+
+def make_scheduler(clock, **kwargs):
+    return CandleScheduler('4h', interval=10, close_delay=2.0, clock=clock, sleep=clock.sleep, **kwargs)
+
+def test_timeframe_seconds():
+    assert timeframe_seconds('4h') == BAR
+    assert timeframe_seconds('15m') == 900
+
+def test_strategy_runs_once_per_close_and_ticks_do_not_drift():
+    clock = FakeClock(100 * BAR - 25)
+    scheduler = make_scheduler(clock)
+    events = []
+
+    def on_close():
+        events.append(('close', clock.now))
+    def on_tick():
+        events.append(('tick', clock.now))
+        clock.now += 3  # Work takes time; the next tick must not slide by it
+        if len(events) >= 6:
+            scheduler.stop()
+
+    scheduler.run(on_close, on_tick)
+
+    start = 100 * BAR - 25
+    assert events == [
+        ('tick', start), ('tick', start + 10), ('tick', start + 20),
+        ('close', 100 * BAR + 2),
+        ('tick', start + 30), ('tick', start + 40),
+    ]
+    assert scheduler.overruns == 0
+
+def test_overrun_is_logged_and_missed_slots_are_skipped(capsys):
+    clock = FakeClock(1000.0)
+    scheduler = make_scheduler(clock)
+    ticks = []
+
+    def on_tick():
+        ticks.append(clock.now)
+        if len(ticks) == 1:
+            clock.now += 25  # Blows the 10s budget
+        if len(ticks) == 3:
+            scheduler.stop()
+
+    scheduler.run(lambda: None, on_tick)
+
+    assert ticks == [1000.0, 1030.0, 1040.0]
+    assert scheduler.overruns == 1
+    assert "Loop overrun" in capsys.readouterr().out
+
+def test_sync_aligns_to_exchange_time():
+    clock = FakeClock(1000.0)
+    exchange = MagicMock()
+    exchange.fetch_time.return_value = 1_005_000  # Server is 5s ahead
+    scheduler = make_scheduler(clock)
+
+    assert scheduler.sync(exchange) == 5.0
+    assert scheduler.next_close(BAR - 1) == BAR
+
+def test_risk_checks_only_fetch_tickers_for_open_positions(db_session):
+    main.LEDGER.set_position("BTC/USDT", 50000.0, 0.1)
+    exchange = MagicMock()
+    exchange.fetch_tickers.return_value = {"BTC/USDT": {"last": 40000.0}}
+
+    with patch("main.SYMBOLS", ["BTC/USDT", "ETH/USDT"]), \
+         patch("main.check_risk_exits", return_value="SELL") as risk, \
+         patch.dict("main.LAST_ACTIONS", {}, clear=True):
+        main.run_risk_checks(exchange)
+
+        exchange.fetch_tickers.assert_called_once_with(["BTC/USDT"])
+        risk.assert_called_once_with(exchange, "BTC/USDT", 40000.0)
+        assert main.LAST_ACTIONS["BTC/USDT"] == "SELL"
+        exchange.fetch_ohlcv.assert_not_called()
@@ -0,0 +1,45 @@
+from snapshot import SnapshotPublisher
+
+def test_publish_versions_only_on_change():
+    publisher = SnapshotPublisher()
+    first = publisher.publish({"rsi": 30.0})
+    assert first.version == 1
+    assert publisher.publish({"rsi": 30.0}) is first
+
+    second = publisher.publish({"rsi": 31.0})
+    assert second.version == 2
+    assert second.etag != first.etag
+    assert publisher.current is second
+
+def test_non_finite_values_publish_as_null():
+    snapshot = SnapshotPublisher().publish({"rsi": {"BTC/USDT": float('nan')}})
+    assert snapshot.data["rsi"]["BTC/USDT"] is None
+    assert b"NaN" not in snapshot.body
+
+def test_concurrent_publishers_never_reuse_or_rewind_versions():
+    import threading
+    publisher = SnapshotPublisher()
+    published = []
+    start = threading.Barrier(4)
+
+    def publish(thread):
+        start.wait()
+        for i in range(200):
+            published.append(publisher.publish({"thread": thread, "i": i}))
+
+    import sys
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible to provoke interleaving
+    try:
+        threads = [threading.Thread(target=publish, args=(t,)) for t in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    # Every publish changed the data: 800 distinct versions and ETags, the last one current
+    assert sorted(s.version for s in published) == list(range(1, 801))
+    assert len({s.etag for s in published}) == 800
+    assert publisher.current.version == 800
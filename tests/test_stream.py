@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from market_data import CandleFeed
+from replay_server import ReplayServer, bar_events
+from stream import MarketStream, stream_names
+
+STEP = 4 * 3600 * 1000
+
+def make_bars(n):
+    bars = []
+    price = 50000.0
+    for i in range(n):
+        close = price + (300 if i % 3 else -500)
+        bars.append([i * STEP, price, max(price, close) + 50, min(price, close) - 50, close, 1.0])
+        price = close
+    return bars
+
+class FakeExchange:
+    def __init__(self, bars):
+        self.bars = bars
+        self.backfills = 0
+
+    def fetch_ohlcv(self, symbol, timeframe='4h', since=None, limit=None):
+        self.backfills += 1
+        rows = [b for b in self.bars if since is None or b[0] >= since]
+        return rows[:limit] if since is not None else rows[-limit:]
+
+class RecordingStore:
+    def __init__(self):
+        self.saved, self.threads = [], set()
+
+    def upsert(self, symbol, timeframe, bars):
+        self.threads.add(threading.get_ident())
+        self.saved.extend(bars)
+
+def test_stream_names():
+    assert stream_names("BTC/USDT", "4h") == ["btcusdt@kline_4h", "btcusdt@trade"]
+
+def test_replay_bar_events_walk_the_candle():
+    bar = [0, 100.0, 110.0, 95.0, 105.0, 1.0]
+    events = list(bar_events("BTC/USDT", "4h", bar))
+    trades = [float(e["data"]["p"]) for e in events if e["data"]["e"] == "trade"]
+    assert trades == [100.0, 95.0, 110.0, 105.0]
+    assert events[-1]["data"]["k"]["x"] is True
+
+def test_stream_replay_with_reconnect_and_backfill():
+    bars = make_bars(40)
+    exchange = FakeExchange(bars[:20])
+    store = RecordingStore()
+    feed = CandleFeed("BTC/USDT", history=100, store=store)
+    klines, trades = [], []
+
+    async def scenario():
+        server = ReplayServer(bars[20:], drop_every=7)
+        async with server.serve(port=0) as ws_server:
+            port = ws_server.sockets[0].getsockname()[1]
+            market_stream = MarketStream(
+                feed, exchange,
+                on_kline=lambda bar, closed: klines.append((bar, closed)),
+                on_trade=trades.append,
+                url=f"ws://127.0.0.1:{port}",
+                min_backoff=0.01,
+            )
+            task = asyncio.create_task(market_stream.run())
+            while server.cursor < len(server.candles) or sum(c for _, c in klines) < 20:
+                await asyncio.sleep(0.01)
+            market_stream.stop()
+            task.cancel()
+            return server, market_stream
+
+    server, market_stream = asyncio.run(asyncio.wait_for(scenario(), timeout=10))
+
+    # Dropped every 7 candles -> several reconnects, each backfilled over REST first
+    assert server.connections >= 3
+    assert exchange.backfills == market_stream.connections
+    assert sum(closed for _, closed in klines) == 20
+    assert trades[-1] == bars[-1][4]
+    assert feed.bars[-1] == bars[-1]
+    assert [b[0] for b in feed.bars] == [b[0] for b in bars]
+
+    # Closed candles reach the store, written off the event loop thread
+    assert [b[0] for b in store.saved] == [b[0] for b in bars[:-1]]
+    assert threading.get_ident() not in store.threads
+
+def test_backfill_passes_on_a_candle_closed_while_disconnected():
+    bars = make_bars(30)
+    exchange = FakeExchange(bars[:20])
+    feed = CandleFeed("BTC/USDT", history=100)
+    klines = []
+    market_stream = MarketStream(feed, exchange, on_kline=lambda bar, closed: klines.append((bar, closed)))
+
+    asyncio.run(market_stream.backfill())
+    assert klines == []  # Initial history is not a missed close
+
+    asyncio.run(market_stream.backfill())
+    assert klines == []  # Nothing new closed
+
+    # Three candles closed during the outage: only the newest reaches the strategy
+    exchange.bars = bars[:23]
+    asyncio.run(market_stream.backfill())
+    assert klines == [(bars[21], True)]
+    assert feed.closed()[0] == bars[21][4]
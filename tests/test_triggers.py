@@ -0,0 +1,57 @@
+from unittest.mock import patch
+from triggers import TriggerBook
+import main
+
+def test_fixed_and_percentage_levels():
+    book = TriggerBook()
+    book.arm("BTC/USDT", 50000.0, stop_pct=0.10, take_pct=0.20)
+    book.add_stop("BTC/USDT", 47000.0, reason="Hard Stop")
+
+    assert book.check("BTC/USDT", 48000.0) == []
+    assert [t.reason for t in book.check("BTC/USDT", 46000.0)] == ["Hard Stop"]
+    # Highest stop first when several are crossed at once
+    assert [t.reason for t in book.check("BTC/USDT", 44000.0)] == ["Hard Stop", "Stop Loss"]
+    assert [t.reason for t in book.check("BTC/USDT", 60000.0)] == ["Take Profit"]
+    assert book.check("ETH/USDT", 1.0) == []
+
+def test_trailing_stop_follows_the_high():
+    book = TriggerBook()
+    book.add_trailing_stop("ETH/USDT", 0.05, reference_price=3000.0)
+    book.add_trailing_stop("ETH/USDT", 0.10, reference_price=3000.0)
+
+    assert book.check("ETH/USDT", 2900.0) == []    # -3.3% from 3000
+    assert book.check("ETH/USDT", 4000.0) == []    # New high
+    fired = book.check("ETH/USDT", 3790.0)         # -5.25% from 4000
+    assert [t.trail_pct for t in fired] == [0.05]
+    assert len(book.check("ETH/USDT", 3500.0)) == 2
+
+def test_rearm_and_clear():
+    book = TriggerBook()
+    book.arm("BTC/USDT", 100.0, stop_pct=0.1, key=(100.0, 0.1))
+    assert book.armed_key("BTC/USDT") == (100.0, 0.1)
+
+    book.arm("BTC/USDT", 100.0, stop_pct=0.5, key=(100.0, 0.5))
+    assert book.check("BTC/USDT", 80.0) == []
+    book.clear("BTC/USDT")
+    assert book.armed_key("BTC/USDT") is None
+
+def test_risk_exits_use_per_symbol_overrides_and_config_changes(db_session):
+    main.LEDGER.set_position("ETH/USDT", 3000.0, 1.0)
+    with patch("main.execute_trade", return_value=True) as trade, \
+         patch("main.print_balance"), \
+         patch("main.send_discord_alert") as alert, \
+         patch("main.get_performance_metrics", return_value=(10000.0, 0.0, 0.0)), \
+         patch.dict("main.RISK_OVERRIDES", {"ETH/USDT": {"stop_loss": 0.02}}, clear=True):
+        # The 2% override fires where the 10% default would not
+        assert main.check_risk_exits(None, "ETH/USDT", 2900.0) == "SELL"
+        assert trade.call_args.kwargs["reason"] == "Stop Loss"
+        assert "STOP LOSS TRIGGERED" in alert.call_args[0][0]
+
+        # Changing the settings re-arms on the next check
+        main.RISK_OVERRIDES["ETH/USDT"] = {"stop_loss": 0.5}
+        assert main.check_risk_exits(None, "ETH/USDT", 2900.0) is None
+
+        # Flat positions clear the book
+        main.LEDGER.reset()
+        assert main.check_risk_exits(None, "ETH/USDT", 1.0) is None
+        assert main.TRIGGERS.armed_key("ETH/USDT") is None
@@ -0,0 +1,142 @@
+import bisect
+import threading
+
+class Trigger:
+    """
+    A price level that closes a position when crossed.
+    kind: 'stop' (fires at or below `level`), 'target' (at or above `level`)
+    or 'trailing' (fires `trail_pct` below the highest price seen since arming;
+    its `level` is None because it moves with that high).
+    """
+    __slots__ = ('symbol', 'kind', 'level', 'reason', 'trail_pct')
+
+    def __init__(self, symbol, kind, level, reason, trail_pct=None):
+        self.symbol = symbol
+        self.kind = kind
+        self.level = level
+        self.reason = reason
+        self.trail_pct = trail_pct
+
+    def __repr__(self):
+        return f"Trigger({self.symbol} {self.kind} {self.reason} @ {self.level})"
+
+class _SortedLevels:
+    """Triggers kept sorted by a numeric key, with a parallel key list for bisect."""
+
+    def __init__(self):
+        self.keys = []
+        self.items = []
+
+    def add(self, key, item):
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.items.insert(i, item)
+
+    def __len__(self):
+        return len(self.keys)
+
+class _SymbolBook:
+    def __init__(self):
+        self.stops = _SortedLevels()     # by level
+        self.targets = _SortedLevels()   # by level
+        self.trailing = _SortedLevels()  # by trail_pct
+        self.high = None                 # Highest price seen since arming (trailing stops)
+        self.key = None
+
+class TriggerBook:
+    """
+    In-memory stop/target levels for every open position.
+
+    Each symbol keeps its stops and targets sorted by price, and its trailing
+    stops sorted by percentage, so a price update finds every crossed trigger
+    with a few bisects (O(log n)) instead of re-deriving levels per position.
+    `check()` does not remove anything: triggers stay until the position is
+    closed and the book is cleared or re-armed.
+    """
+
+    def __init__(self):
+        self._books = {}
+        self._lock = threading.Lock()
+
+    def _book(self, symbol):
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = _SymbolBook()
+        return book
+
+    def add_stop(self, symbol, level, reason="Stop Loss"):
+        with self._lock:
+            trigger = Trigger(symbol, 'stop', level, reason)
+            self._book(symbol).stops.add(level, trigger)
+            return trigger
+
+    def add_target(self, symbol, level, reason="Take Profit"):
+        with self._lock:
+            trigger = Trigger(symbol, 'target', level, reason)
+            self._book(symbol).targets.add(level, trigger)
+            return trigger
+
+    def add_trailing_stop(self, symbol, pct, reference_price, reason="Trailing Stop"):
+        with self._lock:
+            book = self._book(symbol)
+            book.high = max(book.high or reference_price, reference_price)
+            # The level moves with the high watermark, so only the pct is stored
+            trigger = Trigger(symbol, 'trailing', None, reason, trail_pct=pct)
+            book.trailing.add(pct, trigger)
+            return trigger
+
+    def arm(self, symbol, entry_price, stop_pct=None, take_pct=None, trail_pct=None, key=None):
+        """
+        Replaces the symbol's triggers with percentage levels around `entry_price`.
+        `key` is remembered so callers can tell when a re-arm is needed.
+        The trailing high watermark survives a re-arm at the same entry price.
+        """
+        with self._lock:
+            previous = self._books.pop(symbol, None)
+            book = self._book(symbol)
+            if previous and previous.key and previous.key[0] == entry_price:
+                book.high = previous.high
+            book.key = key
+        if stop_pct:
+            self.add_stop(symbol, entry_price * (1 - stop_pct))
+        if take_pct:
+            self.add_target(symbol, entry_price * (1 + take_pct))
+        if trail_pct:
+            self.add_trailing_stop(symbol, trail_pct, entry_price)
+
+    def armed_key(self, symbol):
+        book = self._books.get(symbol)
+        return book.key if book else None
+
+    def clear(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._books.clear()
+            else:
+                self._books.pop(symbol, None)
+
+    def check(self, symbol, price):
+        """
+        Triggers crossed by `price`, stops first (highest level first), then
+        trailing stops, then targets. Also advances the trailing high watermark.
+        """
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                return []
+
+            # Stops fire at or below their level: every level >= price
+            i = bisect.bisect_left(book.stops.keys, price)
+            fired = book.stops.items[i:][::-1]
+
+            if len(book.trailing):
+                book.high = max(book.high, price)
+                # Drawdown from the high; every trailing pct <= drawdown has fired
+                drawdown = 1 - price / book.high
+                j = bisect.bisect_right(book.trailing.keys, drawdown + 1e-12)
+                fired += book.trailing.items[:j]
+
+            # Targets fire at or above their level: every level <= price
+            k = bisect.bisect_right(book.targets.keys, price)
+            fired += book.targets.items[:k]
+            return fired